@@ -1,6 +1,11 @@
+import json
+
+from core.config import settings
+from core.metrics import timed_stage
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from loguru import logger
-from models.sentiment_analysis import SentimentAnalysisResponse
+from models.sentiment_analysis import BatchSentimentAnalysisItem, BatchSentimentAnalysisRequest, SentimentAnalysisResponse
 from repositories.review_repository import ReviewRepository, get_review_repository
 from services.sentiment_service import SentimentService, get_sentiment_service
 
@@ -23,25 +28,100 @@ async def analyze_sentiment(product_id: str, service: SentimentService = Depends
     - Um resumo dos reviews para aquele produto.
     - Os pontos positivos e negativos do produto.
     - Os 3 reviews mais representativos.
+
+    O header `Server-Timing` traz a duração de cada etapa da análise (consultas ao banco vetorial, chamadas ao LLM, similaridade e serialização).
     """
-    result = service.analyze_sentiment(product_id)
+    result = await service.analyze_sentiment(product_id)
     if "error" in result:
         logger.error(f"Erro ao analisar sentimento para o produto {product_id}: {result['error']}")
         raise HTTPException(status_code=404, detail=result["error"])
+    # Serializa aqui (em vez de deixar para o FastAPI) para medir a etapa
+    with timed_stage("serialization"):
+        body = SentimentAnalysisResponse.from_result(result).model_dump_json()
+    return Response(body, media_type="application/json")
+
+
+@router.get("/analyze_sentiment/stream")
+async def analyze_sentiment_stream(product_id: str, service: SentimentService = Depends(get_sentiment_service)):
+    """
+    Variante em streaming de `/analyze_sentiment`.
+
+    Retorna um stream NDJSON de eventos, identificados pela chave `event`, para que o cliente
+    exiba cada parte assim que fica pronta:
+    - `overview`: sentimento predominante, distribuição e top reviews (sem LLM, em milissegundos).
+    - `points`: pontos positivos e negativos.
+    - `summary_delta`: trechos do resumo, conforme gerados pelo LLM.
+    - `summary`: o resumo completo, após o último trecho.
+    """
+    events = service.analyze_sentiment_stream(product_id)
+    first = await anext(events)
+    if first["event"] == "error":
+        logger.error(f"Erro ao analisar sentimento para o produto {product_id}: {first['error']}")
+        raise HTTPException(status_code=404, detail=first["error"])
+
+    async def lines():
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        async for event in events:
+            with timed_stage("serialization"):
+                line = json.dumps(event, ensure_ascii=False) + "\n"
+            yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/analyze_sentiment/batch")
+async def analyze_sentiment_batch(request: BatchSentimentAnalysisRequest, service: SentimentService = Depends(get_sentiment_service)):
+    """
+    Analisa o sentimento dos reviews de vários produtos de uma vez.
+
+    Os reviews de todos os produtos são buscados com uma única consulta ao banco vetorial e as
+    chamadas ao LLM rodam com concorrência limitada (`BATCH_CONCURRENCY`). A resposta é um stream
+    NDJSON com uma linha por produto, enviada assim que a análise do produto termina:
+    `{"product_id": ..., "result": {...}, "error": null}`.
+    """
+    if len(request.product_ids) > settings.BATCH_MAX_PRODUCTS:
+        raise HTTPException(status_code=422, detail=f"Máximo de {settings.BATCH_MAX_PRODUCTS} produtos por requisição.")
+
+    async def lines():
+        async for result in service.analyze_sentiment_batch(request.product_ids):
+            with timed_stage("serialization"):
+                line = BatchSentimentAnalysisItem.from_result(result).model_dump_json() + "\n"
+            yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/stats")
+def stats(service: SentimentService = Depends(get_sentiment_service)):
+    """
+    Retorna contadores de desempenho do serviço de análise.
+
+    - `llm_cache`: acertos, faltas e entradas do cache de respostas do LLM.
+    - `singleflight`: análises em andamento e requisições concorrentes que compartilharam uma mesma análise.
+    - `results_store`: quantidade de resultados materializados.
+    - `result_cache`: entradas, acertos (inclusive expirados servidos durante a atualização), faltas, invalidações e remoções do cache de resultados em memória.
+    - `review_snapshot`: versão do snapshot memory-mapped dos reviews e produtos servidos por ele.
+
+    Declarado como função síncrona para que o FastAPI execute as contagens nos bancos SQLite
+    dos caches em uma thread, sem travar o event loop.
+    """
+    snapshot = service.review_repo.snapshot
     return {
-        "sentiment": result["predominant_sentiment"],
-        "summary": result["summary"],
-        "sentiment_distrib": result["sentiment_distrib"],
-        "positive_points": result["positive_points"],
-        "negative_points": result["negative_points"],
-        "top_reviews": result["top_reviews"],
+        "llm_cache": service.llm_cache.stats() if service.llm_cache is not None else None,
+        "singleflight": service.singleflight_stats(),
+        "results_store": {"entries": len(service.results_store)} if service.results_store is not None else None,
+        "result_cache": service.result_cache.stats() if service.result_cache is not None else None,
+        "review_snapshot": snapshot.stats() if snapshot is not None else None,
     }
 
 
 @router.get("/products")
-async def get_products(repository: ReviewRepository = Depends(get_review_repository)):
+def get_products(repository: ReviewRepository = Depends(get_review_repository)):
     """
     Retorna a lista de produtos disponíveis para análise de sentimento.
+
+    Declarado como função síncrona para que o FastAPI execute a consulta bloqueante
+    ao banco vetorial em uma thread, sem travar o event loop.
     """
 
     products = repository.get_all_products_id()
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+try:
+    import chromadb
+    from chromadb.config import Settings
+    from chromadb.errors import NotFoundError  # noqa: F401
+except ImportError as e:
+    raise ImportError(
+        "No Chroma client is installed. Install the HTTP client with `uv sync --extra http` "
+        "or the full package for the embedded mode with `uv sync --extra embedded`."
+    ) from e
+
+VECTOR_STORE_MODES = ("http", "embedded")
+
+
+def create_chroma_client(mode: str = "http", host: str = "localhost", port: int | str = 8000, path: str | Path | None = None):
+    """
+    Creates the Chroma client for the configured vector store mode.
+
+    In `http` mode every call goes to a Chroma server. In `embedded` mode the collection is stored in a local
+    directory and queried in-process (`PersistentClient`), which removes the network hop and the JSON
+    (de)serialization of the embeddings on every request. Both clients expose the same collection API.
+    The embedded mode requires the full `chromadb` package (`embedded` extra) instead of `chromadb-client` (`http` extra).
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+
+    Args:
+        mode (str): `"http"` or `"embedded"`.
+        host (str): The Chroma server host, used in http mode.
+        port (int | str): The Chroma server port, used in http mode.
+        path (str | Path | None): The directory of the local store, required in embedded mode.
+
+    Returns:
+        chromadb.api.ClientAPI: The Chroma client.
+
+    Raises:
+        ValueError: If the mode is unknown or `path` is missing in embedded mode.
+        ImportError: If the embedded mode is requested with only `chromadb-client` installed.
+    """
+    client_settings = Settings(allow_reset=True, anonymized_telemetry=False)
+    if mode == "http":
+        return chromadb.HttpClient(host=host, port=int(port), settings=client_settings)
+    if mode == "embedded":
+        if path is None:
+            raise ValueError("path is required by the embedded vector store")
+        # O chromadb-client só fala com um servidor: o modo embutido requer o pacote completo
+        if getattr(chromadb, "is_client", False):
+            raise ImportError("The embedded vector store requires the full chromadb package: `uv sync --extra embedded`.")
+        Path(path).mkdir(parents=True, exist_ok=True)
+        return chromadb.PersistentClient(path=str(path), settings=client_settings)
+    raise ValueError(f"Unknown vector store mode: {mode!r} (expected one of {VECTOR_STORE_MODES})")
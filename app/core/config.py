@@ -1,7 +1,13 @@
 import pathlib
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+CORE_FOLDER = pathlib.Path(__file__).parent
+APP_FOLDER = CORE_FOLDER.parent
+PROJECT_FOLDER = APP_FOLDER.parent
+CACHE_FOLDER = PROJECT_FOLDER / "data" / "cache"
+
 
 class Settings(BaseSettings):
     CHROMA_HOST: str
@@ -12,6 +18,35 @@ class Settings(BaseSettings):
     DB_URL: str
     API_URL: str
 
+    VECTOR_STORE_MODE: Literal["http", "embedded"] = "http"
+    VECTOR_STORE_PATH: str = str(PROJECT_FOLDER / "data" / "chroma")
+
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = str(CACHE_FOLDER / "llm_cache.db")
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10_000
+    LLM_COMBINED_MODE: bool = False
+
+    PRODUCT_AGGREGATES_PATH: str = str(CACHE_FOLDER / "product_aggregates.db")
+
+    REVIEW_SNAPSHOT_ENABLED: bool = True
+    REVIEW_SNAPSHOT_DIR: str = str(CACHE_FOLDER / "review_snapshot")
+
+    RESULTS_STORE_ENABLED: bool = True
+    RESULTS_STORE_PATH: str = str(CACHE_FOLDER / "results.db")
+
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 300
+    RESULT_CACHE_STALE_SECONDS: int = 3600
+
+    TOP_REVIEWS_K: int = 3
+    TOP_REVIEWS_STRATEGY: Literal["centroid", "mmr"] = "centroid"
+    TOP_REVIEWS_MMR_LAMBDA: float = 0.7
+
+    BATCH_CONCURRENCY: int = 8
+    BATCH_MAX_PRODUCTS: int = 500
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -21,8 +56,4 @@ class Settings(BaseSettings):
     )
 
 
-CORE_FOLDER = pathlib.Path(__file__).parent
-APP_FOLDER = CORE_FOLDER.parent
-PROJECT_FOLDER = APP_FOLDER.parent
-
 settings = Settings(_env_file=PROJECT_FOLDER / ".env")
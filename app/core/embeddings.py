@@ -0,0 +1,161 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+BACKENDS = ("torch", "onnx")
+# Metadados gravados pelo scripts/export_onnx.py ao lado do modelo exportado
+ONNX_METADATA_FILE = "embedder.json"
+
+
+def mean_pooling(hidden_states: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Averages the token embeddings of each sentence, ignoring padding tokens.
+
+    This is the pooling used by `paraphrase-multilingual-MiniLM-L12-v2` (no normalization layer).
+
+    Args:
+        hidden_states (np.ndarray): A (batch, sequence, dim) matrix with the last hidden state of the transformer.
+        attention_mask (np.ndarray): A (batch, sequence) mask with 1 for real tokens and 0 for padding.
+
+    Returns:
+        np.ndarray: A (batch, dim) float32 matrix of sentence embeddings.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden_states.astype(np.float32) * mask).sum(axis=1)
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+class TorchEmbedder:
+    """
+    Sentence embeddings computed with the PyTorch `SentenceTransformer` model.
+
+    `sentence_transformers` (and torch) are imported lazily, so the ONNX backend never pays for them.
+    """
+
+    backend = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, threads: int | None = None):
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    @property
+    def cache_name(self) -> str:
+        # Mantém as chaves do cache de embeddings gerado antes dos backends plugáveis
+        return self.model_name
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encodes sentences into embeddings.
+
+        Args:
+            texts (list[str]): The sentences to encode.
+            batch_size (int): The number of sentences per forward pass.
+
+        Returns:
+            np.ndarray: A (len(texts), dim) float32 matrix of embeddings.
+        """
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings computed with an ONNX export of the model on ONNX Runtime (CPU).
+
+    The model directory is produced by `scripts/export_onnx.py` and contains the ONNX graph (optionally
+    int8 dynamically quantized), the fast tokenizer and a metadata file. Tokenization (truncation and
+    padding) and mean pooling reproduce the `SentenceTransformer` pipeline, without importing torch.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_dir: str | Path, threads: int | None = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        metadata_path = self.model_dir / ONNX_METADATA_FILE
+        if not metadata_path.exists():
+            raise FileNotFoundError(f"{metadata_path} not found; export the model with scripts/export_onnx.py")
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        self.model_name = metadata["model_name"]
+        self.quantized = metadata["quantized"]
+        self.dim = metadata["dim"]
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=metadata["max_length"])
+        self.tokenizer.enable_padding(pad_id=metadata["pad_token_id"], pad_token=metadata["pad_token"])
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.model_dir / metadata["model_file"]), options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    @property
+    def cache_name(self) -> str:
+        # Vetores do modelo quantizado diferem levemente dos do torch e não podem compartilhar o cache
+        return f"{self.model_name}@onnx-{'int8' if self.quantized else 'fp32'}"
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encodes sentences into embeddings.
+
+        Args:
+            texts (list[str]): The sentences to encode.
+            batch_size (int): The number of sentences per inference call.
+
+        Returns:
+            np.ndarray: A (len(texts), dim) float32 matrix of embeddings.
+        """
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start : start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            (hidden_states,) = self.session.run(["last_hidden_state"], feeds)
+            batches.append(mean_pooling(hidden_states, attention_mask))
+        return np.concatenate(batches)
+
+
+def load_embedder(
+    backend: str = "torch",
+    model_name: str = DEFAULT_MODEL_NAME,
+    onnx_dir: str | Path | None = None,
+    threads: int | None = None,
+) -> TorchEmbedder | OnnxEmbedder:
+    """
+    Creates the sentence embedding backend.
+
+    Args:
+        backend (str): `"torch"` (SentenceTransformer) or `"onnx"` (ONNX Runtime).
+        model_name (str): The Hugging Face model name, used by the torch backend.
+        onnx_dir (str | Path | None): The directory exported by `scripts/export_onnx.py`, required by the onnx backend.
+        threads (int | None): The number of CPU threads used by the backend, or None for its default.
+
+    Returns:
+        TorchEmbedder | OnnxEmbedder: The embedding backend.
+
+    Raises:
+        ValueError: If the backend is unknown or `onnx_dir` is missing for the onnx backend.
+    """
+    if backend == "torch":
+        return TorchEmbedder(model_name, threads)
+    if backend == "onnx":
+        if onnx_dir is None:
+            raise ValueError("onnx_dir is required by the onnx backend")
+        return OnnxEmbedder(onnx_dir, threads)
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected one of {BACKENDS})")
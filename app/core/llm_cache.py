@@ -0,0 +1,165 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+
+class LLMCache:
+    """
+    Persistent cache for LLM outputs backed by a local SQLite file.
+
+    Entries are keyed by a fingerprint of the full request sent to the model (model name, prompts
+    and generation parameters), so identical review sets are served without calling the API again.
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted once the cache
+    holds more than `max_entries`. Each entry also records the product it belongs to, which allows
+    the ingest to invalidate a product when new reviews arrive.
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+    """
+
+    def __init__(self, path: str | Path, ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 10_000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                product_id TEXT,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_product ON llm_cache (product_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        """
+        Builds the cache key of an LLM request.
+
+        Args:
+            request (dict): The keyword arguments sent to the chat completions API (model, messages, parameters).
+
+        Returns:
+            str: The SHA-256 hex digest of the canonical JSON representation of the request.
+        """
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Retrieves a cached value, refreshing its position in the LRU order.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Any | None: The cached value, or None if the key is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(value)
+
+    def set(self, key: str, value: Any, product_id: str | None = None) -> None:
+        """
+        Stores a value in the cache, evicting the least recently used entries above `max_entries`.
+
+        Args:
+            key (str): The cache key.
+            value (Any): A JSON serializable value.
+            product_id (str | None, optional): The product the value refers to. Defaults to None.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, product_id, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, product_id, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def invalidate_products(self, product_ids: Iterable[str]) -> int:
+        """
+        Removes every cached entry of the given products.
+
+        Args:
+            product_ids (Iterable[str]): The products whose entries should be removed.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        product_ids = list(product_ids)
+        removed = 0
+        with self._lock:
+            # SQLite limita o número de parâmetros por query
+            for i in range(0, len(product_ids), 500):
+                chunk = product_ids[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(f"DELETE FROM llm_cache WHERE product_id IN ({placeholders})", chunk)
+                removed += cursor.rowcount
+        return removed
+
+    def invalidate_product(self, product_id: str) -> int:
+        """
+        Removes every cached entry of a product.
+
+        Args:
+            product_id (str): The product whose entries should be removed.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        return self.invalidate_products([product_id])
+
+    def clear(self) -> None:
+        """Removes every entry and resets the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The number of hits, misses and stored entries, and the hit rate.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,154 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+# Das leituras locais (snapshot, caches: dezenas de µs) às chamadas ao LLM (vários segundos)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the HTTP requests, until the end of the response body.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "analysis_stage_duration_seconds",
+    "Latency of each stage of the sentiment analysis (vector store queries, LLM calls, similarity, serialization).",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """
+    Measures a stage of the analysis.
+
+    The duration is observed in the `analysis_stage_duration_seconds` histogram and, inside an HTTP
+    request, added to the request timings sent in the `Server-Timing` header (see `MetricsMiddleware`).
+    The timings are kept in a context variable, so stages measured in worker threads (`asyncio.to_thread`)
+    and in tasks created by the request are attributed to it as well, unless the task collects its own
+    timings with `stage_timings`. Repeated stages are summed.
+
+    Args:
+        stage (str): The stage name, used as metric label. Must come from a fixed set of names.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def stage_timings():
+    """
+    Collects the stages measured inside the block in a new timings dict instead of the current request's.
+
+    Used by computations that outlive or are shared between requests, such as the single-flight analyses
+    and the background refreshes of `SentimentService`: their stages are collected apart and then added
+    to every request that awaited them (see `add_timings`), or to none. The histograms are not affected.
+
+    Yields:
+        dict[str, float]: The timings of the stages measured inside the block, in milliseconds.
+    """
+    timings: dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def add_timings(timings: dict[str, float]) -> None:
+    """
+    Adds stage timings collected with `stage_timings` to the timings of the current request, if any.
+
+    Args:
+        timings (dict[str, float]): The duration of each stage, in milliseconds.
+    """
+    current = _request_timings.get()
+    if current is not None:
+        for stage, duration in timings.items():
+            current[stage] = current.get(stage, 0.0) + duration
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    """
+    Formats stage timings as a `Server-Timing` header value.
+
+    Args:
+        timings (dict[str, float]): The duration of each stage, in milliseconds.
+
+    Returns:
+        str: The header value, e.g. `chroma_product_snapshot;dur=12.3, llm_summary;dur=812.0`.
+    """
+    return ", ".join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
+
+
+def metrics_payload() -> tuple[bytes, str]:
+    """
+    Renders every registered metric in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: The response body and its content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that measures the latency of every HTTP request.
+
+    The latency is observed in the `http_request_duration_seconds` histogram, labeled by the route template
+    (not the raw path, to keep the label cardinality bounded) and the status code. The stage timings collected
+    with `timed_stage` while the response headers are prepared are sent in the `Server-Timing` header. In
+    streaming responses the later stages are only observed in the histogram. An analysis shared between
+    concurrent requests reports its stages to each of them, and a background refresh to none.
+    """
+
+    def __init__(self, app, excluded_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            elapsed = time.perf_counter() - start
+            # Em apps montadas (ex.: /mcp) a rota é relativa ao prefixo da montagem
+            route = getattr(scope.get("route"), "path", None)
+            route = scope.get("root_path", "") + route if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+            if timings:
+                stages = ", ".join(f"{stage}={duration:.1f}ms" for stage, duration in timings.items())
+                logger.debug(f"{scope['method']} {route} {status} em {elapsed * 1000:.1f} ms ({stages})")
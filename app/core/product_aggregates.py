@@ -0,0 +1,223 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+# Limite seguro de parâmetros por consulta (SQLITE_MAX_VARIABLE_NUMBER é 999 em versões antigas)
+MAX_QUERY_PARAMS = 900
+
+
+class ProductAggregates:
+    """
+    Per-product aggregates of a review collection, stored in a local SQLite file.
+
+    For each product it keeps the review count, the count of each sentiment label, the sum of the
+    review embeddings (from which the mean embedding is derived) and the first and latest review
+    creation dates. The ingest updates it incrementally after each upsert and the API reads from it,
+    so listing products or computing distributions does not scan the vector database.
+
+    Updates are idempotent per document: every aggregated `doc_id` is recorded in the same
+    transaction, so re-sending a batch after an interrupted ingest does not double count it.
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+    """
+
+    def __init__(self, path: str | Path, collection: str):
+        self.path = Path(path)
+        self.collection = collection
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS product_aggregates (
+                collection TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                review_count INTEGER NOT NULL,
+                sentiment_counts TEXT NOT NULL,
+                embedding_sum BLOB,
+                first_creation_date TEXT,
+                latest_creation_date TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (collection, product_id)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS aggregated_docs (collection TEXT NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (collection, doc_id))"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM product_aggregates WHERE collection = ?", (self.collection,)).fetchone()[0]
+
+    def apply_batch(
+        self,
+        doc_ids: list[str],
+        product_ids: list[str],
+        sentiment_labels: list[str],
+        creation_dates: list[str],
+        embeddings: np.ndarray,
+    ) -> None:
+        """
+        Adds a batch of upserted reviews to the aggregates of their products.
+
+        Args:
+            doc_ids (list[str]): The document IDs of the reviews. Reviews already aggregated are ignored.
+            product_ids (list[str]): The product of each review.
+            sentiment_labels (list[str]): The predicted sentiment label of each review.
+            creation_dates (list[str]): The creation date of each review.
+            embeddings (np.ndarray): The review embeddings, row-aligned with the other arguments.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        with self._lock, self._conn:
+            # Apenas documentos ainda não agregados (INSERT OR IGNORE não altera linhas existentes)
+            new_rows = [
+                i
+                for i, doc_id in enumerate(doc_ids)
+                if self._conn.execute(
+                    "INSERT OR IGNORE INTO aggregated_docs (collection, doc_id) VALUES (?, ?)", (self.collection, doc_id)
+                ).rowcount
+            ]
+            if not new_rows:
+                return
+
+            groups: dict[str, list[int]] = defaultdict(list)
+            for i in new_rows:
+                groups[product_ids[i]].append(i)
+
+            now = time.time()
+            for product_id, rows in groups.items():
+                current = self._conn.execute(
+                    """
+                    SELECT review_count, sentiment_counts, embedding_sum, first_creation_date, latest_creation_date
+                    FROM product_aggregates WHERE collection = ? AND product_id = ?
+                    """,
+                    (self.collection, product_id),
+                ).fetchone()
+
+                dates = [creation_dates[i] for i in rows if creation_dates[i]]
+                counts = Counter(sentiment_labels[i] for i in rows)
+                embedding_sum = embeddings[rows].sum(axis=0)
+                review_count = len(rows)
+                first_date = min(dates, default=None)
+                latest_date = max(dates, default=None)
+
+                if current is not None:
+                    review_count += current[0]
+                    counts.update(json.loads(current[1]))
+                    if current[2] is not None:
+                        embedding_sum = embedding_sum + np.frombuffer(current[2], dtype=np.float64)
+                    first_date = min(filter(None, [first_date, current[3]]), default=None)
+                    latest_date = max(filter(None, [latest_date, current[4]]), default=None)
+
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO product_aggregates
+                    (collection, product_id, review_count, sentiment_counts, embedding_sum, first_creation_date, latest_creation_date, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        self.collection,
+                        product_id,
+                        review_count,
+                        json.dumps(dict(counts)),
+                        embedding_sum.tobytes(),
+                        first_date,
+                        latest_date,
+                        now,
+                    ),
+                )
+
+    def product_ids(self, order_by: str = "review_count") -> list[str]:
+        """
+        Lists the products that have at least one review.
+
+        Args:
+            order_by (str, optional): "review_count" to list the most reviewed products first, or
+                "latest_creation_date" to list the most recently reviewed first. Defaults to "review_count".
+
+        Returns:
+            list[str]: The product IDs, in descending order of the chosen column.
+        """
+        if order_by not in ("review_count", "latest_creation_date"):
+            raise ValueError(f"Ordenação inválida: {order_by}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT product_id FROM product_aggregates WHERE collection = ? ORDER BY {order_by} DESC, product_id",
+                (self.collection,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, product_id: str) -> dict | None:
+        """
+        Retrieves the aggregates of a product.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            dict | None: A dictionary with `review_count`, `sentiment_counts`, `mean_embedding`,
+                `first_creation_date` and `latest_creation_date`, or None if the product is unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT review_count, sentiment_counts, embedding_sum, first_creation_date, latest_creation_date
+                FROM product_aggregates WHERE collection = ? AND product_id = ?
+                """,
+                (self.collection, product_id),
+            ).fetchone()
+        return self._from_row(row) if row is not None else None
+
+    def get_many(self, product_ids: list[str]) -> dict[str, dict]:
+        """
+        Retrieves the aggregates of several products with one `IN (...)` query per chunk of IDs.
+
+        Args:
+            product_ids (list[str]): The unique identifiers of the products.
+
+        Returns:
+            dict[str, dict]: The aggregates of each known product, in the format of `get`. Unknown products are omitted.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        rows = []
+        with self._lock:
+            # Em lotes para ficar abaixo do limite de parâmetros por consulta do SQLite
+            for start in range(0, len(product_ids), MAX_QUERY_PARAMS):
+                chunk = product_ids[start : start + MAX_QUERY_PARAMS]
+                rows += self._conn.execute(
+                    f"""
+                    SELECT product_id, review_count, sentiment_counts, embedding_sum, first_creation_date, latest_creation_date
+                    FROM product_aggregates WHERE collection = ? AND product_id IN ({", ".join("?" * len(chunk))})
+                    """,
+                    (self.collection, *chunk),
+                ).fetchall()
+        return {row[0]: self._from_row(row[1:]) for row in rows}
+
+    @staticmethod
+    def _from_row(row: tuple) -> dict:
+        review_count, sentiment_counts, embedding_sum, first_date, latest_date = row
+        mean_embedding = None
+        if embedding_sum is not None and review_count:
+            mean_embedding = (np.frombuffer(embedding_sum, dtype=np.float64) / review_count).astype(np.float32)
+        return {
+            "review_count": review_count,
+            "sentiment_counts": Counter(json.loads(sentiment_counts)),
+            "mean_embedding": mean_embedding,
+            "first_creation_date": first_date,
+            "latest_creation_date": latest_date,
+        }
+
+    def reset(self) -> None:
+        """Removes every aggregate of the collection."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM product_aggregates WHERE collection = ?", (self.collection,))
+            self._conn.execute("DELETE FROM aggregated_docs WHERE collection = ?", (self.collection,))
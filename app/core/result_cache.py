@@ -0,0 +1,113 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Bounded in-process LRU cache of analysis results, kept in front of the results store.
+
+    Each entry is stored with the fingerprint of the product's review set (see `product_fingerprint`) and is
+    only served while the fingerprint still matches, so new reviews for a product invalidate it at the next
+    lookup. Entries older than `ttl_seconds` are still served as stale for `stale_seconds` more, so the
+    caller can answer at once and refresh the entry in the background (stale-while-revalidate). The least
+    recently used entries are evicted once the cache holds more than `max_entries`.
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300, stale_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[str, dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, product_id: str, fingerprint: str | None) -> tuple[dict, bool] | None:
+        """
+        Retrieves the cached result of a product if it was computed for the given review set.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            fingerprint (str | None): The current fingerprint of the product's review set.
+
+        Returns:
+            tuple[dict, bool] | None: A copy of the cached result and whether it is stale (older than
+                `ttl_seconds`), or None if it is missing, computed for another review set or too old.
+        """
+        if fingerprint is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_fingerprint, result, created_at = entry
+            age = now - created_at
+            if entry_fingerprint != fingerprint or age > self.ttl_seconds + self.stale_seconds:
+                del self._entries[product_id]
+                if entry_fingerprint != fingerprint:
+                    self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(product_id)
+            stale = age > self.ttl_seconds
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        # Cópia para que quem chamou possa alterar o resultado sem afetar o cache
+        return copy.deepcopy(result), stale
+
+    def put(self, product_id: str, fingerprint: str, result: dict) -> None:
+        """
+        Stores the result of a product, replacing any previous one and evicting the least recently used entries.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            fingerprint (str): The fingerprint of the review set the result was computed from.
+            result (dict): The analysis result.
+        """
+        with self._lock:
+            self._entries[product_id] = (fingerprint, copy.deepcopy(result), time.monotonic())
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > max(1, self.max_entries):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The number of entries, fresh and stale hits, misses, entries invalidated by a new review set
+                and evicted by the size bound, and the hit rate (fresh and stale hits).
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def product_fingerprint(aggregate: dict | None) -> str | None:
+    """
+    Builds the fingerprint of a product's review set from its aggregates.
+
+    Args:
+        aggregate (dict | None): The product aggregates, as returned by `ProductAggregates.get`.
+
+    Returns:
+        str | None: `"<review_count>:<latest_creation_date>"`, or None if the aggregates are not available.
+    """
+    if aggregate is None or not aggregate["review_count"]:
+        return None
+    return f"{aggregate['review_count']}:{aggregate['latest_creation_date'] or ''}"
+
+
+class ResultsStore:
+    """
+    Materialized sentiment analyses stored in a local SQLite file.
+
+    Each result is stored with the fingerprint of the product's review set at the time it was computed
+    (see `product_fingerprint`). A stored result is only served while the fingerprint still matches, so
+    new reviews ingested for a product make its result stale without any explicit invalidation.
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+    """
+
+    def __init__(self, path: str | Path, collection: str):
+        self.path = Path(path)
+        self.collection = collection
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_results (
+                collection TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (collection, product_id)
+            )
+            """
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analysis_results WHERE collection = ?", (self.collection,)).fetchone()[0]
+
+    def get(self, product_id: str, fingerprint: str | None) -> dict | None:
+        """
+        Retrieves the stored result of a product if it was computed for the given review set.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            fingerprint (str | None): The current fingerprint of the product's review set.
+
+        Returns:
+            dict | None: The stored result, or None if it is missing or stale.
+        """
+        if fingerprint is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM analysis_results WHERE collection = ? AND product_id = ? AND fingerprint = ?",
+                (self.collection, product_id, fingerprint),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, product_id: str, fingerprint: str, result: dict) -> None:
+        """
+        Stores the result of a product, replacing any previous one.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            fingerprint (str): The fingerprint of the review set the result was computed from.
+            result (dict): A JSON serializable analysis result.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_results (collection, product_id, fingerprint, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.collection, product_id, fingerprint, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+
+    def fingerprints(self) -> dict[str, str]:
+        """
+        Lists the fingerprint of every stored result.
+
+        Returns:
+            dict[str, str]: A mapping of product ID to the fingerprint its result was computed from.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT product_id, fingerprint FROM analysis_results WHERE collection = ?", (self.collection,)).fetchall()
+        return dict(rows)
+
+    def reset(self) -> None:
+        """Removes every stored result of the collection."""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_results WHERE collection = ?", (self.collection,))
@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+# Linhas copiadas por vez ao ordenar a matriz de embeddings por produto
+COPY_CHUNK = 65_536
+
+
+def write_review_snapshot(
+    directory: str | Path,
+    collection: str,
+    batches: Iterable[dict],
+    dtype: str = "float32",
+    keep: int = 2,
+) -> dict:
+    """
+    Writes a read-optimized, memory-mappable snapshot of a review collection.
+
+    The reviews are streamed to temporary files, then sorted by product so that the reviews of a product
+    are a contiguous range of rows. The snapshot is a set of `.npy` files: the embedding matrix, the sorted
+    unique product IDs with their row offsets, the sentiment label codes, the creation dates and the review
+    documents (a UTF-8 blob with per-row offsets). It is written to a new version directory and published by
+    atomically replacing the `CURRENT` pointer, so readers never see a partially written snapshot.
+
+    Args:
+        directory (str | Path): The root directory of the snapshots.
+        collection (str): The collection name. Each collection has its own subdirectory.
+        batches (Iterable[dict]): Batches in the format returned by Chroma's `collection.get`, with
+            `documents`, `metadatas` and `embeddings`.
+        dtype (str, optional): The dtype of the stored embeddings, "float32" or "float16". Defaults to "float32".
+        keep (int, optional): The number of versions kept on disk, including the new one. Older versions
+            may still be mapped by running readers, which keep working until they reload. Defaults to 2.
+
+    Returns:
+        dict: The metadata of the written snapshot.
+    """
+    root = Path(directory) / collection
+    root.mkdir(parents=True, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    target = root / version
+    target.mkdir()
+    try:
+        metadata = _write_version(target, collection, version, batches, dtype)
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    # Publica a nova versão trocando o ponteiro de forma atômica
+    pointer = root / f"{CURRENT_FILE}.tmp"
+    pointer.write_text(version, encoding="utf-8")
+    pointer.replace(root / CURRENT_FILE)
+
+    versions = sorted((p for p in root.iterdir() if p.is_dir() and p.name.startswith("v")), key=lambda p: int(p.name[1:]))
+    for old in versions[: -max(1, keep)]:
+        shutil.rmtree(old, ignore_errors=True)
+    return metadata
+
+
+def _byte_strings(values: list[str]) -> np.ndarray:
+    if not values:
+        return np.empty(0, dtype="S1")
+    return np.array([value.encode("utf-8") for value in values], dtype=np.bytes_)
+
+
+def _write_version(target: Path, collection: str, version: str, batches: Iterable[dict], dtype: str) -> dict:
+    product_ids: list[str] = []
+    labels: list[str] = []
+    dates: list[str] = []
+    doc_lengths: list[int] = []
+    dim = 0
+
+    with tempfile.TemporaryDirectory(dir=target.parent) as tmp:
+        raw_embeddings = Path(tmp) / "embeddings.f32"
+        raw_documents = Path(tmp) / "documents.bin"
+        with open(raw_embeddings, "wb") as emb_file, open(raw_documents, "wb") as doc_file:
+            for batch in batches:
+                documents = batch.get("documents") or []
+                if not documents:
+                    continue
+                embeddings = np.ascontiguousarray(batch["embeddings"], dtype=np.float32)
+                dim = embeddings.shape[1]
+                emb_file.write(embeddings.tobytes())
+                for document, meta in zip(documents, batch["metadatas"]):
+                    encoded = (document or "").encode("utf-8")
+                    doc_file.write(encoded)
+                    doc_lengths.append(len(encoded))
+                    product_ids.append(meta["product_id"])
+                    labels.append(meta.get("sentiment_label") or "")
+                    dates.append(meta.get("creation_date") or "")
+
+        rows = len(product_ids)
+        pids = _byte_strings(product_ids)
+        order = np.argsort(pids, kind="stable")
+        sorted_pids = pids[order]
+        unique_pids, starts = np.unique(sorted_pids, return_index=True)
+        np.save(target / "product_ids.npy", unique_pids)
+        np.save(target / "product_offsets.npy", np.append(starts, rows).astype(np.int64))
+
+        label_names = sorted(set(labels))
+        codes = {label: i for i, label in enumerate(label_names)}
+        np.save(target / "labels.npy", np.array([codes[label] for label in labels], dtype=np.uint8)[order])
+        np.save(target / "dates.npy", _byte_strings(dates)[order])
+
+        out = np.lib.format.open_memmap(target / "embeddings.npy", mode="w+", dtype=dtype, shape=(rows, dim))
+        if rows and dim:
+            src = np.memmap(raw_embeddings, dtype=np.float32, mode="r", shape=(rows, dim))
+            for start in range(0, rows, COPY_CHUNK):
+                out[start : start + COPY_CHUNK] = src[order[start : start + COPY_CHUNK]]
+            del src
+        out.flush()
+        del out
+
+        lengths = np.array(doc_lengths, dtype=np.int64)
+        src_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        doc_offsets = np.concatenate([[0], np.cumsum(lengths[order])]).astype(np.int64)
+        np.save(target / "doc_offsets.npy", doc_offsets)
+        blob = np.lib.format.open_memmap(target / "documents.npy", mode="w+", dtype=np.uint8, shape=(int(doc_offsets[-1]),))
+        if blob.size:
+            src = np.memmap(raw_documents, dtype=np.uint8, mode="r")
+            for new_row, old_row in enumerate(order):
+                blob[doc_offsets[new_row] : doc_offsets[new_row + 1]] = src[src_offsets[old_row] : src_offsets[old_row + 1]]
+            del src
+        blob.flush()
+        del blob
+
+    metadata = {
+        "collection": collection,
+        "version": version,
+        "rows": rows,
+        "products": len(unique_pids),
+        "dim": dim,
+        "dtype": dtype,
+        "labels": label_names,
+        "created_at": time.time(),
+    }
+    (target / "meta.json").write_text(json.dumps(metadata), encoding="utf-8")
+    return metadata
+
+
+class ReviewSnapshot:
+    """
+    Lazy, memory-mapped reader of the review snapshot written by the ingest (see `write_review_snapshot`).
+
+    The arrays are opened with `mmap_mode="r"` on first use, so uvicorn workers share the same pages of the
+    OS page cache instead of each holding its own copy. A product lookup is a binary search on the sorted
+    product IDs followed by zero-copy slices of the arrays. The `CURRENT` pointer is checked on every access
+    (a single `stat`) and a new version published by the ingest is picked up without restarting the API.
+
+    This module does not depend on the application settings so it can be shared with the scripts.
+    """
+
+    def __init__(self, directory: str | Path, collection: str):
+        self.root = Path(directory) / collection
+        self._pointer_path = self.root / CURRENT_FILE
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pointer: tuple[int, int] | None = None
+        self._data: dict | None = None
+
+    def _current(self) -> dict | None:
+        try:
+            stat = os.stat(self._pointer_path)
+        except FileNotFoundError:
+            return None
+        # O ponteiro é substituído (novo inode) a cada versão publicada
+        pointer = (stat.st_ino, stat.st_mtime_ns)
+        if pointer == self._pointer:
+            return self._data
+
+        with self._lock:
+            if pointer != self._pointer:
+                self._data = self._load()
+                self._pointer = pointer
+        return self._data
+
+    def _load(self) -> dict | None:
+        version = self._pointer_path.read_text(encoding="utf-8").strip()
+        path = self.root / version
+        metadata = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if not metadata["rows"]:
+            return {"metadata": metadata}
+
+        def load(name: str) -> np.ndarray:
+            # A view como ndarray mantém o mapeamento e evita o overhead de indexação do np.memmap
+            return np.load(path / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+
+        return {
+            "metadata": metadata,
+            "product_ids": load("product_ids"),
+            "product_offsets": load("product_offsets"),
+            "embeddings": load("embeddings"),
+            "labels": load("labels"),
+            "label_names": metadata["labels"],
+            "dates": load("dates"),
+            "doc_offsets": load("doc_offsets"),
+            "documents": load("documents"),
+        }
+
+    @property
+    def metadata(self) -> dict | None:
+        """The metadata of the current snapshot version, or None if no snapshot was written yet."""
+        data = self._current()
+        return data["metadata"] if data is not None else None
+
+    def get(self, product_id: str) -> dict | None:
+        """
+        Retrieves the reviews of a product from the snapshot.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            dict | None: A dictionary with `documents`, `sentiment_labels`, `creation_dates` and `embeddings`
+                (a read-only view of the memory-mapped matrix), or None if the product is not in the snapshot.
+        """
+        data = self._current()
+        if data is None or "product_ids" not in data:
+            self.misses += 1
+            return None
+
+        key = product_id.encode("utf-8")
+        index = int(np.searchsorted(data["product_ids"], key))
+        if index >= len(data["product_ids"]) or data["product_ids"][index] != key:
+            self.misses += 1
+            return None
+
+        start, end = data["product_offsets"][index : index + 2].tolist()
+        # Os documentos do produto são contíguos no blob: uma única cópia, depois fatiada
+        doc_offsets = data["doc_offsets"][start : end + 1].tolist()
+        blob = data["documents"][doc_offsets[0] : doc_offsets[-1]].tobytes()
+        base = doc_offsets[0]
+        label_names = data["label_names"]
+        self.hits += 1
+        return {
+            "documents": [blob[a - base : b - base].decode("utf-8") for a, b in zip(doc_offsets, doc_offsets[1:])],
+            "sentiment_labels": [label_names[code] for code in data["labels"][start:end].tolist()],
+            "creation_dates": [date.decode("utf-8") for date in data["dates"][start:end].tolist()],
+            "embeddings": data["embeddings"][start:end],
+        }
+
+    def stats(self) -> dict:
+        """
+        Returns the snapshot usage counters.
+
+        Returns:
+            dict: The current version, its row and product counts, and the number of lookups served (hits) or not (misses).
+        """
+        metadata = self.metadata
+        return {
+            "version": metadata["version"] if metadata else None,
+            "rows": metadata["rows"] if metadata else 0,
+            "products": metadata["products"] if metadata else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,11 +1,11 @@
-import chromadb
-from chromadb.config import Settings
+from core.chroma_client import create_chroma_client
 from core.config import settings
 
-CHROMA_CLIENT = client = chromadb.HttpClient(
+CHROMA_CLIENT = client = create_chroma_client(
+    mode=settings.VECTOR_STORE_MODE,
     host=settings.CHROMA_HOST,
     port=settings.CHROMA_PORT,
-    settings=Settings(allow_reset=True),
+    path=settings.VECTOR_STORE_PATH,
 )
 
 COLLECTION = CHROMA_CLIENT.get_or_create_collection(settings.COLLECTION)
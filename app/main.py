@@ -1,6 +1,8 @@
 import uvicorn
 from api.v1.root import router
+from core.metrics import MetricsMiddleware, metrics_payload
 from fastapi import FastAPI
+from fastapi.responses import Response
 from mcp_server.sentiment import mcp
 
 http_app = mcp.http_app(path="/")
@@ -8,6 +10,14 @@ http_app = mcp.http_app(path="/")
 app = FastAPI(title="API - Sentiment Analysis DP6", version="1.0.0", lifespan=http_app.lifespan)
 app.include_router(router, prefix="/api/v1")
 app.mount("/mcp", http_app)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas no formato do Prometheus: latência por rota e por etapa da análise."""
+    body, content_type = metrics_payload()
+    return Response(body, media_type=content_type)
 
 
 if __name__ == "__main__":
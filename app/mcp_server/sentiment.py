@@ -1,27 +1,35 @@
+from core.config import settings
 from fastmcp import FastMCP
 from loguru import logger
+from models.sentiment_analysis import BatchSentimentAnalysisItem, SentimentAnalysisResponse
 from services.sentiment_service import get_sentiment_service
 
 mcp = FastMCP("Sentiment-MCP")
 
 
 @mcp.tool
-def product_sentiment(product_id: str) -> dict:
+async def product_sentiment(product_id: str) -> dict:
     """
     Retorna distribuição de sentimentos, ponto positivo/negativo dominante
     e top-3 reviews de um product_id.
     """
     service = get_sentiment_service()
-    result = service.analyze_sentiment(product_id)
+    result = await service.analyze_sentiment(product_id)
     if "error" in result:
         logger.error(f"Erro ao analisar sentimento para o produto {product_id}: {result['error']}")
         return f"Erro ao analisar sentimento para o produto {product_id}: {result['error']}"
 
-    return {
-        "sentiment": result["predominant_sentiment"],
-        "summary": result["summary"],
-        "sentiment_distrib": result["sentiment_distrib"],
-        "positive_points": result["positive_points"],
-        "negative_points": result["negative_points"],
-        "top_reviews": result["top_reviews"],
-    }
+    return SentimentAnalysisResponse.from_result(result).model_dump()
+
+
+@mcp.tool
+async def products_sentiment(product_ids: list[str]) -> list[dict]:
+    """
+    Retorna a análise de sentimento (distribuição, resumo, pontos positivos/negativos
+    e top-3 reviews) de vários product_ids de uma vez, um item por produto.
+    """
+    if len(product_ids) > settings.BATCH_MAX_PRODUCTS:
+        raise ValueError(f"Máximo de {settings.BATCH_MAX_PRODUCTS} produtos por chamada.")
+
+    service = get_sentiment_service()
+    return [BatchSentimentAnalysisItem.from_result(result).model_dump() async for result in service.analyze_sentiment_batch(product_ids)]
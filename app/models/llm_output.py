@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class CombinedReviewAnalysis(BaseModel):
+    resumo: str = Field(..., min_length=1, description="Resumo dos reviews do produto.")
+    pontos_positivos: list[str] = Field(default_factory=list, description="Pontos positivos do produto.")
+    pontos_negativos: list[str] = Field(default_factory=list, description="Pontos negativos do produto.")
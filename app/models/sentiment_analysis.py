@@ -10,4 +10,33 @@ class SentimentAnalysisResponse(BaseModel):
     )
     positive_points: list[str] = Field(..., description="Pontos positivos do produto")
     negative_points: list[str] = Field(..., description="Pontos negativos do produto")
-    top_reviews: list[str] = Field(..., description="Top 3 reviews mais representativos baseados em embedding.")
+    top_reviews: list[str] = Field(..., description="Reviews mais representativos do produto (top 3 por padrão) baseados em embedding.")
+
+    @classmethod
+    def from_result(cls, result: dict) -> "SentimentAnalysisResponse":
+        """Builds the response from the dictionary returned by `SentimentService.analyze_sentiment`."""
+        return cls(
+            sentiment=result["predominant_sentiment"],
+            summary=result["summary"],
+            sentiment_distrib=result["sentiment_distrib"],
+            positive_points=result["positive_points"],
+            negative_points=result["negative_points"],
+            top_reviews=result["top_reviews"],
+        )
+
+
+class BatchSentimentAnalysisRequest(BaseModel):
+    product_ids: list[str] = Field(..., min_length=1, description="IDs dos produtos a serem analisados.")
+
+
+class BatchSentimentAnalysisItem(BaseModel):
+    product_id: str = Field(..., description="ID do produto analisado.")
+    result: SentimentAnalysisResponse | None = Field(None, description="Resultado da análise, ausente em caso de erro.")
+    error: str | None = Field(None, description="Mensagem de erro, caso o produto não tenha sido analisado.")
+
+    @classmethod
+    def from_result(cls, result: dict) -> "BatchSentimentAnalysisItem":
+        """Builds a batch item from a result yielded by `SentimentService.analyze_sentiment_batch`."""
+        if "error" in result:
+            return cls(product_id=result["product_id"], error=result["error"])
+        return cls(product_id=result["product_id"], result=SentimentAnalysisResponse.from_result(result))
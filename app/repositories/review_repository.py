@@ -1,20 +1,88 @@
+from collections import Counter
+from dataclasses import dataclass, field
 from functools import lru_cache
 
+import numpy as np
+from core.config import settings
+from core.metrics import timed_stage
+from core.product_aggregates import ProductAggregates
+from core.results_store import product_fingerprint
+from core.review_snapshot import ReviewSnapshot
 from core.vectordb import COLLECTION
 
 
+@dataclass
+class ProductSnapshot:
+    """
+    In-memory view of every review stored for a single product.
+
+    Built from a single vector database round trip, it holds the review documents together
+    with their sentiment labels, creation dates and embeddings (row-aligned), so that every
+    aggregate needed by the analysis can be derived without querying the collection again.
+    """
+
+    product_id: str
+    documents: list[str] = field(default_factory=list)
+    sentiment_labels: list[str] = field(default_factory=list)
+    creation_dates: list[str] = field(default_factory=list)
+    embeddings: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.documents) == 0
+
+    def sentiment_counts(self) -> Counter:
+        """
+        Counts the reviews of the product by sentiment label.
+
+        Returns:
+            Counter: A mapping of sentiment label to the number of reviews with that label.
+        """
+        return Counter(self.sentiment_labels)
+
+    def latest_reviews_by_sentiment(self, sentiment: str, limit: int = 5) -> list[str]:
+        """
+        Returns the most recent review documents with the given sentiment label.
+
+        Args:
+            sentiment (str): The sentiment label to filter reviews (e.g., "positivo", "negativo").
+            limit (int, optional): The maximum number of reviews to return. Defaults to 5.
+
+        Returns:
+            list[str]: The latest review documents, ordered from newest to oldest.
+        """
+        matches = [
+            (date or "", doc) for doc, label, date in zip(self.documents, self.sentiment_labels, self.creation_dates) if label == sentiment
+        ]
+        # Ordena pela data de criação para pegar os mais recentes
+        matches.sort(key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in matches[:limit]]
+
+
 class ReviewRepository:
-    def __init__(self):
+    def __init__(self, aggregates: ProductAggregates | None = None, snapshot: ReviewSnapshot | None = None):
         self.collection = COLLECTION
+        self.aggregates = aggregates
+        self.snapshot = snapshot
 
     def get_all_products_id(self) -> list[str]:
         """
         Retrieves a list of all unique product IDs from the review collection.
 
+        The IDs are served from the per-product aggregates maintained by the ingest when available,
+        falling back to a scan of the collection metadata otherwise.
+
         Returns:
             list[str]: A list of unique product IDs.
         """
-        products = self.collection.get(include=["metadatas"])
+        if self.aggregates is not None and len(self.aggregates) > 0:
+            return self.aggregates.product_ids()
+
+        with timed_stage("chroma_all_products"):
+            products = self.collection.get(include=["metadatas"])
         if not products or "metadatas" not in products:
             return []
 
@@ -30,7 +98,8 @@ class ReviewRepository:
         Returns:
             bool: True if there is at least one review for the specified product, False otherwise.
         """
-        reviews = self.collection.get(where={"product_id": product_id})
+        with timed_stage("chroma_has_reviews"):
+            reviews = self.collection.get(where={"product_id": product_id})
         return bool(reviews.get("documents", []))
 
     def get_reviews_by_product_id(self, product_id: str) -> list[dict]:
@@ -44,7 +113,8 @@ class ReviewRepository:
             list[dict]: A list of dictionaries, each containing a 'document' (the review content)
                         and its corresponding 'metadata'.
         """
-        reviews = self.collection.get(where={"product_id": product_id}, include=["documents", "metadatas"])
+        with timed_stage("chroma_reviews"):
+            reviews = self.collection.get(where={"product_id": product_id}, include=["documents", "metadatas"])
         return [{"document": doc, "metadata": meta} for doc, meta in zip(reviews.get("documents", []), reviews.get("metadatas", []))]
 
     def get_product_sentiments(self, product_id: str) -> list[str]:
@@ -57,7 +127,8 @@ class ReviewRepository:
         Returns:
             list[str]: A list of sentiment labels extracted from the product's reviews.
         """
-        reviews = self.collection.get(where={"product_id": product_id}, include=["metadatas"])
+        with timed_stage("chroma_sentiments"):
+            reviews = self.collection.get(where={"product_id": product_id}, include=["metadatas"])
         return [meta["sentiment_label"] for meta in reviews.get("metadatas", [])]
 
     def get_latest_reviews_by_sentiment(self, product_id: str, sentiment: str, limit: int = 5):
@@ -72,10 +143,11 @@ class ReviewRepository:
         Returns:
             list: A list of the most recent review documents matching the specified product and sentiment.
         """
-        reviews = self.collection.get(
-            where={"$and": [{"product_id": product_id}, {"sentiment_label": sentiment}]},
-            include=["documents", "metadatas"],
-        )
+        with timed_stage("chroma_latest_reviews"):
+            reviews = self.collection.get(
+                where={"$and": [{"product_id": product_id}, {"sentiment_label": sentiment}]},
+                include=["documents", "metadatas"],
+            )
 
         documents = reviews.get("documents", [])
         metadatas = reviews.get("metadatas", [])
@@ -92,41 +164,129 @@ class ReviewRepository:
 
         return [doc for doc, _ in sorted_reviews[:limit]]
 
-    def get_embeddings_by_product_id(self, product_id: str):
+    def get_product_aggregate(self, product_id: str) -> dict | None:
         """
-        Retrieves the embeddings associated with a specific product ID.
+        Retrieves the precomputed aggregates of a product (review count, sentiment counts, mean embedding, dates).
 
         Args:
-            product_id (str): The unique identifier of the product for which embeddings are to be retrieved.
+            product_id (str): The unique identifier of the product.
 
         Returns:
-            list: A list of embeddings corresponding to the given product ID. Returns an empty list if no embeddings are found.
+            dict | None: The product aggregates, or None if they are not available.
         """
-        embeddings = self.collection.get(where={"product_id": product_id}, include=["embeddings"]).get("embeddings", [])
-        return embeddings
+        if self.aggregates is None:
+            return None
+        with timed_stage("aggregates"):
+            return self.aggregates.get(product_id)
 
-    def get_review_by_similarity(self, query_embeddings: list, n_results: int = 3):
+    def get_product_aggregates(self, product_ids: list[str]) -> dict[str, dict]:
         """
-        Retrieves the most similar reviews based on the provided query embeddings.
+        Retrieves the precomputed aggregates of several products with a single batched lookup.
 
         Args:
-            query_embeddings (list): A list of embeddings representing the query to compare against stored reviews.
-            n_results (int, optional): The number of most similar reviews to retrieve. Defaults to 3.
+            product_ids (list[str]): The unique identifiers of the products.
 
         Returns:
-            list: A list of documents corresponding to the most similar reviews. Returns an empty list if no documents are found.
+            dict[str, dict]: The aggregates of each product that has them, in the format of `get_product_aggregate`.
         """
-        results = self.collection.query(
-            query_embeddings=query_embeddings,
-            n_results=n_results,
-            include=["documents"],
+        if self.aggregates is None:
+            return {}
+        with timed_stage("aggregates"):
+            return self.aggregates.get_many(product_ids)
+
+    def _snapshot_of(self, product_id: str, aggregate: dict | None) -> ProductSnapshot | None:
+        # Lê do snapshot memory-mapped gerado pelo ingest, desde que ele tenha a mesma impressão digital
+        # (quantidade de reviews e data do mais recente) que os agregados usados pelos caches. Sem
+        # agregados não há como saber se o snapshot está atualizado e o produto é lido do Chroma
+        if self.snapshot is None or aggregate is None:
+            return None
+        with timed_stage("review_snapshot"):
+            rows = self.snapshot.get(product_id)
+        if rows is None:
+            return None
+        snapshot_fingerprint = product_fingerprint(
+            {"review_count": len(rows["documents"]), "latest_creation_date": max(filter(None, rows["creation_dates"]), default=None)}
         )
-        documents = results.get("documents")
-        if not documents:
-            return []
-        return documents[0]
+        fingerprint = product_fingerprint(aggregate)
+        if fingerprint is None or snapshot_fingerprint != fingerprint:
+            return None
+        embeddings = np.asarray(rows.pop("embeddings"), dtype=np.float32)
+        return ProductSnapshot(product_id=product_id, embeddings=embeddings, **rows)
+
+    def get_product_snapshot(self, product_id: str) -> ProductSnapshot:
+        """
+        Fetches documents, metadatas and embeddings of a product in a single query.
+
+        The product is served from the memory-mapped review snapshot when it is up to date, without
+        querying the vector database.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            ProductSnapshot: The product's reviews. Empty if the product has no reviews.
+        """
+        aggregate = self.get_product_aggregate(product_id) if self.snapshot is not None else None
+        if (snapshot := self._snapshot_of(product_id, aggregate)) is not None:
+            return snapshot
+        with timed_stage("chroma_product_snapshot"):
+            reviews = self.collection.get(where={"product_id": product_id}, include=["documents", "metadatas", "embeddings"])
+        return self._build_snapshots(reviews, [product_id])[product_id]
+
+    def get_product_snapshots(self, product_ids: list[str]) -> dict[str, ProductSnapshot]:
+        """
+        Fetches the reviews of several products with a single `$in` query and groups them by product.
+
+        Products that are up to date in the memory-mapped review snapshot are served from it and only the
+        others are queried.
+
+        Args:
+            product_ids (list[str]): The unique identifiers of the products.
+
+        Returns:
+            dict[str, ProductSnapshot]: A snapshot for each requested product. Products without reviews get an empty snapshot.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        aggregates = self.get_product_aggregates(product_ids) if self.snapshot is not None else {}
+        snapshots = {}
+        for product_id in product_ids:
+            if (snapshot := self._snapshot_of(product_id, aggregates.get(product_id))) is not None:
+                snapshots[product_id] = snapshot
+        missing = [product_id for product_id in product_ids if product_id not in snapshots]
+        if missing:
+            with timed_stage("chroma_product_snapshots"):
+                reviews = self.collection.get(
+                    where={"product_id": {"$in": missing}},
+                    include=["documents", "metadatas", "embeddings"],
+                )
+            snapshots.update(self._build_snapshots(reviews, missing))
+        return {product_id: snapshots[product_id] for product_id in product_ids}
+
+    @staticmethod
+    def _build_snapshots(reviews: dict, product_ids: list[str]) -> dict[str, ProductSnapshot]:
+        documents = reviews.get("documents") or []
+        metadatas = reviews.get("metadatas") or []
+        embeddings = reviews.get("embeddings")
+        embeddings = np.asarray(embeddings, dtype=np.float32) if embeddings is not None and len(documents) else None
+
+        rows: dict[str, list[int]] = {product_id: [] for product_id in product_ids}
+        for i, meta in enumerate(metadatas):
+            rows.setdefault(meta.get("product_id"), []).append(i)
+
+        return {
+            product_id: ProductSnapshot(
+                product_id=product_id,
+                documents=[documents[i] for i in rows[product_id]],
+                sentiment_labels=[metadatas[i].get("sentiment_label") for i in rows[product_id]],
+                creation_dates=[metadatas[i].get("creation_date", "") for i in rows[product_id]],
+                embeddings=embeddings[rows[product_id]] if embeddings is not None else np.empty((0, 0), dtype=np.float32),
+            )
+            for product_id in product_ids
+        }
 
 
 @lru_cache()
 def get_review_repository():
-    return ReviewRepository()
+    aggregates = ProductAggregates(settings.PRODUCT_AGGREGATES_PATH, settings.COLLECTION)
+    snapshot = ReviewSnapshot(settings.REVIEW_SNAPSHOT_DIR, settings.COLLECTION) if settings.REVIEW_SNAPSHOT_ENABLED else None
+    return ReviewRepository(aggregates=aggregates, snapshot=snapshot)
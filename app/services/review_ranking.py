@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def rank_by_centroid(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Ranks embeddings by cosine similarity to their centroid (mean embedding).
+
+    Args:
+        embeddings (np.ndarray): A (n, dim) matrix of review embeddings.
+
+    Returns:
+        np.ndarray: The row indices ordered from the most to the least similar to the centroid.
+    """
+    normalized = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    centroid = _normalize_rows(normalized.mean(axis=0))
+    return np.argsort(-(normalized @ centroid), kind="stable")
+
+
+def select_mmr(embeddings: np.ndarray, k: int, lambda_: float = 0.7) -> list[int]:
+    """
+    Selects representative and diverse embeddings with Maximal Marginal Relevance (MMR).
+
+    At each step it picks the row that maximizes `lambda_ * sim(row, centroid) - (1 - lambda_) * max sim(row, selected)`.
+
+    Args:
+        embeddings (np.ndarray): A (n, dim) matrix of review embeddings.
+        k (int): The number of rows to select.
+        lambda_ (float, optional): Trade-off between representativeness (1.0) and diversity (0.0). Defaults to 0.7.
+
+    Returns:
+        list[int]: The selected row indices, in selection order.
+    """
+    normalized = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    relevance = normalized @ _normalize_rows(normalized.mean(axis=0))
+    k = min(k, normalized.shape[0])
+
+    selected: list[int] = []
+    redundancy = np.full(normalized.shape[0], -np.inf, dtype=np.float32)
+    available = np.ones(normalized.shape[0], dtype=bool)
+    for _ in range(k):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, normalized @ normalized[best])
+    return selected
@@ -1,29 +1,81 @@
+import asyncio
 import json
-from collections import Counter
 from functools import lru_cache
 
-import numpy as np
 from core.config import settings
+from core.llm_cache import LLMCache
+from core.metrics import add_timings, stage_timings, timed_stage
+from core.result_cache import ResultCache
+from core.results_store import ResultsStore, product_fingerprint
 from loguru import logger
-from openai import OpenAI
-from repositories.review_repository import ReviewRepository, get_review_repository
+from models.llm_output import CombinedReviewAnalysis
+from openai import AsyncOpenAI
+from repositories.review_repository import ProductSnapshot, ReviewRepository, get_review_repository
+from services.review_ranking import rank_by_centroid, select_mmr
+
+
+SUMMARY_FALLBACK = "Não foi possível gerar um resumo dos reviews no momento."
 
 
 class SentimentService:
-    def __init__(self, review_repo: ReviewRepository):
+    def __init__(
+        self,
+        review_repo: ReviewRepository,
+        llm_cache: LLMCache | None = None,
+        results_store: ResultsStore | None = None,
+        result_cache: ResultCache | None = None,
+    ):
         self.review_repo = review_repo
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm_cache = llm_cache
+        self.results_store = results_store
+        self.result_cache = result_cache
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._refreshes: set[asyncio.Task] = set()
+        self.singleflight_executions = 0
+        self.singleflight_coalesced = 0
+        self.openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+    async def _complete_with_cache(self, request: dict, parse, product_id: str | None = None):
+        """
+        Sends a chat completion request, serving it from the LLM cache when possible.
+
+        The cache key is derived from the whole request (model, prompts and parameters), so any change
+        in the reviews sent to the model results in a new call. Only successfully parsed responses are cached.
+
+        Args:
+            request (dict): The keyword arguments for `chat.completions.create`.
+            parse (Callable[[str], Any]): Converts the response content into the value to be returned and cached.
+            product_id (str | None, optional): The product the request refers to, used for invalidation. Defaults to None.
 
-    def _summarize_reviews_with_llm(self, reviews: list[str]) -> str:
+        Returns:
+            Any: The parsed response.
         """
-        Summarizes a list of product reviews into a single paragraph using an LLM (Large Language Model).
+
+        key = None
+        if self.llm_cache is not None:
+            key = LLMCache.make_key(request)
+            # O cache é um SQLite síncrono: as consultas rodam em uma thread para não bloquear o event loop
+            cached = await asyncio.to_thread(self.llm_cache.get, key)
+            if cached is not None:
+                return cached
+
+        response = await self.openai_client.chat.completions.create(**request)
+        value = parse(response.choices[0].message.content.strip())
+
+        if key is not None:
+            await asyncio.to_thread(self.llm_cache.set, key, value, product_id=product_id)
+        return value
+
+    @staticmethod
+    def _summary_request(reviews: list[str]) -> dict:
+        """
+        Builds the chat completion request that summarizes a list of product reviews.
 
         Args:
             reviews (list[str]): A list of review strings to be summarized.
 
         Returns:
-            str: A single-paragraph summary highlighting the main points from the reviews.
-                 If an error occurs during summarization, returns a default error message.
+            dict: The keyword arguments for `chat.completions.create`.
         """
         reviews_text = "\n- ".join(reviews)
         system = (
@@ -39,25 +91,84 @@ class SentimentService:
         )
         prompt = f"Resuma os seguintes reviews de um produto:\n- {reviews_text}"
 
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            "temperature": 0.3,
+            "max_tokens": 150,
+        }
+
+    async def _summarize_reviews_with_llm(self, reviews: list[str], product_id: str | None = None) -> str:
+        """
+        Summarizes a list of product reviews into a single paragraph using an LLM (Large Language Model).
+
+        Args:
+            reviews (list[str]): A list of review strings to be summarized.
+            product_id (str | None, optional): The product the reviews belong to, used as cache tag. Defaults to None.
+
+        Returns:
+            str: A single-paragraph summary highlighting the main points from the reviews.
+                 If an error occurs during summarization, returns a default error message.
+        """
         try:
             logger.debug("Gerando resumo dos reviews com LLM.")
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=150,
-            )
-            return response.choices[0].message.content.strip()
+            with timed_stage("llm_summary"):
+                return await self._complete_with_cache(self._summary_request(reviews), parse=lambda content: content, product_id=product_id)
+        except Exception:
+            logger.exception("Erro ao gerar resumo dos reviews com LLM.")
+            return SUMMARY_FALLBACK
+
+    async def _stream_summary_with_llm(self, reviews: list[str], product_id: str | None = None):
+        """
+        Summarizes a list of product reviews like `_summarize_reviews_with_llm`, yielding the text as it is generated.
+
+        The request is sent with `stream=True` and every content delta is yielded as soon as it arrives.
+        The cache key is the same as the non-streaming call, so a cached summary is yielded at once and a
+        streamed summary is cached for both modes once complete.
+
+        Args:
+            reviews (list[str]): A list of review strings to be summarized.
+            product_id (str | None, optional): The product the reviews belong to, used as cache tag. Defaults to None.
+
+        Yields:
+            str: Chunks of the summary. If an error occurs before any chunk is yielded, yields the default error message.
+        """
+        request = self._summary_request(reviews)
+        key = None
+        if self.llm_cache is not None:
+            key = LLMCache.make_key(request)
+            cached = await asyncio.to_thread(self.llm_cache.get, key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: list[str] = []
+        try:
+            logger.debug("Gerando resumo dos reviews com LLM (streaming).")
+            with timed_stage("llm_summary_stream"):
+                stream = await self.openai_client.chat.completions.create(**request, stream=True)
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
         except Exception:
             logger.exception("Erro ao gerar resumo dos reviews com LLM.")
-            return "Não foi possível gerar um resumo dos reviews no momento."
+            if not chunks:
+                yield SUMMARY_FALLBACK
+            return
 
-    def _extract_positive_negative_points_with_llm(self, reviews: list[str]) -> dict:
+        summary = "".join(chunks).strip()
+        if key is not None and summary:
+            await asyncio.to_thread(self.llm_cache.set, key, summary, product_id=product_id)
+
+    async def _extract_positive_negative_points_with_llm(self, reviews: list[str], product_id: str | None = None) -> dict:
         """
         Extracts the main positive and negative points from a list of product reviews using a Large Language Model (LLM).
 
         Args:
             reviews (list[str]): A list of review strings to be analyzed.
+            product_id (str | None, optional): The product the reviews belong to, used as cache tag. Defaults to None.
 
         Returns:
             dict: A dictionary with two keys:
@@ -80,106 +191,299 @@ class SentimentService:
 
         try:
             logger.debug("Extraindo pontos positivos e negativos com LLM.")
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                response_format={"type": "json_object"},
-                messages=[
+            request = {
+                "model": "gpt-4o-mini",
+                "response_format": {"type": "json_object"},
+                "messages": [
                     {"role": "system", "content": system},
                     {"role": "user", "content": prompt},
                 ],
-                temperature=0.3,
-                max_tokens=150,
-            )
-            content = response.choices[0].message.content.strip()
-            json_response = json.loads(content)
-            return {
-                "pontos_positivos": json_response.get("pontos_positivos", []),
-                "pontos_negativos": json_response.get("pontos_negativos", []),
+                "temperature": 0.3,
+                "max_tokens": 150,
             }
+
+            def parse(content: str) -> dict:
+                json_response = json.loads(content)
+                return {
+                    "pontos_positivos": json_response.get("pontos_positivos", []),
+                    "pontos_negativos": json_response.get("pontos_negativos", []),
+                }
+
+            with timed_stage("llm_points"):
+                return await self._complete_with_cache(request, parse=parse, product_id=product_id)
         except Exception:
             logger.exception("Erro ao extrair pontos positivos e negativos com LLM.")
             return {}
 
-    def _sentiment_summary(self, product_id: str) -> tuple[str, dict]:
+    async def _analyze_reviews_combined_with_llm(self, reviews: list[str], product_id: str | None = None) -> dict | None:
+        """
+        Generates the summary and extracts the positive and negative points of a list of reviews with a single LLM call.
+
+        The response is validated against `CombinedReviewAnalysis`; invalid responses are not cached.
+
+        Args:
+            reviews (list[str]): A list of review strings to be analyzed.
+            product_id (str | None, optional): The product the reviews belong to, used as cache tag. Defaults to None.
+
+        Returns:
+            dict | None: A dictionary with the keys 'resumo', 'pontos_positivos' and 'pontos_negativos',
+                or None if the call fails or the response does not match the schema.
+        """
+        reviews_text = "\n- ".join(reviews)
+        system = (
+            "Você é um assistente especializado em análise de reviews de produtos. "
+            "Sua tarefa é resumir os reviews fornecidos e identificar os principais pontos positivos e negativos do produto. "
+            "Concentre-se apenas nos aspectos do produto em si, sem mencionar problemas de entrega ou atendimento ao cliente. "
+            "O resumo deve ser um parágrafo conciso, claro e direto. "
+            "O resumo e os pontos devem ser escritos em terceira pessoa, de forma impessoal e objetiva, "
+            "sem o uso de primeira pessoa como 'eu', 'meu', ou expressões como 'gostei' ou 'recomendo'. "
+            "Caso não haja reviews com informações relevantes sobre o produto, o resumo deve informar que não há informações relacionadas ao produto nos reviews. "
+            "Retorne no formato JSON com três chaves: 'resumo' (texto), 'pontos_positivos' e 'pontos_negativos' (listas). "
+            "Exemplo de resposta: "
+            '{"resumo": "O produto atende às expectativas...", "pontos_positivos": ["Bom desempenho", "Fácil de usar"], '
+            '"pontos_negativos": ["Bateria fraca", "Preço alto"]}'
+        )
+        prompt = f"Resuma e identifique os pontos positivos e negativos do produto com base nos reviews abaixo:\n- {reviews_text}"
+
+        try:
+            logger.debug("Gerando resumo e pontos positivos e negativos com uma única chamada ao LLM.")
+            request = {
+                "model": "gpt-4o-mini",
+                "response_format": {"type": "json_object"},
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                "temperature": 0.3,
+                "max_tokens": 300,
+            }
+            with timed_stage("llm_combined"):
+                return await self._complete_with_cache(
+                    request, parse=lambda content: CombinedReviewAnalysis.model_validate_json(content).model_dump(), product_id=product_id
+                )
+        except Exception:
+            logger.exception("Erro ao gerar a análise combinada dos reviews com LLM.")
+            return None
+
+    def _sentiment_summary(self, snapshot: ProductSnapshot, aggregate: dict | None = None) -> tuple[str, dict]:
         """
         Analyzes and summarizes the sentiment distribution for a given product.
 
         Args:
-            product_id (str): The unique identifier of the product whose reviews will be analyzed.
+            snapshot (ProductSnapshot): The product's reviews, fetched once from the repository.
+            aggregate (dict | None, optional): The precomputed product aggregates. When available, the
+                sentiment counts are read from it instead of being recounted. Defaults to None.
 
         Returns:
             tuple[str, dict]: A tuple containing:
                 - The predominant sentiment label (str) for the product.
                 - A dictionary (dict) mapping each sentiment label (capitalized) to its proportion among all sentiments.
         """
-        logger.info(f"Analisando sentimento para o produto {product_id}.")
-        sentiments = self.review_repo.get_product_sentiments(product_id)
-
-        sentiment_counts = Counter(sentiments)
-        total = len(sentiments)
+        logger.info(f"Analisando sentimento para o produto {snapshot.product_id}.")
+        if aggregate is not None and aggregate["review_count"]:
+            sentiment_counts = aggregate["sentiment_counts"]
+            total = aggregate["review_count"]
+        else:
+            sentiment_counts = snapshot.sentiment_counts()
+            total = len(snapshot)
 
         predominant_sentiment = sentiment_counts.most_common(1)[0][0]
         sentiment_distrib = {label.capitalize(): round(count / total, 2) for label, count in sentiment_counts.most_common()}
 
         return predominant_sentiment, sentiment_distrib
 
-    def _positive_negative_points_summary(self, product_id: str) -> tuple[list[str], list[str]]:
+    async def _positive_negative_points_summary(self, snapshot: ProductSnapshot) -> tuple[list[str], list[str], str, bool]:
         """
         Extracts and summarizes positive and negative review points for a given product.
 
+        The points extraction and the summary are independent LLM calls and run concurrently. With
+        `LLM_COMBINED_MODE` enabled, a single call returns both, falling back to the two calls if it fails.
+
         Args:
-            product_id (str): The unique identifier of the product for which to extract review points.
+            snapshot (ProductSnapshot): The product's reviews, fetched once from the repository.
 
         Returns:
-            tuple[list[str], list[str], str]:
+            tuple[list[str], list[str], str, bool]:
                 - A list of positive points extracted from the latest positive reviews.
                 - A list of negative points extracted from the latest negative reviews.
                 - A summary string generated from the combined latest positive and negative reviews.
+                - Whether every LLM call succeeded (False if a default value was returned instead).
 
         Logs:
             Logs the extraction process for the specified product.
         """
-        logger.info(f"Extraindo pontos positivos e negativos para o produto {product_id}.")
-        latest_positive_reviews = self.review_repo.get_latest_reviews_by_sentiment(product_id, "positivo", limit=5)
-        latest_negative_reviews = self.review_repo.get_latest_reviews_by_sentiment(product_id, "negativo", limit=5)
-        cocant_reviews = latest_positive_reviews + latest_negative_reviews
-        points = self._extract_positive_negative_points_with_llm(cocant_reviews)
+        logger.info(f"Extraindo pontos positivos e negativos para o produto {snapshot.product_id}.")
+        points_reviews, summary_reviews = self._reviews_for_llm(snapshot)
+
+        if settings.LLM_COMBINED_MODE:
+            combined = await self._analyze_reviews_combined_with_llm(summary_reviews, product_id=snapshot.product_id)
+            if combined is not None:
+                return combined["pontos_positivos"], combined["pontos_negativos"], combined["resumo"], True
+            logger.warning(f"Análise combinada indisponível para o produto {snapshot.product_id}, usando chamadas separadas.")
+
+        points, summary = await asyncio.gather(
+            self._extract_positive_negative_points_with_llm(points_reviews, product_id=snapshot.product_id),
+            self._summarize_reviews_with_llm(summary_reviews, product_id=snapshot.product_id),
+        )
+
+        complete = bool(points) and summary != SUMMARY_FALLBACK
+        return points.get("pontos_positivos", []), points.get("pontos_negativos", []), summary, complete
 
-        latest_neutral_reviews = self.review_repo.get_latest_reviews_by_sentiment(product_id, "neutro", limit=5)
-        summary = self._summarize_reviews_with_llm(cocant_reviews + latest_neutral_reviews)
+    @staticmethod
+    def _reviews_for_llm(snapshot: ProductSnapshot) -> tuple[list[str], list[str]]:
+        """
+        Selects the latest reviews sent to the LLM calls.
 
-        return points["pontos_positivos"], points["pontos_negativos"], summary
+        Args:
+            snapshot (ProductSnapshot): The product's reviews, fetched once from the repository.
 
-    def _top_reviews_summary(self, product_id: str) -> list[str]:
+        Returns:
+            tuple[list[str], list[str]]:
+                - The latest positive and negative reviews, used to extract the points.
+                - The same reviews plus the latest neutral ones, used to generate the summary.
         """
-        Generates a summary of the top representative reviews for a given product.
+        latest_positive_reviews = snapshot.latest_reviews_by_sentiment("positivo", limit=5)
+        latest_negative_reviews = snapshot.latest_reviews_by_sentiment("negativo", limit=5)
+        latest_neutral_reviews = snapshot.latest_reviews_by_sentiment("neutro", limit=5)
+        cocant_reviews = latest_positive_reviews + latest_negative_reviews
+        return cocant_reviews, cocant_reviews + latest_neutral_reviews
+
+    def _top_reviews_summary(self, snapshot: ProductSnapshot) -> list[str]:
+        """
+        Selects the top representative reviews for a given product.
 
-        This method retrieves the embeddings of all reviews associated with the specified product,
-        computes the mean embedding to represent the overall sentiment, and then fetches the top
-        three reviews most similar to this mean embedding.
+        The product's own embeddings (already in the snapshot) are ranked by cosine similarity to their
+        centroid, so no query against the whole collection is needed and only reviews of the product
+        are returned. With the "mmr" strategy the selection also favors diversity among the reviews.
 
         Args:
-            product_id (str): The unique identifier of the product for which to summarize reviews.
+            snapshot (ProductSnapshot): The product's reviews, fetched once from the repository.
 
         Returns:
             list[str]: A list containing the top representative reviews for the product.
         """
-        logger.info(f"Buscando os reviews mais representativos para o produto {product_id}.")
-        embeddings = self.review_repo.get_embeddings_by_product_id(product_id)
-        top_reviews = []
+        logger.info(f"Buscando os reviews mais representativos para o produto {snapshot.product_id}.")
+        embeddings = snapshot.embeddings
+        k = settings.TOP_REVIEWS_K
+        if embeddings.ndim != 2 or embeddings.shape[0] == 0:
+            return []
+
+        # Textos idênticos têm o mesmo embedding, então são ignorados após a primeira ocorrência
+        if settings.TOP_REVIEWS_STRATEGY == "mmr":
+            first_rows: dict[str, int] = {}
+            for i, document in enumerate(snapshot.documents):
+                first_rows.setdefault(document, i)
+            rows = list(first_rows.values())
+            return [snapshot.documents[rows[i]] for i in select_mmr(embeddings[rows], k, settings.TOP_REVIEWS_MMR_LAMBDA)]
+
+        top_reviews: list[str] = []
+        for i in rank_by_centroid(embeddings):
+            document = snapshot.documents[i]
+            if document not in top_reviews:
+                top_reviews.append(document)
+            if len(top_reviews) == k:
+                break
+        return top_reviews
 
-        if embeddings is not None and embeddings.shape[0] > 0:
-            mean_embedding = np.mean(embeddings, axis=0)
-            top_reviews = self.review_repo.get_review_by_similarity(query_embeddings=[mean_embedding.tolist()], n_results=3)
+    async def _stored_result(self, product_id: str, aggregate: dict | None) -> dict | None:
+        """
+        Retrieves the materialized result of a product, if it is still up to date with its reviews.
 
-        return top_reviews
+        The in-process result cache is checked first, then the results store, read in a worker thread. A stale
+        entry of the result cache (older than its TTL) is still returned, while a background task refreshes it
+        (see `_refresh_result`).
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            aggregate (dict | None): The product aggregates, from which the review set fingerprint is derived.
+
+        Returns:
+            dict | None: The stored result, or None if there is no stored result or it is stale for the current reviews.
+        """
+        fingerprint = product_fingerprint(aggregate)
+        with timed_stage("result_cache"):
+            cached = self.result_cache.get(product_id, fingerprint) if self.result_cache is not None else None
+        if cached is not None:
+            result, stale = cached
+            if stale:
+                self._refresh_result(product_id, aggregate)
+            return result
+
+        if self.results_store is None:
+            return None
+        with timed_stage("results_store"):
+            result = await asyncio.to_thread(self.results_store.get, product_id, fingerprint)
+        if result is not None:
+            logger.info(f"Resultado materializado encontrado para o produto {product_id}.")
+            if self.result_cache is not None:
+                self.result_cache.put(product_id, fingerprint, result)
+        return result
+
+    def _refresh_result(self, product_id: str, aggregate: dict | None) -> None:
+        """
+        Refreshes a stale entry of the result cache in a background task.
+
+        The refresh skips the results store, which holds the same result under the same fingerprint, and computes
+        the analysis again through `_single_flight`, so it is shared with any request for the same product already
+        in flight and runs at most once at a time. The fresh result replaces the entry in both tiers; LLM responses
+        still within `LLM_CACHE_TTL_SECONDS` are reused.
 
-    def analyze_sentiment(self, product_id: str):
+        Args:
+            product_id (str): The unique identifier of the product.
+            aggregate (dict | None): The product aggregates, from which the review set fingerprint is derived.
+        """
+        if product_id in self._inflight:
+            return
+
+        async def compute() -> dict:
+            snapshot = await asyncio.to_thread(self.review_repo.get_product_snapshot, product_id)
+            return await self._analyze_snapshot(snapshot, aggregate)
+
+        async def refresh() -> None:
+            # As etapas da atualização não são atribuídas à requisição que a disparou, que já terminou
+            with stage_timings():
+                try:
+                    logger.debug(f"Atualizando em segundo plano o resultado em cache do produto {product_id}.")
+                    await self._single_flight(product_id, compute)
+                except Exception:
+                    logger.exception(f"Erro ao atualizar o resultado em cache do produto {product_id}.")
+
+        # Mantém a referência da task até o fim para que ela não seja coletada pelo garbage collector
+        task = asyncio.create_task(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _store_result(self, product_id: str, aggregate: dict | None, result: dict) -> None:
+        """
+        Stores a complete result in the result cache and the results store, tagged with the fingerprint of the product's review set.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            aggregate (dict | None): The product aggregates, from which the review set fingerprint is derived.
+            result (dict): The analysis result.
+        """
+        fingerprint = product_fingerprint(aggregate)
+        if fingerprint is None:
+            return
+        if self.result_cache is not None:
+            self.result_cache.put(product_id, fingerprint, result)
+        if self.results_store is not None:
+            await asyncio.to_thread(self.results_store.put, product_id, fingerprint, result)
+
+    async def analyze_sentiment(self, product_id: str, refresh: bool = False):
         """
         Analyzes the sentiment of reviews for a given product.
 
+        A cached or materialized result is returned directly while the product's reviews are unchanged. Otherwise
+        the product's reviews are fetched once as a `ProductSnapshot`, from which the sentiment
+        distribution, the latest reviews by sentiment and the mean embedding are all derived.
+        Blocking repository calls run in a worker thread and the independent LLM calls are awaited
+        concurrently, so the event loop is never blocked. Complete results are then materialized.
+        Concurrent calls for the same product share a single computation (see `_single_flight`).
+
         Args:
             product_id (str): The unique identifier of the product to analyze.
+            refresh (bool, optional): Ignores the cached and materialized results and computes it again. Defaults to False.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -195,17 +499,123 @@ class SentimentService:
         Logs:
             Warning if the product is not found or has no reviews.
         """
-        if not self.review_repo.has_product_reviews(product_id):
+        aggregate = await asyncio.to_thread(self.review_repo.get_product_aggregate, product_id)
+        if not refresh and (stored := await self._stored_result(product_id, aggregate)) is not None:
+            return stored
+
+        async def compute() -> dict:
+            snapshot = await asyncio.to_thread(self.review_repo.get_product_snapshot, product_id)
+            return await self._analyze_snapshot(snapshot, aggregate)
+
+        return await self._single_flight(product_id, compute)
+
+    async def _single_flight(self, product_id: str, compute) -> dict:
+        """
+        Runs the analysis of a product, sharing it with every concurrent caller for the same product.
+
+        The first caller starts `compute` as a task; callers arriving while it is in flight await the same
+        task instead of fetching the reviews and calling the LLM again. The task is shielded, so a caller
+        that gives up (e.g. a disconnected client) does not cancel the computation for the others.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            compute (Callable[[], Awaitable[dict]]): Computes the analysis result when no computation is in flight.
+
+        Returns:
+            dict: The analysis result.
+        """
+        task, _ = self._join_flight(product_id, compute)
+        return await self._await_flight(task)
+
+    def _join_flight(self, product_id: str, compute) -> tuple[asyncio.Task, bool]:
+        """
+        Returns the computation in flight for a product, starting it with `compute` if there is none.
+
+        The stage timings of the computation are collected apart from the request that started it and
+        attached to its result, so every caller awaiting it through `_await_flight` reports them.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            compute (Callable[[], Awaitable[dict]]): Computes the analysis result when no computation is in flight.
+
+        Returns:
+            tuple[asyncio.Task, bool]: The computation task and whether it was started by this call.
+        """
+        task = self._inflight.get(product_id)
+        if task is not None:
+            self.singleflight_coalesced += 1
+            logger.debug(f"Análise do produto {product_id} já em andamento, aguardando o resultado.")
+            return task, False
+
+        async def run() -> tuple[dict, dict[str, float]]:
+            with stage_timings() as timings:
+                result = await compute()
+            return result, timings
+
+        self.singleflight_executions += 1
+        task = asyncio.create_task(run())
+        self._inflight[product_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(product_id, None))
+        return task, True
+
+    @staticmethod
+    async def _await_flight(task: asyncio.Task) -> dict:
+        """
+        Awaits a computation started by `_join_flight` without cancelling it if the caller gives up.
+
+        Args:
+            task (asyncio.Task): The computation task.
+
+        Returns:
+            dict: The analysis result. Its stage timings are added to the current request timings.
+        """
+        result, timings = await asyncio.shield(task)
+        add_timings(timings)
+        return result
+
+    def singleflight_stats(self) -> dict:
+        """
+        Returns the request coalescing counters.
+
+        Returns:
+            dict: The number of analyses in flight, of computations started and of calls that joined
+                a computation already in flight, and the ratio of coalesced calls.
+        """
+        calls = self.singleflight_executions + self.singleflight_coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.singleflight_executions,
+            "coalesced": self.singleflight_coalesced,
+            "coalesced_rate": round(self.singleflight_coalesced / calls, 4) if calls else 0.0,
+        }
+
+    async def _analyze_snapshot(self, snapshot: ProductSnapshot, aggregate: dict | None = None) -> dict:
+        """
+        Runs the analysis of `analyze_sentiment` over an already fetched product snapshot.
+
+        Args:
+            snapshot (ProductSnapshot): The product's reviews.
+            aggregate (dict | None, optional): The product aggregates, if already fetched. Defaults to None.
+
+        Returns:
+            dict: The analysis result, in the same format as `analyze_sentiment`.
+        """
+        product_id = snapshot.product_id
+        if snapshot.is_empty:
             logger.warning(f"Produto {product_id} não encontrado ou sem reviews.")
             return {"error": "Produto não encontrado ou não possui reviews."}
 
-        predominant_sentiment, sentiment_distrib = self._sentiment_summary(product_id)
+        if aggregate is None:
+            aggregate = await asyncio.to_thread(self.review_repo.get_product_aggregate, product_id)
+        with timed_stage("sentiment_distrib"):
+            predominant_sentiment, sentiment_distrib = self._sentiment_summary(snapshot, aggregate)
 
-        positive_points, negative_points, summary = self._positive_negative_points_summary(product_id)
+        with timed_stage("similarity"):
+            top_reviews = self._top_reviews_summary(snapshot)
 
-        top_reviews = self._top_reviews_summary(product_id)
+        positive_points, negative_points, summary, complete = await self._positive_negative_points_summary(snapshot)
 
-        return {
+        result = {
             "product_id": product_id,
             "predominant_sentiment": predominant_sentiment,
             "sentiment_distrib": sentiment_distrib,
@@ -214,9 +624,254 @@ class SentimentService:
             "negative_points": negative_points,
             "top_reviews": top_reviews,
         }
+        # Resultados com respostas padrão (falha do LLM) não são materializados
+        if complete:
+            await self._store_result(product_id, aggregate, result)
+        return result
+
+    async def analyze_sentiment_stream(self, product_id: str):
+        """
+        Analyzes the sentiment of reviews for a given product, yielding each part of the result as soon as it is ready.
+
+        The fields that do not depend on the LLM are yielded first, in milliseconds. The points extraction
+        and the streamed summary then run concurrently, so summary chunks are yielded as the model generates
+        them. A materialized result is yielded at once.
+
+        The computation is shared through `_single_flight` like `analyze_sentiment`: the first caller streams
+        the events as they are produced, while concurrent callers for the same product (streaming or not)
+        await the same computation and a streaming caller then receives the final result as events. A caller
+        that stops consuming does not cancel the computation, which still materializes the result for the others.
+
+        Args:
+            product_id (str): The unique identifier of the product to analyze.
+
+        Yields:
+            dict: Events identified by their "event" key:
+                - "overview": `sentiment`, `sentiment_distrib` and `top_reviews`.
+                - "points": `positive_points` and `negative_points`.
+                - "summary_delta": a `delta` chunk of the summary.
+                - "summary": the complete `summary`, after the last chunk.
+                - "error": an `error` message, if the product is not found or has no reviews (only event yielded).
+        """
+        aggregate = await asyncio.to_thread(self.review_repo.get_product_aggregate, product_id)
+        stored = await self._stored_result(product_id, aggregate)
+        if stored is not None:
+            for event in self._result_events(product_id, stored):
+                yield event
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def compute() -> dict:
+            # O sentinela encerra o stream mesmo se um erro escapar da análise
+            try:
+                return await self._analyze_snapshot_stream(product_id, aggregate, queue.put_nowait)
+            finally:
+                queue.put_nowait(None)
+
+        task, started = self._join_flight(product_id, compute)
+        if not started:
+            for event in self._result_events(product_id, await self._await_flight(task)):
+                yield event
+            return
+
+        while (event := await queue.get()) is not None:
+            yield event
+        # Propaga um erro inesperado da análise em vez de encerrar o stream em silêncio
+        await self._await_flight(task)
+
+    @staticmethod
+    def _result_events(product_id: str, result: dict) -> list[dict]:
+        """
+        Converts a complete analysis result into the events of `analyze_sentiment_stream`.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            result (dict): The analysis result, in the same format as `analyze_sentiment`.
+
+        Returns:
+            list[dict]: The "overview", "points", "summary_delta" and "summary" events, or a single "error" event.
+        """
+        if "error" in result:
+            return [{"event": "error", "product_id": product_id, "error": result["error"]}]
+        return [
+            {
+                "event": "overview",
+                "product_id": product_id,
+                "sentiment": result["predominant_sentiment"],
+                "sentiment_distrib": result["sentiment_distrib"],
+                "top_reviews": result["top_reviews"],
+            },
+            {"event": "points", "positive_points": result["positive_points"], "negative_points": result["negative_points"]},
+            {"event": "summary_delta", "delta": result["summary"]},
+            {"event": "summary", "summary": result["summary"]},
+        ]
+
+    async def _analyze_snapshot_stream(self, product_id: str, aggregate: dict | None, on_event) -> dict:
+        """
+        Runs the analysis of `analyze_sentiment_stream`, emitting each event as soon as it is ready.
+
+        Args:
+            product_id (str): The unique identifier of the product to analyze.
+            aggregate (dict | None): The product aggregates, from which the review set fingerprint is derived.
+            on_event (Callable[[dict], None]): Receives each event, in the order they must be yielded.
+
+        Returns:
+            dict: The analysis result, in the same format as `analyze_sentiment`.
+        """
+        snapshot = await asyncio.to_thread(self.review_repo.get_product_snapshot, product_id)
+        if snapshot.is_empty:
+            logger.warning(f"Produto {product_id} não encontrado ou sem reviews.")
+            result = {"error": "Produto não encontrado ou não possui reviews."}
+            on_event({"event": "error", "product_id": product_id, **result})
+            return result
+
+        with timed_stage("sentiment_distrib"):
+            predominant_sentiment, sentiment_distrib = self._sentiment_summary(snapshot, aggregate)
+        with timed_stage("similarity"):
+            top_reviews = self._top_reviews_summary(snapshot)
+        on_event(
+            {
+                "event": "overview",
+                "product_id": product_id,
+                "sentiment": predominant_sentiment,
+                "sentiment_distrib": sentiment_distrib,
+                "top_reviews": top_reviews,
+            }
+        )
+
+        logger.info(f"Extraindo pontos positivos e negativos para o produto {product_id}.")
+        points_reviews, summary_reviews = self._reviews_for_llm(snapshot)
+        incomplete: list[str] = []
+        result = {
+            "product_id": product_id,
+            "predominant_sentiment": predominant_sentiment,
+            "sentiment_distrib": sentiment_distrib,
+            "top_reviews": top_reviews,
+        }
+
+        def emit(event: dict) -> None:
+            if event["event"] != "summary_delta":
+                result.update({key: value for key, value in event.items() if key != "event"})
+            on_event(event)
+
+        # Cada produtor sempre emite o seu evento final, com o valor padrão em caso de erro
+        async def points_producer():
+            try:
+                points = await self._extract_positive_negative_points_with_llm(points_reviews, product_id=product_id)
+            except Exception:
+                logger.exception(f"Erro ao extrair os pontos positivos e negativos do produto {product_id}.")
+                points = {}
+            if not points:
+                incomplete.append("points")
+            positive_points, negative_points = points.get("pontos_positivos", []), points.get("pontos_negativos", [])
+            emit({"event": "points", "positive_points": positive_points, "negative_points": negative_points})
+
+        async def summary_producer():
+            chunks: list[str] = []
+            try:
+                async for delta in self._stream_summary_with_llm(summary_reviews, product_id=product_id):
+                    chunks.append(delta)
+                    emit({"event": "summary_delta", "delta": delta})
+                summary = "".join(chunks).strip()
+            except Exception:
+                logger.exception(f"Erro ao gerar o resumo do produto {product_id}.")
+                summary = SUMMARY_FALLBACK
+            if summary == SUMMARY_FALLBACK:
+                incomplete.append("summary")
+            emit({"event": "summary", "summary": summary})
+
+        async def combined_producer():
+            # Uma única chamada não permite streaming do resumo, que é enviado em um único trecho
+            try:
+                positive_points, negative_points, summary, complete = await self._positive_negative_points_summary(snapshot)
+            except Exception:
+                logger.exception(f"Erro ao analisar os reviews do produto {product_id} com LLM.")
+                positive_points, negative_points, summary, complete = [], [], SUMMARY_FALLBACK, False
+            if not complete:
+                incomplete.append("combined")
+            emit({"event": "points", "positive_points": positive_points, "negative_points": negative_points})
+            emit({"event": "summary_delta", "delta": summary})
+            emit({"event": "summary", "summary": summary})
+
+        if settings.LLM_COMBINED_MODE:
+            await combined_producer()
+        else:
+            await asyncio.gather(points_producer(), summary_producer())
+        if not incomplete:
+            await self._store_result(product_id, aggregate, result)
+        return result
+
+    async def analyze_sentiment_batch(self, product_ids: list[str], concurrency: int | None = None):
+        """
+        Analyzes the sentiment of reviews for several products, yielding each result as soon as it is ready.
+
+        The aggregates of every product are read with one batched lookup and the materialized results are
+        yielded first. The reviews of the remaining products are fetched with a single vector database query and the analyses run concurrently, with at most `concurrency` products
+        calling the LLM at the same time.
+
+        Args:
+            product_ids (list[str]): The unique identifiers of the products to analyze. Duplicates are analyzed once.
+            concurrency (int | None, optional): The maximum number of products analyzed at once.
+                Defaults to `settings.BATCH_CONCURRENCY`.
+
+        Yields:
+            dict: The result of `analyze_sentiment` for a product, in completion order. Each result
+                carries its `product_id`, including the error results.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        aggregates = await asyncio.to_thread(self.review_repo.get_product_aggregates, product_ids)
+        pending_ids = []
+        for product_id in product_ids:
+            stored = await self._stored_result(product_id, aggregates.get(product_id))
+            if stored is not None:
+                yield {"product_id": product_id, **stored}
+            else:
+                pending_ids.append(product_id)
+        if not pending_ids:
+            return
+
+        snapshots = await asyncio.to_thread(self.review_repo.get_product_snapshots, pending_ids)
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.BATCH_CONCURRENCY))
+
+        async def analyze(snapshot: ProductSnapshot) -> dict:
+            async with semaphore:
+                try:
+                    aggregate = aggregates.get(snapshot.product_id)
+                    result = await self._single_flight(snapshot.product_id, lambda: self._analyze_snapshot(snapshot, aggregate))
+                except Exception as e:
+                    logger.error(f"Erro ao analisar o produto {snapshot.product_id} no lote: {e}")
+                    result = {"error": "Não foi possível analisar o produto no momento."}
+            return {"product_id": snapshot.product_id, **result}
+
+        tasks = [asyncio.create_task(analyze(snapshot)) for snapshot in snapshots.values()]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Cancela as análises pendentes se o consumidor desistir (ex.: cliente desconectou)
+            for task in tasks:
+                task.cancel()
 
 
 @lru_cache()
 def get_sentiment_service():
     repo = get_review_repository()
-    return SentimentService(review_repo=repo)
+    llm_cache = None
+    if settings.LLM_CACHE_ENABLED:
+        llm_cache = LLMCache(
+            settings.LLM_CACHE_PATH,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+    results_store = None
+    if settings.RESULTS_STORE_ENABLED:
+        results_store = ResultsStore(settings.RESULTS_STORE_PATH, settings.COLLECTION)
+    result_cache = None
+    if settings.RESULT_CACHE_ENABLED:
+        result_cache = ResultCache(
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            stale_seconds=settings.RESULT_CACHE_STALE_SECONDS,
+        )
+    return SentimentService(review_repo=repo, llm_cache=llm_cache, results_store=results_store, result_cache=result_cache)
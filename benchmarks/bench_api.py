@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from loguru import logger
+from prometheus_client.parser import text_string_to_metric_families
+
+from synthetic_corpus import BENCH_COLLECTION, product_weights, workdir_env
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "app"))
+from core.product_aggregates import ProductAggregates  # noqa: E402
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark da API e da tool MCP sobre a coleção gerada pelo bench_ingest.py.
+# Sobe o servidor fake da OpenAI (latência configurável) e a API com o Chroma embutido,
+# dispara requisições concorrentes (produtos sorteados pela popularidade) e reporta
+# p50/p95/p99 e vazão por endpoint, além da latência de cada etapa da análise (/metrics).
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_process(cmd: list[str], env: dict, log_path: Path) -> subprocess.Popen:
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, "wb")
+    return subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Processo encerrado antes de responder em {url} (veja os logs do benchmark)")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} não respondeu em {timeout:.0f}s")
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {f"p{q}_ms": round(float(np.percentile(values, q)) * 1000, 2) for q in (50, 95, 99)}
+
+
+async def run_scenario(call, params: list, concurrency: int) -> dict:
+    # Carga em malha fechada: `concurrency` clientes, cada um envia a próxima requisição ao receber a resposta
+    latencies: list[float] = []
+    first_bytes: list[float] = []
+    errors = 0
+    pending = iter(params)
+
+    async def client() -> None:
+        nonlocal errors
+        for item in pending:
+            start = time.perf_counter()
+            try:
+                first_byte = await call(item)
+            except Exception as e:
+                errors += 1
+                logger.debug("Falha na requisição: {}", e)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if first_byte is not None:
+                first_bytes.append(first_byte - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = {"requests": len(params), "errors": errors, "concurrency": concurrency, **percentiles(latencies)}
+    result["throughput_rps"] = round(len(latencies) / elapsed, 2)
+    if first_bytes:
+        result["first_byte"] = percentiles(first_bytes)
+    return result
+
+
+def histogram_quantile(buckets: list[tuple[float, float]], q: float) -> float | None:
+    # Mesma interpolação linear do histogram_quantile do Prometheus
+    total = buckets[-1][1]
+    if not total:
+        return None
+    rank = q * total
+    previous_bound, previous_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return previous_bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / max(count - previous_count, 1e-9)
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def stage_latencies(metrics_text: str) -> dict:
+    stages: dict[str, dict] = {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != "analysis_stage_duration_seconds":
+            continue
+        for sample in family.samples:
+            stage = stages.setdefault(sample.labels["stage"], {"buckets": []})
+            if sample.name.endswith("_bucket"):
+                stage["buckets"].append((float(sample.labels["le"]), sample.value))
+            elif sample.name.endswith("_count"):
+                stage["count"] = int(sample.value)
+            elif sample.name.endswith("_sum"):
+                stage["sum"] = sample.value
+
+    result = {}
+    for name, stage in stages.items():
+        buckets = sorted(stage["buckets"])
+        count = stage.get("count", 0)
+        result[name] = {
+            "count": count,
+            "mean_ms": round(stage.get("sum", 0.0) / count * 1000, 2) if count else None,
+            **{f"p{q}_ms": round(value * 1000, 2) for q in (50, 95, 99) if (value := histogram_quantile(buckets, q / 100)) is not None},
+        }
+    # Etapas que mais somam tempo primeiro
+    return dict(sorted(result.items(), key=lambda item: -(item[1]["mean_ms"] or 0) * item[1]["count"]))
+
+
+async def run_benchmarks(base_url: str, product_ids: list[str], weights: np.ndarray, args) -> dict:
+    from fastmcp import Client
+
+    np_rng = np.random.default_rng(args.seed)
+
+    def sample(n: int) -> list[str]:
+        return [product_ids[i] for i in np_rng.choice(len(product_ids), size=n, p=weights)]
+
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as http:
+
+        async def products(_):
+            (await http.get("/api/v1/products")).raise_for_status()
+
+        async def analyze(product_id: str):
+            (await http.get("/api/v1/analyze_sentiment", params={"product_id": product_id})).raise_for_status()
+
+        async def analyze_stream(product_id: str) -> float:
+            first_byte = None
+            async with http.stream("GET", "/api/v1/analyze_sentiment/stream", params={"product_id": product_id}) as response:
+                response.raise_for_status()
+                async for _ in response.aiter_lines():
+                    first_byte = first_byte or time.perf_counter()
+            return first_byte
+
+        async def analyze_batch(ids: list[str]):
+            response = await http.post("/api/v1/analyze_sentiment/batch", json={"product_ids": ids})
+            response.raise_for_status()
+            if len(response.text.splitlines()) != len(set(ids)):
+                raise RuntimeError("Resposta do lote incompleta")
+
+        # Aquecimento: abre o snapshot memory-mapped e as conexões antes de medir
+        await run_scenario(analyze, sample(args.warmup), args.concurrency)
+
+        results["get_products"] = await run_scenario(products, [None] * max(1, args.requests // 10), args.concurrency)
+        results["analyze_sentiment"] = await run_scenario(analyze, sample(args.requests), args.concurrency)
+        results["analyze_sentiment_stream"] = await run_scenario(analyze_stream, sample(args.requests), args.concurrency)
+        batches = [sample(args.batch_products) for _ in range(max(1, args.requests // args.batch_products))]
+        results["analyze_sentiment_batch"] = await run_scenario(analyze_batch, batches, max(1, args.concurrency // 4))
+        results["analyze_sentiment_batch"]["products_per_request"] = args.batch_products
+
+        async with Client(f"{base_url}/mcp/", timeout=args.timeout) as mcp:
+
+            async def mcp_tool(product_id: str):
+                result = await mcp.call_tool("product_sentiment", {"product_id": product_id})
+                if result.is_error:
+                    raise RuntimeError(str(result.content))
+
+            # A sessão MCP é uma única conexão; as chamadas concorrentes são multiplexadas nela
+            results["mcp_product_sentiment"] = await run_scenario(mcp_tool, sample(args.requests), args.concurrency)
+
+        results["server_stages"] = stage_latencies((await http.get("/metrics")).text)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark da API e da tool MCP com o LLM simulado")
+    ap.add_argument("--workdir", default="data/bench", help="Diretório preparado pelo bench_ingest.py")
+    ap.add_argument("--requests", type=int, default=200, help="Requisições por endpoint")
+    ap.add_argument("--concurrency", type=int, default=16, help="Clientes simultâneos")
+    ap.add_argument("--warmup", type=int, default=10, help="Requisições de aquecimento (não medidas)")
+    ap.add_argument("--batch-products", type=int, default=20, help="Produtos por requisição da rota batch")
+    ap.add_argument("--skew", type=float, default=1.1, help="Expoente de Zipf da popularidade dos produtos consultados")
+    ap.add_argument("--caches", action="store_true", help="Mantém os caches de resultados e do LLM ligados (padrão: análise completa sempre)")
+    ap.add_argument("--api-workers", type=int, default=1, help="Workers do uvicorn")
+    ap.add_argument("--llm-latency-ms", type=float, default=300.0, help="Latência média do LLM simulado")
+    ap.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Variação da latência do LLM simulado (±)")
+    ap.add_argument("--llm-token-latency-ms", type=float, default=10.0, help="Intervalo entre chunks do LLM simulado em streaming")
+    ap.add_argument("--timeout", type=float, default=120.0, help="Timeout de cada requisição (s)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    workdir = Path(args.workdir).resolve()
+    env = workdir_env(workdir)
+    product_ids = ProductAggregates(env["PRODUCT_AGGREGATES_PATH"], BENCH_COLLECTION).product_ids(order_by="review_count")
+    if not product_ids:
+        raise SystemExit(f"Nenhum produto em {workdir}: rode antes o benchmarks/bench_ingest.py --workdir {args.workdir}")
+    # Os produtos mais revisados também são os mais consultados
+    weights = product_weights(len(product_ids), args.skew)
+
+    llm_port, api_port = free_port(), free_port()
+    env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    cache_flag = "true" if args.caches else "false"
+    env.update(LLM_CACHE_ENABLED=cache_flag, RESULTS_STORE_ENABLED=cache_flag, RESULT_CACHE_ENABLED=cache_flag)
+
+    logs = workdir / "logs"
+    processes = []
+    try:
+        llm = start_process(
+            [
+                sys.executable,
+                str(ROOT / "benchmarks" / "fake_openai.py"),
+                f"--port={llm_port}",
+                f"--latency-ms={args.llm_latency_ms}",
+                f"--jitter-ms={args.llm_jitter_ms}",
+                f"--token-latency-ms={args.llm_token_latency_ms}",
+                f"--seed={args.seed}",
+            ],
+            {},
+            logs / "fake_openai.log",
+        )
+        processes.append(llm)
+        wait_ready(f"http://127.0.0.1:{llm_port}/stats", llm)
+
+        api = start_process(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--app-dir=app",
+                "--host=127.0.0.1",
+                f"--port={api_port}",
+                f"--workers={args.api_workers}",
+                "--log-level=warning",
+            ],
+            env,
+            logs / "api.log",
+        )
+        processes.append(api)
+        base_url = f"http://127.0.0.1:{api_port}"
+        wait_ready(f"{base_url}/api/v1/healthcheck", api)
+
+        results = asyncio.run(run_benchmarks(base_url, product_ids, weights, args))
+        llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    result = {
+        "benchmark": "api",
+        "workdir": str(workdir),
+        "products": len(product_ids),
+        "caches": args.caches,
+        "concurrency": args.concurrency,
+        "api_workers": args.api_workers,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_requests": llm_stats["requests"],
+        **results,
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
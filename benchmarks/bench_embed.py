@@ -0,0 +1,64 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "scripts"))
+from export_onnx import OUTPUT_DIR, cosine, sample_reviews  # noqa: E402
+
+sys.path.append(str(ROOT / "app"))
+from core.embeddings import DEFAULT_MODEL_NAME, load_embedder  # noqa: E402
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark dos backends de embedding: torch (SentenceTransformer) vs. ONNX int8
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def sentences_per_sec(embedder, texts: list[str], batch: int, repeat: int) -> tuple[float, np.ndarray]:
+    embedder.encode(texts[:batch], batch_size=batch)  # aquecimento
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vectors = embedder.encode(texts, batch_size=batch)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best, vectors
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de sentenças/s dos backends de embedding")
+    ap.add_argument("--sentences", type=int, default=1024, help="Número de reviews codificadas")
+    ap.add_argument("--batch", type=int, default=64, help="Batch size do encoding (ENCODE_BATCH)")
+    ap.add_argument("--threads", type=int, default=None, help="Threads de CPU por backend")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetições (usa a melhor)")
+    ap.add_argument("--onnx-dir", type=Path, default=OUTPUT_DIR, help="Diretório gerado por scripts/export_onnx.py")
+    args = ap.parse_args()
+
+    # Reviews reais quando o banco existe; senão as frases fixas repetidas
+    texts = sample_reviews(args.sentences)
+    texts = (texts * (args.sentences // len(texts) + 1))[: args.sentences]
+
+    result = {"benchmark": "embedding_backends", "sentences": len(texts), "batch": args.batch}
+    vectors = {}
+    for backend in ("torch", "onnx"):
+        if backend == "onnx" and not args.onnx_dir.exists():
+            logger.warning("{} não encontrado; execute scripts/export_onnx.py", args.onnx_dir)
+            continue
+        start = time.perf_counter()
+        embedder = load_embedder(backend, DEFAULT_MODEL_NAME, args.onnx_dir, args.threads)
+        result[f"{backend}_load_s"] = round(time.perf_counter() - start, 2)
+        rate, vectors[backend] = sentences_per_sec(embedder, texts, args.batch, args.repeat)
+        result[f"{backend}_sentences_per_sec"] = round(rate, 1)
+
+    if len(vectors) == 2:
+        result["speedup"] = round(result["onnx_sentences_per_sec"] / result["torch_sentences_per_sec"], 2)
+        result["cosine_mean"] = round(float(cosine(vectors["torch"], vectors["onnx"]).mean()), 5)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from synthetic_corpus import EMBEDDING_DIM, HashEmbedder, workdir_env, write_olist_db
+
+ROOT = Path(__file__).parent.parent
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark do ingest de ponta a ponta sobre o corpus sintético: leitura SQL, encoding,
+# predição, upload no Chroma embutido e snapshot. Vazão (linhas/s) e latência por lote
+# (p50/p95/p99) de cada estágio. A coleção gerada é usada pelo bench_api.py.
+# Por padrão o encoding usa embeddings sintéticos (--embedding-backend usa o modelo real)
+# e a predição um XGBoost sintético, para rodar offline.
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def load_or_write_corpus(workdir: Path, reviews: int, products: int, skew: float, seed: int) -> dict:
+    # Reaproveita o corpus do diretório se foi gerado com os mesmos parâmetros
+    meta_path = workdir / "corpus.json"
+    params = {"reviews": reviews, "skew": skew, "seed": seed}
+    if meta_path.exists() and (workdir / "olist.db").exists():
+        corpus = json.loads(meta_path.read_text())
+        if {key: corpus[key] for key in params} == params and corpus["requested_products"] == products:
+            return corpus
+    corpus = write_olist_db(workdir / "olist.db", reviews, products, skew=skew, seed=seed)
+    corpus["requested_products"] = products
+    meta_path.write_text(json.dumps(corpus))
+    logger.info("Corpus sintético gerado: {}", corpus)
+    return corpus
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do ingest sobre o corpus sintético")
+    ap.add_argument("--workdir", default="data/bench", help="Diretório do corpus, da coleção e dos caches do benchmark")
+    ap.add_argument("--reviews", type=int, default=10_000, help="Reviews gerados se o corpus ainda não existir")
+    ap.add_argument("--products", type=int, default=None, help="Produtos distintos (padrão: reviews / 3)")
+    ap.add_argument("--skew", type=float, default=1.1, help="Expoente da distribuição de Zipf dos reviews por produto")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--pipeline", action="store_true", help="Roda o ingest em pipeline (--pipeline do ingest)")
+    ap.add_argument("--upload-workers", type=int, default=4)
+    ap.add_argument("--embedding-backend", choices=["hash", "torch", "onnx"], default="hash", help="hash: embeddings sintéticos, sem modelo")
+    args = ap.parse_args()
+
+    workdir = Path(args.workdir).resolve()
+    os.environ.update(workdir_env(workdir))
+    corpus = load_or_write_corpus(workdir, args.reviews, args.products or max(10, args.reviews // 3), args.skew, args.seed)
+
+    # O ingest lê a configuração do ambiente ao ser importado
+    sys.path.append(str(ROOT / "scripts"))
+    import ingest  # noqa: E402
+    from bench_predict import synthetic_model_dict  # noqa: E402
+
+    if args.embedding_backend == "hash":
+        ingest.load_encoder = lambda *_, **__: (HashEmbedder(), None)
+    if args.embedding_backend == "hash" or not ingest.MODEL_PATH.exists():
+        model_dict = synthetic_model_dict(EMBEDDING_DIM)
+        ingest.load_model_dict = lambda: model_dict
+
+    start = time.perf_counter()
+    summary = ingest.ingest(
+        full_refresh=True,
+        pipeline=args.pipeline,
+        upload_workers=args.upload_workers,
+        embedding_cache=False,
+        vector_store="embedded",
+        embedding_backend="torch" if args.embedding_backend == "hash" else args.embedding_backend,
+    )
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "benchmark": "ingest",
+        "workdir": str(workdir),
+        "pipeline": args.pipeline,
+        "embedding_backend": args.embedding_backend,
+        "corpus": corpus,
+        "inserted": summary["inserted"],
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(summary["inserted"] / elapsed, 1),
+        "snapshot": summary["snapshot"],
+        "stages": summary["stages"],
+        "queue_peaks": summary["queue_peaks"],
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
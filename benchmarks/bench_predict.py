@@ -0,0 +1,100 @@
+import argparse
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "scripts"))
+from ingest import MODEL_PATH, predict_sentiment  # noqa: E402
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Micro-benchmark: predição de sentimento por linha vs. em lote
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def predict_sentiment_rowwise(model_dict: dict, embeddings: np.ndarray) -> tuple[list[str], list[str]]:
+    # Implementação anterior de scripts/ingest.py, mantida apenas como referência
+    model_sentiment = model_dict["model"]
+    le = model_dict["label_encoder"]
+    predict = []
+    predict_proba = []
+
+    for emb in embeddings:
+        proba = model_sentiment.predict_proba([emb])
+        label = le.inverse_transform([proba.argmax()])[0]
+        predict.append(str(label))
+        predict_proba.append(
+            json.dumps(
+                {
+                    "negative": float(proba[0][0]),
+                    "neutral": float(proba[0][1]),
+                    "positive": float(proba[0][2]),
+                }
+            )
+        )
+
+    return predict, predict_proba
+
+
+def synthetic_model_dict(dim: int, seed: int = 42) -> dict:
+    from sklearn.preprocessing import LabelEncoder
+    from xgboost import XGBClassifier
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(3000, dim)).astype(np.float32)
+    y_text = rng.choice(["negativo", "neutro", "positivo"], size=len(X))
+    le = LabelEncoder().fit(y_text)
+    clf = XGBClassifier(n_estimators=200, max_depth=6, tree_method="hist")
+    clf.fit(X, le.transform(y_text))
+    return {"model": clf, "label_encoder": le}
+
+
+def rows_per_sec(fn, model_dict: dict, embeddings: np.ndarray, batch: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(embeddings), batch):
+            fn(model_dict, embeddings[i : i + batch])
+        best = min(best, time.perf_counter() - start)
+    return len(embeddings) / best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark da predição de sentimento do ingest")
+    ap.add_argument("--rows", type=int, default=2048, help="Número de embeddings avaliados")
+    ap.add_argument("--batch", type=int, default=256, help="Tamanho do lote (EMB_BATCH)")
+    ap.add_argument("--dim", type=int, default=384, help="Dimensão dos embeddings sintéticos")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetições (usa a melhor)")
+    ap.add_argument("--synthetic-model", action="store_true", help="Treina um XGBoost sintético em vez de usar o modelo salvo")
+    args = ap.parse_args()
+
+    if args.synthetic_model or not MODEL_PATH.exists():
+        logger.info("Usando modelo XGBoost sintético")
+        model_dict = synthetic_model_dict(args.dim)
+    else:
+        with open(MODEL_PATH, "rb") as f:
+            model_dict = pickle.load(f)
+
+    embeddings = np.random.default_rng(0).normal(size=(args.rows, args.dim)).astype(np.float32)
+
+    old = rows_per_sec(predict_sentiment_rowwise, model_dict, embeddings, args.batch, args.repeat)
+    new = rows_per_sec(predict_sentiment, model_dict, embeddings, args.batch, args.repeat)
+
+    result = {
+        "benchmark": "predict_sentiment",
+        "rows": args.rows,
+        "batch": args.batch,
+        "rowwise_rows_per_sec": round(old, 1),
+        "batched_rows_per_sec": round(new, 1),
+        "speedup": round(new / old, 2),
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+from sqlalchemy import create_engine, text
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "scripts"))
+from ingest import DB_BATCH, ensure_source_indexes, filter_new, stream_reviews  # noqa: E402
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark do estágio de leitura + filtro do ingest (linhas/s)
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def stream_reviews_legacy(engine):
+    # Implementação anterior de scripts/ingest.py, mantida apenas como referência
+    SQL = text(
+        """
+            SELECT order_reviews.review_id,
+                order_reviews.order_id,
+                order_items.product_id,
+                order_reviews.review_score,
+                order_reviews.review_creation_date AS creation_date,
+                order_reviews.review_comment_message AS review_text
+
+            FROM order_reviews
+            JOIN order_items ON order_items.order_id = order_reviews.order_id
+
+            WHERE order_reviews.review_comment_message IS NOT NULL
+            AND order_reviews.review_comment_message != ''
+            AND order_reviews.order_id IN (
+                SELECT order_id
+                FROM order_items
+                GROUP BY order_id
+                    HAVING COUNT(DISTINCT product_id) = 1
+            )
+        """
+    )
+    with engine.connect().execution_options(stream_results=True) as conn:
+        cursor = conn.execution_options(yield_per=DB_BATCH).execute(SQL)
+        cols = cursor.keys()
+        while rows := cursor.fetchmany(DB_BATCH):
+            yield pl.from_dicts([dict(zip(cols, r)) for r in rows])
+
+
+def filter_new_legacy(df: pl.DataFrame, seen_ids: set[str]) -> pl.DataFrame:
+    df = df.with_columns(
+        pl.struct(["order_id", "product_id"]).map_elements(lambda s: f"{s['order_id']}_{s['product_id']}", return_dtype=pl.Utf8).alias("doc_id")
+    )
+    return df.filter(~pl.col("doc_id").is_in(seen_ids))
+
+
+def run(stream, filter_fn, engine) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    rows = 0
+    doc_ids: set[str] = set()
+    for df in stream(engine):
+        df = filter_fn(df, set())
+        rows += df.height
+        doc_ids.update(df["doc_id"].to_list())
+    return rows, len(doc_ids), time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark da leitura SQL + filtro do ingest")
+    ap.add_argument("--db", default="data/olist.db", help="Caminho do SQLite do Olist")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetições (usa a melhor)")
+    args = ap.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}", connect_args={"check_same_thread": False})
+    ensure_source_indexes(engine)
+
+    result = {"benchmark": "read_filter", "db": args.db}
+    for name, stream, filter_fn in [
+        ("legacy", stream_reviews_legacy, filter_new_legacy),
+        ("current", stream_reviews, filter_new),
+    ]:
+        runs = [run(stream, filter_fn, engine) for _ in range(args.repeat)]
+        rows, unique_docs, elapsed = min(runs, key=lambda r: r[2])
+        result[name] = {
+            "rows": rows,
+            "unique_doc_ids": unique_docs,
+            "seconds": round(elapsed, 4),
+            "rows_per_sec": round(rows / elapsed, 1),
+            "doc_ids_per_sec": round(unique_docs / elapsed, 1),
+        }
+    result["speedup"] = round(result["legacy"]["seconds"] / result["current"]["seconds"], 2)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
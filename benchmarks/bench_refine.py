@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import polars as pl
+
+from bench_api import free_port, percentiles, start_process, wait_ready
+from synthetic_corpus import PHRASES
+
+ROOT = Path(__file__).parent.parent
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark do refine.py em modo async contra o servidor fake da OpenAI: vazão (rótulos/s)
+# e latência de cada lote enviado ao LLM (p50/p95/p99), com latência e 429 configuráveis.
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def synthetic_reviews(n: int, seed: int) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    phrases = [phrase for group in PHRASES.values() for phrase in group]
+    texts = [" ".join(phrases[j] for j in rng.choice(len(phrases), size=rng.integers(1, 4), replace=False)) for _ in range(n)]
+    return pl.DataFrame({"doc_id": [f"review{i:08d}" for i in range(n)], "review_text": texts})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do refine.py (modo async) com o LLM simulado")
+    ap.add_argument("--workdir", default="data/bench", help="Diretório dos logs do benchmark")
+    ap.add_argument("--reviews", type=int, default=2_000, help="Reviews enviados para rotulação")
+    ap.add_argument("--batch-size", type=int, default=10)
+    ap.add_argument("--max-batch-size", type=int, default=None)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rpm", type=int, default=None, help="Limite de requisições por minuto do cliente")
+    ap.add_argument("--llm-latency-ms", type=float, default=300.0, help="Latência média do LLM simulado")
+    ap.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Variação da latência do LLM simulado (±)")
+    ap.add_argument("--llm-rpm", type=int, default=0, help="Requisições por minuto antes do LLM simulado responder 429")
+    ap.add_argument("--mismatch-rate", type=float, default=0.0, help="Fração das respostas com um rótulo a menos")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    workdir = Path(args.workdir).resolve()
+    df = synthetic_reviews(args.reviews, args.seed)
+
+    llm_port = free_port()
+    llm = start_process(
+        [
+            sys.executable,
+            str(ROOT / "benchmarks" / "fake_openai.py"),
+            f"--port={llm_port}",
+            f"--latency-ms={args.llm_latency_ms}",
+            f"--jitter-ms={args.llm_jitter_ms}",
+            f"--rpm={args.llm_rpm}",
+            f"--mismatch-rate={args.mismatch_rate}",
+            f"--seed={args.seed}",
+        ],
+        {},
+        workdir / "logs" / "fake_openai_refine.log",
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{llm_port}/stats", llm)
+
+        # O refine cria os clientes da OpenAI ao ser importado
+        os.environ.update(OPENAI_BASE_URL=f"http://127.0.0.1:{llm_port}/v1", OPENAI_API_KEY="sk-bench")
+        sys.path.append(str(ROOT / "scripts"))
+        import refine  # noqa: E402
+        from label_journal import LabelJournal  # noqa: E402
+
+        latencies: list[float] = []
+        classify = refine.aclassify_batch
+
+        async def timed_classify(texts):
+            start = time.perf_counter()
+            labels = await classify(texts)
+            latencies.append(time.perf_counter() - start)
+            return labels
+
+        refine.aclassify_batch = timed_classify
+        refine_args = argparse.Namespace(
+            batch_size=args.batch_size,
+            max_batch_size=args.max_batch_size,
+            concurrency=args.concurrency,
+            rpm=args.rpm,
+            tpm=None,
+            checkpoint=1_000,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = LabelJournal(Path(tmp) / "labels.jsonl")
+            start = time.perf_counter()
+            labeled = asyncio.run(refine.refine_async(df, journal, refine_args))
+            elapsed = time.perf_counter() - start
+        llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+    finally:
+        llm.terminate()
+        llm.wait(timeout=10)
+
+    result = {
+        "benchmark": "refine",
+        "reviews": args.reviews,
+        "labeled": labeled,
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "llm_latency_ms": args.llm_latency_ms,
+        "seconds": round(elapsed, 2),
+        "labels_per_sec": round(labeled / elapsed, 1),
+        "llm_requests": llm_stats["requests"],
+        "batch": {"requests": len(latencies), **percentiles(latencies)},
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
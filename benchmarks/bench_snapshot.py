@@ -0,0 +1,78 @@
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "app"))
+from core.review_snapshot import ReviewSnapshot, write_review_snapshot  # noqa: E402
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark do snapshot memory-mapped de reviews: escrita (linhas/s) e leitura por produto (µs)
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def synthetic_batches(rows: int, products: int, dim: int, batch: int = 1000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Distribuição assimétrica de reviews por produto, como no Olist
+    weights = 1 / np.arange(1, products + 1)
+    product_of_row = rng.choice(products, size=rows, p=weights / weights.sum())
+    labels = ["positivo", "neutro", "negativo"]
+    for start in range(0, rows, batch):
+        end = min(start + batch, rows)
+        yield {
+            "documents": [f"Review sintético {i} sobre o produto, com algum texto." for i in range(start, end)],
+            "metadatas": [
+                {"product_id": f"product_{product_of_row[i]:06d}", "sentiment_label": labels[i % 3], "creation_date": "2018-01-01 00:00:00"}
+                for i in range(start, end)
+            ],
+            "embeddings": rng.normal(size=(end - start, dim)).astype(np.float32),
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do snapshot memory-mapped de reviews")
+    ap.add_argument("--rows", type=int, default=100_000, help="Reviews no snapshot")
+    ap.add_argument("--products", type=int, default=10_000, help="Produtos distintos")
+    ap.add_argument("--dim", type=int, default=384, help="Dimensão dos embeddings")
+    ap.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    ap.add_argument("--lookups", type=int, default=5_000, help="Leituras de produtos aleatórios")
+    args = ap.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench_snapshot_"))
+    try:
+        start = time.perf_counter()
+        metadata = write_review_snapshot(directory, "bench", synthetic_batches(args.rows, args.products, args.dim), dtype=args.dtype)
+        write_s = time.perf_counter() - start
+
+        snapshot = ReviewSnapshot(directory, "bench")
+        rng = random.Random(0)
+        product_ids = [f"product_{rng.randrange(args.products):06d}" for _ in range(args.lookups)]
+        latencies = []
+        for product_id in product_ids:
+            start = time.perf_counter()
+            snapshot.get(product_id)
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+        result = {
+            "benchmark": "review_snapshot",
+            "rows": metadata["rows"],
+            "products": metadata["products"],
+            "dtype": args.dtype,
+            "write_rows_per_sec": round(metadata["rows"] / write_s, 1),
+            "lookup_p50_us": round(float(np.percentile(latencies, 50)), 1),
+            "lookup_p95_us": round(float(np.percentile(latencies, 95)), 1),
+        }
+        print(json.dumps(result))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+ROOT = Path(__file__).parent.parent
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Suite de benchmarks offline: gera o corpus sintético, roda o ingest, a API/MCP e o refine
+# com o LLM simulado e grava um único JSON por commit, para comparar p50/p95/p99 e vazão
+# entre commits (--compare).
+# ────────────────────────────────────────────────────────────────────────────────
+
+# Métricas comparadas: menor é melhor para latências, maior é melhor para vazão
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "seconds")
+HIGHER_IS_BETTER = ("throughput_rps", "rows_per_sec", "labels_per_sec")
+
+
+def git_info() -> dict:
+    def git(*cmd: str) -> str:
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_benchmark(script: str, options: list[str]) -> dict:
+    cmd = [sys.executable, str(ROOT / "benchmarks" / script), *options]
+    logger.info("Rodando {}", " ".join(cmd[1:]))
+    start = time.perf_counter()
+    process = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"{script} terminou com código {process.returncode}")
+    # O resultado é a última linha da saída padrão; os logs vão para a saída de erro
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    logger.info("{} concluído em {:.1f}s", script, time.perf_counter() - start)
+    return result
+
+
+def flatten(result: dict, prefix: str = "") -> dict[str, float]:
+    metrics = {}
+    for key, value in result.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            metrics[name] = value
+    return metrics
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[dict]:
+    old_metrics, new_metrics = flatten(old["benchmarks"]), flatten(new["benchmarks"])
+    rows = []
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[name], new_metrics[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = change > threshold if name.rsplit(".", 1)[-1] in LOWER_IS_BETTER else change < -threshold
+        rows.append({"metric": name, "old": before, "new": after, "change_pct": round(change * 100, 1), "regression": worse})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Roda os benchmarks offline e grava um JSON comparável entre commits")
+    ap.add_argument("--workdir", default="data/bench", help="Diretório do corpus, da coleção e dos caches do benchmark")
+    ap.add_argument("--reviews", type=int, default=10_000, help="Reviews do corpus sintético, de 10k a 1M")
+    ap.add_argument("--products", type=int, default=None, help="Produtos distintos (padrão: reviews / 3)")
+    ap.add_argument("--skew", type=float, default=1.1, help="Expoente de Zipf dos reviews e das consultas por produto")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--requests", type=int, default=200, help="Requisições por endpoint da API")
+    ap.add_argument("--concurrency", type=int, default=16, help="Clientes simultâneos da API")
+    ap.add_argument("--llm-latency-ms", type=float, default=300.0, help="Latência média do LLM simulado")
+    ap.add_argument("--refine-reviews", type=int, default=2_000, help="Reviews rotulados no benchmark do refine")
+    ap.add_argument("--pipeline", action="store_true", help="Roda o ingest em pipeline")
+    ap.add_argument("--caches", action="store_true", help="Mantém os caches de resultados e do LLM ligados na API")
+    ap.add_argument("--skip", nargs="*", choices=["ingest", "api", "refine"], default=[], help="Benchmarks que não serão rodados")
+    ap.add_argument("--output", default=None, help="JSON de saída (padrão: <workdir>/results/<commit>.json)")
+    ap.add_argument("--compare", default=None, help="JSON de uma execução anterior para comparar")
+    ap.add_argument("--threshold", type=float, default=0.1, help="Variação relativa considerada regressão na comparação")
+    args = ap.parse_args()
+
+    workdir = Path(args.workdir).resolve()
+    common = [f"--workdir={workdir}", f"--seed={args.seed}"]
+    benchmarks = {}
+    if "ingest" not in args.skip:
+        options = [*common, f"--reviews={args.reviews}", f"--skew={args.skew}"]
+        if args.products:
+            options.append(f"--products={args.products}")
+        if args.pipeline:
+            options.append("--pipeline")
+        benchmarks["ingest"] = run_benchmark("bench_ingest.py", options)
+    if "api" not in args.skip:
+        options = [
+            *common,
+            f"--requests={args.requests}",
+            f"--concurrency={args.concurrency}",
+            f"--skew={args.skew}",
+            f"--llm-latency-ms={args.llm_latency_ms}",
+        ]
+        if args.caches:
+            options.append("--caches")
+        benchmarks["api"] = run_benchmark("bench_api.py", options)
+    if "refine" not in args.skip:
+        options = [*common, f"--reviews={args.refine_reviews}", f"--llm-latency-ms={args.llm_latency_ms}"]
+        benchmarks["refine"] = run_benchmark("bench_refine.py", options)
+
+    git = git_info()
+    result = {
+        **git,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "threshold")},
+        "benchmarks": benchmarks,
+    }
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text())
+        result["comparison"] = {"baseline": old.get("commit"), "metrics": compare(old, result, args.threshold)}
+        regressions = [row for row in result["comparison"]["metrics"] if row["regression"]]
+        for row in regressions:
+            logger.warning("Regressão em {metric}: {old} → {new} ({change_pct:+.1f}%)", **row)
+        logger.info("{} métricas comparadas com {}, {} regressões", len(result["comparison"]["metrics"]), old.get("commit"), len(regressions))
+
+    # Gravado só depois da comparação, para que o arquivo guarde as regressões encontradas
+    output = Path(args.output or workdir / "results" / f"{git['commit'] or 'nogit'}{'-dirty' if git['dirty'] else ''}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    logger.info("Resultados gravados em {}", output)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
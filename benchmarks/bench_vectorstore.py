@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "app"))
+from core.chroma_client import create_chroma_client  # noqa: E402
+
+BENCH_COLLECTION = "bench_vector_store"
+UPSERT_BATCH = 256
+INCLUDE = ["documents", "metadatas", "embeddings"]
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Benchmark do vector store: servidor Chroma (HTTP) vs. Chroma embutido no processo.
+# Os dois recebem exatamente a mesma coleção e as mesmas consultas do ReviewRepository.
+# Requer o pacote chromadb completo (extra "embedded") e um servidor Chroma ativo.
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def synthetic_rows(products: int, reviews_per_product: int, dim: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    n = products * reviews_per_product
+    labels = ["positivo", "neutro", "negativo"]
+    return {
+        "ids": [f"doc_{i}" for i in range(n)],
+        "documents": [f"Review sintético {i} com algum texto sobre o produto." for i in range(n)],
+        "embeddings": rng.normal(size=(n, dim)).astype(np.float32),
+        "metadatas": [
+            {
+                "product_id": f"product_{i % products}",
+                "sentiment_label": labels[i % 3],
+                "creation_date": f"2018-{1 + i % 12:02d}-{1 + i % 28:02d} 00:00:00",
+                "review_score": 1 + i % 5,
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def copy_rows(collection, max_rows: int) -> dict:
+    rows = {"ids": [], "documents": [], "embeddings": [], "metadatas": []}
+    while len(rows["ids"]) < max_rows:
+        batch = collection.get(limit=min(1000, max_rows - len(rows["ids"])), offset=len(rows["ids"]), include=INCLUDE)
+        if not batch["ids"]:
+            break
+        for key in rows:
+            rows[key].extend(batch[key])
+    rows["embeddings"] = np.asarray(rows["embeddings"], dtype=np.float32)
+    return rows
+
+
+def fresh_collection(client):
+    try:
+        client.delete_collection(BENCH_COLLECTION)
+    except Exception:
+        pass
+    return client.create_collection(BENCH_COLLECTION)
+
+
+def upsert_rows_per_sec(collection, rows: dict) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(rows["ids"]), UPSERT_BATCH):
+        collection.upsert(
+            ids=rows["ids"][i : i + UPSERT_BATCH],
+            documents=rows["documents"][i : i + UPSERT_BATCH],
+            embeddings=rows["embeddings"][i : i + UPSERT_BATCH].tolist(),
+            metadatas=rows["metadatas"][i : i + UPSERT_BATCH],
+        )
+    return len(rows["ids"]) / (time.perf_counter() - start)
+
+
+def timed_gets(collection, wheres: list[dict]) -> list[float]:
+    latencies = []
+    for where in wheres:
+        start = time.perf_counter()
+        result = collection.get(where=where, include=INCLUDE)
+        np.asarray(result["embeddings"], dtype=np.float32)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(latencies: list[float]) -> dict:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "queries_per_sec": round(1000 * len(latencies) / sum(latencies), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do vector store HTTP vs. embutido")
+    ap.add_argument("--host", default=os.getenv("CHROMA_HOST", "localhost"))
+    ap.add_argument("--port", default=os.getenv("CHROMA_PORT", "8000"))
+    ap.add_argument("--copy-from", default=None, help="Copia uma coleção existente do servidor em vez de gerar dados sintéticos")
+    ap.add_argument("--max-rows", type=int, default=20_000, help="Máximo de linhas copiadas com --copy-from")
+    ap.add_argument("--products", type=int, default=500, help="Produtos sintéticos")
+    ap.add_argument("--reviews-per-product", type=int, default=20, help="Reviews sintéticos por produto")
+    ap.add_argument("--dim", type=int, default=384, help="Dimensão dos embeddings sintéticos")
+    ap.add_argument("--queries", type=int, default=200, help="Consultas de produto único")
+    ap.add_argument("--batch-products", type=int, default=50, help="Produtos por consulta $in (rota batch)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    http_client = create_chroma_client("http", args.host, args.port)
+    tmp_dir = Path(tempfile.mkdtemp(prefix="bench_chroma_"))
+    embedded_client = create_chroma_client("embedded", path=tmp_dir)
+
+    try:
+        if args.copy_from:
+            rows = copy_rows(http_client.get_collection(args.copy_from), args.max_rows)
+        else:
+            rows = synthetic_rows(args.products, args.reviews_per_product, args.dim, args.seed)
+        product_ids = sorted({meta["product_id"] for meta in rows["metadatas"]})
+        logger.info("{} linhas de {} produtos", len(rows["ids"]), len(product_ids))
+
+        rng = random.Random(args.seed)
+        single = [{"product_id": rng.choice(product_ids)} for _ in range(args.queries)]
+        batches = [
+            {"product_id": {"$in": rng.sample(product_ids, min(args.batch_products, len(product_ids)))}}
+            for _ in range(max(1, args.queries // 10))
+        ]
+
+        result = {"benchmark": "vector_store", "rows": len(rows["ids"]), "products": len(product_ids)}
+        for mode, client in (("http", http_client), ("embedded", embedded_client)):
+            collection = fresh_collection(client)
+            result[f"{mode}_upsert_rows_per_sec"] = round(upsert_rows_per_sec(collection, rows), 1)
+            timed_gets(collection, single[:10])  # aquecimento
+            result[f"{mode}_product_snapshot"] = summarize(timed_gets(collection, single))
+            result[f"{mode}_batch_snapshot"] = summarize(timed_gets(collection, batches))
+
+        result["product_snapshot_speedup"] = round(result["http_product_snapshot"]["p50_ms"] / result["embedded_product_snapshot"]["p50_ms"], 2)
+        print(json.dumps(result))
+    finally:
+        try:
+            http_client.delete_collection(BENCH_COLLECTION)
+        except Exception:
+            pass
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
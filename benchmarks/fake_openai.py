@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Servidor local compatível com a API da OpenAI (chat completions, files e batches),
+# para testes e benchmarks offline. Aponte o SDK para ele com OPENAI_BASE_URL=http://host:porta/v1
+# ────────────────────────────────────────────────────────────────────────────────
+
+LABELS = ["positivo", "neutro", "negativo"]
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    token_latency_ms: float = 10.0
+    rpm: int = 0
+    mismatch_rate: float = 0.0
+    batch_delay_s: float = 2.0
+    seed: int = 0
+
+
+def _label(text: str) -> str:
+    # Rótulo determinístico por texto, para respostas reproduzíveis
+    return LABELS[int(hashlib.sha1(text.encode("utf-8")).hexdigest(), 16) % len(LABELS)]
+
+
+def _completion_text(body: dict, rng: random.Random, config: FakeConfig) -> str:
+    messages = body.get("messages", [])
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+    if "classificador de sentimento" in system:
+        texts = re.findall(r"^\[\d+\] (.*)$", user, flags=re.MULTILINE)
+        labels = [_label(text) for text in texts]
+        if labels and rng.random() < config.mismatch_rate:
+            labels = labels[:-1]
+        return json.dumps({"labels": labels})
+
+    if body.get("response_format", {}).get("type") == "json_object":
+        points = {"pontos_positivos": ["Boa qualidade", "Entrega do que promete"], "pontos_negativos": ["Acabamento simples"]}
+        if "'resumo'" in system:
+            return json.dumps({"resumo": "O produto atende às expectativas na maior parte dos reviews.", **points}, ensure_ascii=False)
+        return json.dumps(points, ensure_ascii=False)
+
+    return "Os reviews destacam a boa qualidade do produto, com algumas ressalvas sobre o acabamento."
+
+
+def _chat_completion(body: dict, content: str) -> dict:
+    prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def _jsonl(items: list[dict]) -> bytes:
+    return "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items).encode("utf-8")
+
+
+def create_app(config: FakeConfig | None = None) -> FastAPI:
+    config = config or FakeConfig()
+    rng = random.Random(config.seed)
+    requests_log: deque[float] = deque()
+    app = FastAPI(title="Fake OpenAI")
+    app.state.config = config
+    app.state.stats = {"requests": 0, "rate_limited": 0, "batches": 0}
+    files: dict[str, dict] = {}
+    batches: dict[str, dict] = {}
+
+    def rate_limited() -> JSONResponse | None:
+        if not config.rpm:
+            return None
+        now = time.monotonic()
+        while requests_log and now - requests_log[0] >= 60:
+            requests_log.popleft()
+        if len(requests_log) >= config.rpm:
+            app.state.stats["rate_limited"] += 1
+            retry_after = max(1, int(requests_log[0] + 60 - now) + 1)
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        requests_log.append(now)
+        return None
+
+    async def latency() -> None:
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.stats["requests"] += 1
+        if (limited := rate_limited()) is not None:
+            return limited
+
+        content = _completion_text(body, rng, config)
+        completion = _chat_completion(body, content)
+        completion_id, created, model = completion["id"], completion["created"], completion["model"]
+        await latency()
+
+        if body.get("stream"):
+
+            async def chunks():
+                words = re.findall(r"\S+\s*", content)
+                for word in words:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(config.token_latency_ms / 1000)
+                done = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return completion
+
+    # ── Files e Batch API ──────────────────────────────────────────────────────
+
+    def store_file(content: bytes, filename: str, purpose: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+            "content": content,
+        }
+        return {key: value for key, value in files[file_id].items() if key != "content"}
+
+    @app.post("/v1/files")
+    async def create_file(file: UploadFile = File(...), purpose: str = Form(...)):
+        return store_file(await file.read(), file.filename or "upload.jsonl", purpose)
+
+    @app.get("/v1/files/{file_id}")
+    async def retrieve_file(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="File not found")
+        return {key: value for key, value in files[file_id].items() if key != "content"}
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="File not found")
+        return PlainTextResponse(files[file_id]["content"].decode("utf-8"))
+
+    async def process_batch(batch: dict) -> None:
+        # Simula o processamento assíncrono: cada linha vira uma resposta no arquivo de saída
+        await asyncio.sleep(config.batch_delay_s / 2)
+        batch["status"] = "in_progress"
+        lines = files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        outputs, errors = [], []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            if request.get("url") != batch["endpoint"]:
+                errors.append(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                        "custom_id": request.get("custom_id"),
+                        "response": None,
+                        "error": {"code": "invalid_url", "message": "URL não suportada"},
+                    }
+                )
+                continue
+            completion = _chat_completion(request["body"], _completion_text(request["body"], rng, config))
+            outputs.append(
+                {
+                    "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": completion},
+                    "error": None,
+                }
+            )
+        await asyncio.sleep(config.batch_delay_s / 2)
+        if outputs:
+            batch["output_file_id"] = store_file(_jsonl(outputs), "output.jsonl", "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = store_file(_jsonl(errors), "errors.jsonl", "batch_output")["id"]
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in files:
+            raise HTTPException(status_code=400, detail="input_file_id inválido")
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        app.state.stats["batches"] += 1
+        asyncio.create_task(process_batch(batches[batch_id]))
+        return batches[batch_id]
+
+    @app.get("/v1/batches")
+    async def list_batches(limit: int = 20, after: str | None = None):
+        # Mais recentes primeiro, paginado por cursor como na API
+        ordered = list(reversed(batches.values()))
+        if after in batches:
+            ordered = ordered[[b["id"] for b in ordered].index(after) + 1 :]
+        page = ordered[:limit]
+        return {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(ordered) > limit,
+        }
+
+    @app.get("/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        if batch_id not in batches:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        return batches[batch_id]
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor fake compatível com a API da OpenAI")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="Latência média até a resposta (ou o primeiro token)")
+    ap.add_argument("--jitter-ms", type=float, default=100.0, help="Variação uniforme da latência (±)")
+    ap.add_argument("--token-latency-ms", type=float, default=10.0, help="Intervalo entre chunks no modo stream")
+    ap.add_argument("--rpm", type=int, default=0, help="Requisições por minuto antes de responder 429 (0 = sem limite)")
+    ap.add_argument("--mismatch-rate", type=float, default=0.0, help="Fração das classificações com um rótulo a menos")
+    ap.add_argument("--batch-delay-s", type=float, default=2.0, help="Tempo até um batch da Batch API ficar pronto")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    config = FakeConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_latency_ms=args.token_latency_ms,
+        rpm=args.rpm,
+        mismatch_rate=args.mismatch_rate,
+        batch_delay_s=args.batch_delay_s,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from bench_api import free_port, start_process, wait_ready
+from bench_refine import synthetic_reviews
+
+ROOT = Path(__file__).parent.parent
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Verificação da retomada do refine --mode batch-api contra o fake_openai.py.
+# Para cada ponto crítico o processo é encerrado à força (os._exit) e executado de novo:
+# todos os reviews devem terminar rotulados, com um único batch criado por arquivo.
+# ────────────────────────────────────────────────────────────────────────────────
+
+CRASH_EXIT = 137
+CRASH_POINTS = {
+    "after_upload": "depois do upload do arquivo, antes de gravar o estado",
+    "after_create": "depois de criar o batch, antes de gravar o estado",
+    "while_waiting": "durante a espera pelo batch",
+    "mid_ingest": "no meio da leitura da saída do batch para o journal",
+}
+
+
+def crash_after(obj, name: str, calls: int = 1) -> None:
+    # Substitui obj.name: a chamada número `calls` é executada e o processo morre em seguida
+    original = getattr(obj, name)
+    count = 0
+
+    def wrapper(*args, **kwargs):
+        nonlocal count
+        result = original(*args, **kwargs)
+        count += 1
+        if count >= calls:
+            os._exit(CRASH_EXIT)
+        return result
+
+    setattr(obj, name, wrapper)
+
+
+def run_child(args) -> None:
+    # O refine cria os clientes da OpenAI ao ser importado
+    sys.path.append(str(ROOT / "scripts"))
+    import refine  # noqa: E402
+    from label_journal import LabelJournal  # noqa: E402
+
+    if args.crash_at == "after_upload":
+        crash_after(refine.client.files, "create")
+    elif args.crash_at == "after_create":
+        crash_after(refine.client.batches, "create")
+    elif args.crash_at == "while_waiting":
+        crash_after(refine.client.batches, "retrieve")
+    elif args.crash_at == "mid_ingest":
+        crash_after(LabelJournal, "append", calls=2)
+
+    workdir = Path(args.workdir)
+    journal = LabelJournal(workdir / "labels.jsonl")
+    refine_args = argparse.Namespace(batch_size=args.batch_size, poll_interval=0.2)
+    updated = refine.refine_batch_api(synthetic_reviews(args.reviews, args.seed), journal, refine_args, workdir / "batch_api")
+    journal.close()
+    print(json.dumps({"updated": updated}))
+
+
+def run_scenario(crash_at: str, base_url: str, args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix=f"refine_resume_{crash_at}_"))
+    cmd = [
+        sys.executable,
+        __file__,
+        "--child",
+        f"--workdir={workdir}",
+        f"--reviews={args.reviews}",
+        f"--batch-size={args.batch_size}",
+        f"--seed={args.seed}",
+    ]
+    env = {**os.environ, "OPENAI_BASE_URL": f"{base_url}/v1", "OPENAI_API_KEY": "sk-bench"}
+    batches_before = httpx.get(f"{base_url}/stats").json()["batches"]
+
+    crashed = subprocess.run([*cmd, f"--crash-at={crash_at}"], env=env, capture_output=True, text=True)
+    resumed = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if resumed.returncode != 0:
+        raise RuntimeError(f"Retomada após {crash_at} falhou:\n{resumed.stderr[-2000:]}")
+
+    sys.path.append(str(ROOT / "scripts"))
+    from label_journal import LabelJournal  # noqa: E402
+
+    journal = LabelJournal(workdir / "labels.jsonl")
+    lines = sum(1 for _ in journal._lines())
+    labels = journal.read()
+    expected = set(synthetic_reviews(args.reviews, args.seed)["doc_id"])
+    result = {
+        "crash_at": crash_at,
+        "crashed": crashed.returncode == CRASH_EXIT,
+        "labeled": labels.height,
+        "missing": len(expected - set(labels["doc_id"])),
+        "duplicate_lines": lines - labels.height,
+        "batches_created": httpx.get(f"{base_url}/stats").json()["batches"] - batches_before,
+        "state_removed": not (workdir / "batch_api").exists(),
+    }
+    # Sem respostas inválidas (--mismatch-rate 0) um único batch cobre todos os reviews
+    result["ok"] = result["crashed"] and result["missing"] == 0 and result["state_removed"] and result["batches_created"] == 1
+    if result["ok"]:
+        shutil.rmtree(workdir)
+    else:
+        result["workdir"] = str(workdir)
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verifica a retomada do refine --mode batch-api após interrupções")
+    ap.add_argument("--reviews", type=int, default=200, help="Reviews rotulados em cada cenário")
+    ap.add_argument("--batch-size", type=int, default=10)
+    ap.add_argument("--crash-at", choices=list(CRASH_POINTS), default=None, help="Ponto da interrupção (padrão: todos)")
+    ap.add_argument("--workdir", default="data/bench", help="Diretório dos logs do servidor fake")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    port = free_port()
+    llm = start_process(
+        [sys.executable, str(ROOT / "benchmarks" / "fake_openai.py"), f"--port={port}", "--batch-delay-s=0.5", f"--seed={args.seed}"],
+        {},
+        Path(args.workdir).resolve() / "logs" / "fake_openai_refine_resume.log",
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(f"{base_url}/stats", llm)
+        results = [run_scenario(crash_at, base_url, args) for crash_at in ([args.crash_at] if args.crash_at else CRASH_POINTS)]
+    finally:
+        llm.terminate()
+        llm.wait(timeout=10)
+
+    print(json.dumps({"benchmark": "refine_resume", "reviews": args.reviews, "scenarios": results}))
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Corpus sintético no formato do Olist (order_reviews + order_items) para os benchmarks.
+# A quantidade de reviews por produto segue uma distribuição de Zipf, como no Olist:
+# poucos produtos concentram muitos reviews e a maioria tem um ou dois.
+# ────────────────────────────────────────────────────────────────────────────────
+
+BENCH_COLLECTION = "bench_reviews"
+EMBEDDING_DIM = 384
+
+PHRASES = {
+    "positivo": [
+        "Produto excelente, chegou antes do prazo.",
+        "Muito bom, recomendo a todos.",
+        "Qualidade ótima pelo preço pago.",
+        "Funciona perfeitamente, estou satisfeito.",
+        "Acabamento bonito e material resistente.",
+    ],
+    "neutro": [
+        "Produto ok, nada de especial.",
+        "Atende ao que promete, mas poderia ser melhor.",
+        "Chegou conforme o anunciado.",
+        "É razoável para o uso diário.",
+    ],
+    "negativo": [
+        "Produto veio com defeito.",
+        "Qualidade muito ruim, não recomendo.",
+        "Parou de funcionar em poucos dias.",
+        "Material frágil e diferente da foto.",
+        "Não corresponde à descrição do anúncio.",
+    ],
+}
+SCORES = {"positivo": (4, 5), "neutro": (3,), "negativo": (1, 2)}
+
+
+def workdir_env(workdir: str | Path, openai_base_url: str | None = None) -> dict[str, str]:
+    # Variáveis lidas pelo ingest e pela API: tudo aponta para o diretório do benchmark,
+    # com o Chroma embutido (sem servidor) para rodar offline
+    workdir = Path(workdir).resolve()
+    cache = workdir / "cache"
+    env = {
+        "DATABASE_URL": f"sqlite:///{workdir / 'olist.db'}",
+        "DB_URL": f"sqlite:///{workdir / 'olist.db'}",
+        "COLLECTION": BENCH_COLLECTION,
+        "VECTOR_STORE_MODE": "embedded",
+        "VECTOR_STORE_PATH": str(workdir / "chroma"),
+        "CHROMA_HOST": "localhost",
+        "CHROMA_PORT": "8000",
+        "LLM_CACHE_PATH": str(cache / "llm_cache.db"),
+        "EMBEDDING_CACHE_DIR": str(cache / "embeddings"),
+        "INGEST_STATE_PATH": str(cache / "ingest_state.db"),
+        "PRODUCT_AGGREGATES_PATH": str(cache / "product_aggregates.db"),
+        "REVIEW_SNAPSHOT_DIR": str(cache / "review_snapshot"),
+        "RESULTS_STORE_PATH": str(cache / "results.db"),
+        "OPENAI_API_KEY": "sk-bench",
+        "GEMINI_API_KEY": "bench",
+        "API_URL": "http://127.0.0.1:8001",
+    }
+    if openai_base_url:
+        env["OPENAI_BASE_URL"] = openai_base_url
+    return env
+
+
+class HashEmbedder:
+    # Embedder determinístico (vetor aleatório semeado pelo texto), para medir o ingest
+    # sem baixar o modelo de embeddings. Mesma interface de core.embeddings
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.model = None
+
+    @property
+    def cache_name(self) -> str:
+        return f"bench-hash-{self.dim}"
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def product_weights(products: int, skew: float) -> np.ndarray:
+    weights = 1 / np.arange(1, products + 1) ** skew
+    return weights / weights.sum()
+
+
+def write_olist_db(
+    path: str | Path,
+    reviews: int,
+    products: int,
+    skew: float = 1.1,
+    empty_rate: float = 0.4,
+    multi_product_rate: float = 0.1,
+    seed: int = 0,
+) -> dict:
+    rng = np.random.default_rng(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+
+    product_ids = [hashlib.md5(f"product-{i}".encode()).hexdigest() for i in range(products)]
+    product_of_order = rng.choice(products, size=reviews, p=product_weights(products, skew))
+    sentiments = rng.choice(list(PHRASES), size=reviews, p=[0.6, 0.15, 0.25])
+    # Datas entre 2017-01-01 e 2018-08-31, como no Olist
+    days = rng.integers(0, 607, size=reviews)
+    seconds = rng.integers(0, 86_400, size=reviews)
+    base = np.datetime64("2017-01-01T00:00:00")
+    dates = (base + days.astype("timedelta64[D]") + seconds.astype("timedelta64[s]")).astype(str)
+
+    def review_rows():
+        for i in range(reviews):
+            sentiment = sentiments[i]
+            text = None
+            if rng.random() >= empty_rate:
+                # Combina frases para ter textos variados (e alguns repetidos, como no Olist)
+                phrases = PHRASES[sentiment]
+                text = " ".join(phrases[j] for j in rng.choice(len(phrases), size=rng.integers(1, 3), replace=False))
+            score = int(rng.choice(SCORES[sentiment]))
+            yield (f"review{i:08d}", f"order{i:08d}", score, text, dates[i].replace("T", " "))
+
+    def item_rows():
+        for i in range(reviews):
+            order_id = f"order{i:08d}"
+            yield (order_id, 1, product_ids[product_of_order[i]])
+            # Pedidos com mais de um produto são descartados pelo ingest
+            if rng.random() < multi_product_rate:
+                yield (order_id, 2, product_ids[rng.integers(products)])
+
+    start = time.perf_counter()
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE order_reviews (review_id TEXT, order_id TEXT, review_score INTEGER, "
+            "review_comment_message TEXT, review_creation_date TEXT)"
+        )
+        conn.execute("CREATE TABLE order_items (order_id TEXT, order_item_id INTEGER, product_id TEXT)")
+        conn.executemany("INSERT INTO order_reviews VALUES (?, ?, ?, ?, ?)", review_rows())
+        conn.executemany("INSERT INTO order_items VALUES (?, ?, ?)", item_rows())
+    conn.close()
+
+    counts = np.bincount(product_of_order, minlength=products)
+    return {
+        "db": str(path),
+        "reviews": reviews,
+        "products": int((counts > 0).sum()),
+        "max_reviews_per_product": int(counts.max()),
+        "median_reviews_per_product": float(np.median(counts[counts > 0])),
+        "skew": skew,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gera um SQLite sintético no formato do Olist")
+    ap.add_argument("--output", default="data/bench/olist.db", help="Caminho do SQLite gerado")
+    ap.add_argument("--reviews", type=int, default=10_000, help="Reviews (pedidos) gerados, de 10k a 1M")
+    ap.add_argument("--products", type=int, default=None, help="Produtos distintos (padrão: reviews / 3)")
+    ap.add_argument("--skew", type=float, default=1.1, help="Expoente da distribuição de Zipf dos reviews por produto")
+    ap.add_argument("--empty-rate", type=float, default=0.4, help="Fração de reviews sem comentário")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    summary = write_olist_db(
+        args.output,
+        args.reviews,
+        args.products or max(10, args.reviews // 3),
+        skew=args.skew,
+        empty_rate=args.empty_rate,
+        seed=args.seed,
+    )
+    print(json.dumps({"benchmark": "synthetic_corpus", **summary}))
+
+
+if __name__ == "__main__":
+    main()
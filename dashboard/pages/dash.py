@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 from pathlib import Path
 
@@ -15,7 +16,7 @@ load_dotenv(dotenv_path=Path().resolve() / ".env", override=True)
 
 API_URL = os.getenv("API_URL")
 PRODUCTS_ENDPOINT = f"{API_URL}/api/v1/products"
-ANALYZE_ENDPOINT = f"{API_URL}/api/v1/analyze_sentiment"
+ANALYZE_STREAM_ENDPOINT = f"{API_URL}/api/v1/analyze_sentiment/stream"
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -30,15 +31,24 @@ async def fetch_products() -> list[dict]:
         return resp.json()
 
 
-async def analyze_product(product_id: int) -> dict:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            ANALYZE_ENDPOINT,
-            params={"product_id": product_id},
-            timeout=30,
-        )
+def stream_analysis(product_id: int):
+    # Eventos NDJSON: overview → points / summary_delta → summary
+    with httpx.stream("GET", ANALYZE_STREAM_ENDPOINT, params={"product_id": product_id}, timeout=30) as resp:
         resp.raise_for_status()
-        return resp.json()
+        for line in resp.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def summary_box(text: str) -> str:
+    return f"<div style='background: #eee; padding: 15px 20px; margin-bottom: 20px; border: 1px solid #ddd; border-radius:4px'>{text}</div>"
+
+
+def render_points(placeholder, points: list[str], empty_message: str) -> None:
+    if len(points) == 0:
+        placeholder.markdown(f"<p style='color: #aaa; font-style: italic'>{empty_message}</p>", unsafe_allow_html=True)
+    else:
+        placeholder.markdown("•  " + "<br/>•  ".join(points), unsafe_allow_html=True)
 
 
 def build_donut(distribution: dict) -> None:
@@ -89,39 +99,44 @@ def render_dashboard():
     if run_btn or random_btn:
         st.markdown(f"### Analisando o produto: {selected_label}")
         product_id = product_options[selected_label]
-        with st.spinner("Consultando API…"):
-            data = asyncio.run(analyze_product(product_id))
-
-        st.markdown(
-            f"<div style='background: #eee; padding: 15px 20px; margin-bottom: 20px; border: 1px solid #ddd; border-radius:4px'>{data['summary']}</div>",
-            unsafe_allow_html=True,
-        )
-
-        col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
-        sentiment_distrib_text = {label: f"{round(dist * 100, 1)}%" for label, dist in data["sentiment_distrib"].items()}
-        col1.metric("Sentimento Predominante", data["sentiment"].capitalize(), border=True)
-        col2.metric("👍🏻 Positivo", sentiment_distrib_text.get("Positivo", "0%"), border=True)
-        col3.metric("😐 Neutro", sentiment_distrib_text.get("Neutro", "0%"), border=True)
-        col4.metric("👎🏻 Negativo", sentiment_distrib_text.get("Negativo", "0%"), border=True)
-
-        build_donut(data["sentiment_distrib"])
+        # Placeholders preenchidos conforme os eventos do stream chegam
+        summary_placeholder = st.empty()
+        summary_placeholder.markdown(summary_box("<i style='color: #aaa'>Gerando resumo…</i>"), unsafe_allow_html=True)
+        overview_container = st.container()
         st.markdown("---")
         col1, col2 = st.columns([1, 1])
-        with col1:
-            st.subheader("Pontos Positivos")
-            if len(data["positive_points"]) == 0:
-                st.markdown("<p style='color: #aaa; font-style: italic'>Não há pontos positivos para este produto.</p>", unsafe_allow_html=True)
-            else:
-                st.markdown("•  " + "<br/>•  ".join(data["positive_points"]), unsafe_allow_html=True)
-
-        with col2:
-            st.subheader("Pontos Negativos")
-            if len(data["negative_points"]) == 0:
-                st.markdown("<p style='color: #aaa; font-style: italic'>Não há pontos negativos para este produto.</p>", unsafe_allow_html=True)
-            else:
-                st.markdown("•  " + "<br/>•  ".join(data["negative_points"]), unsafe_allow_html=True)
-
+        col1.subheader("Pontos Positivos")
+        positive_placeholder = col1.empty()
+        col2.subheader("Pontos Negativos")
+        negative_placeholder = col2.empty()
+        for placeholder in (positive_placeholder, negative_placeholder):
+            placeholder.markdown("<p style='color: #aaa; font-style: italic'>Extraindo pontos…</p>", unsafe_allow_html=True)
         st.markdown("---")
         st.subheader("Top 3 Reviews")
-        for i, review in enumerate(data["top_reviews"], 1):
-            st.markdown(f"**{i}.** {review}")
+        top_reviews_placeholder = st.container()
+
+        summary = ""
+        for event in stream_analysis(product_id):
+            if event["event"] == "overview":
+                with overview_container:
+                    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+                    sentiment_distrib_text = {label: f"{round(dist * 100, 1)}%" for label, dist in event["sentiment_distrib"].items()}
+                    col1.metric("Sentimento Predominante", event["sentiment"].capitalize(), border=True)
+                    col2.metric("👍🏻 Positivo", sentiment_distrib_text.get("Positivo", "0%"), border=True)
+                    col3.metric("😐 Neutro", sentiment_distrib_text.get("Neutro", "0%"), border=True)
+                    col4.metric("👎🏻 Negativo", sentiment_distrib_text.get("Negativo", "0%"), border=True)
+                    build_donut(event["sentiment_distrib"])
+                with top_reviews_placeholder:
+                    for i, review in enumerate(event["top_reviews"], 1):
+                        st.markdown(f"**{i}.** {review}")
+
+            elif event["event"] == "points":
+                render_points(positive_placeholder, event["positive_points"], "Não há pontos positivos para este produto.")
+                render_points(negative_placeholder, event["negative_points"], "Não há pontos negativos para este produto.")
+
+            elif event["event"] == "summary_delta":
+                summary += event["delta"]
+                summary_placeholder.markdown(summary_box(summary), unsafe_allow_html=True)
+
+            elif event["event"] == "summary":
+                summary_placeholder.markdown(summary_box(event["summary"]), unsafe_allow_html=True)
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Cache de embeddings endereçado por conteúdo
+#
+# Os vetores ficam em um arquivo binário float32 (append-only, lido via memmap) e
+# um índice SQLite mapeia hash(modelo + texto normalizado) → linha do arquivo.
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str | Path, model_name: str):
+        self.model_name = model_name
+        self.directory = Path(directory) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.vectors_path.touch(exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mmap: np.memmap | None = None
+
+        self._conn = sqlite3.connect(self.directory / "index.db", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim: int | None = int(row[0]) if row else None
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_name}\0{normalize_text(text)}"
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _lookup(self, keys: list[str]) -> dict[str, int]:
+        found: dict[str, int] = {}
+        # SQLite limita o número de parâmetros por query
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", chunk).fetchall())
+        return found
+
+    def _read(self, rows: list[int]) -> np.ndarray:
+        n_rows = self.vectors_path.stat().st_size // (4 * self.dim)
+        if self._mmap is None or self._mmap.shape[0] < n_rows:
+            # Remapeia apenas quando o arquivo cresceu
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        return np.asarray(self._mmap[rows])
+
+    def _append(self, keys: list[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+
+        row_size = 4 * self.dim
+        first_row = self.vectors_path.stat().st_size // row_size
+        with open(self.vectors_path, "r+b") as f:
+            # Descarta uma linha parcial deixada por uma escrita interrompida, para manter as linhas alinhadas
+            f.truncate(first_row * row_size)
+            f.seek(first_row * row_size)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # O índice só é gravado depois dos vetores estarem em disco, então nunca aponta para linhas inexistentes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO vectors (key, row) VALUES (?, ?)",
+            [(key, first_row + i) for i, key in enumerate(keys)],
+        )
+        self._conn.commit()
+
+    def encode(self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        # Textos repetidos no lote são codificados uma única vez e vetores já
+        # conhecidos são lidos do disco; apenas o restante passa pelo modelo
+        with self._lock:
+            keys = [self.key(t) for t in texts]
+            unique = dict(zip(keys, (normalize_text(t) for t in texts)))
+            found = self._lookup(list(unique)) if self.dim is not None else {}
+            missing = [k for k in unique if k not in found]
+
+            vectors: dict[str, np.ndarray] = {}
+            if found:
+                cached_keys = list(found)
+                vectors.update(zip(cached_keys, self._read([found[k] for k in cached_keys])))
+            if missing:
+                encoded = np.asarray(encode_fn([unique[k] for k in missing]), dtype=np.float32)
+                self._append(missing, encoded)
+                vectors.update(zip(missing, encoded))
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            logger.debug("Cache de embeddings: {} textos, {} codificados", len(texts), len(missing))
+            return np.stack([vectors[k] for k in keys])
+
+    def log_stats(self) -> None:
+        total = self.hits + self.misses
+        logger.info(
+            "Cache de embeddings → {} reaproveitados, {} codificados ({:.1%} de acerto)",
+            self.hits,
+            self.misses,
+            self.hits / total if total else 0.0,
+        )
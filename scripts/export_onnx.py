@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+sys.path.append(str(Path(__file__).parent.parent / "app"))
+from core.embeddings import (  # noqa: E402
+    DEFAULT_MODEL_NAME,
+    ONNX_METADATA_FILE,
+    OnnxEmbedder,
+    TorchEmbedder,
+)
+
+load_dotenv()
+DB_URL = os.getenv("DATABASE_URL", "sqlite:///data/olist.db")
+ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = Path(os.getenv("EMBEDDING_ONNX_DIR", str(ROOT / "model" / "onnx")))
+MODEL_PATH = ROOT / "model" / "sentiment_model.pkl"
+OPSET = 17
+
+# Usadas na checagem de paridade quando o banco de reviews não está disponível
+FALLBACK_SENTENCES = [
+    "Produto excelente, chegou antes do prazo e muito bem embalado.",
+    "Não recebi o produto até agora e ninguém responde.",
+    "O produto é bom, mas a entrega atrasou alguns dias.",
+    "Veio com defeito, quero devolver.",
+    "Recomendo, ótima qualidade pelo preço.",
+    "Razoável. Esperava mais pelo valor pago.",
+    "Chegou tudo certo.",
+    "A cor é diferente da foto do anúncio, mas gostei mesmo assim.",
+]
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Exportação
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def export(model_name: str, output_dir: Path, quantize: bool) -> None:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    # O OnnxEmbedder reproduz apenas Transformer + mean pooling (sem Normalize); o
+    # tamanho é conferido antes de acessar model[1], que pode não existir
+    if len(model) != 2 or not isinstance(model[1], Pooling):
+        raise ValueError(f"Pipeline não suportado: {len(model)} módulos")
+    pooling = model[1].get_pooling_mode_str()
+    if pooling != "mean":
+        raise ValueError(f"Pipeline não suportado: pooling {pooling}")
+
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    sample = tokenizer(FALLBACK_SENTENCES[:2], padding=True, return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = output_dir / "model.onnx"
+    logger.info("Exportando {} para ONNX (opset {})", model_name, OPSET)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+
+    model_file = fp32_path.name
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Quantização dinâmica: pesos em int8, ativações quantizadas em tempo de execução
+        int8_path = output_dir / "model.int8.onnx"
+        logger.info("Quantizando pesos para int8")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+        model_file = int8_path.name
+
+    tokenizer.save_pretrained(str(output_dir))
+    metadata = {
+        "model_name": model_name,
+        "model_file": model_file,
+        "quantized": quantize,
+        "dim": model.get_sentence_embedding_dimension(),
+        "max_length": model.max_seq_length,
+        "pad_token_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "opset": OPSET,
+    }
+    (output_dir / ONNX_METADATA_FILE).write_text(
+        json.dumps(metadata, indent=2), encoding="utf-8"
+    )
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Checagem de paridade
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def sample_reviews(n: int) -> list[str]:
+    try:
+        engine = create_engine(DB_URL)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT review_comment_message FROM order_reviews "
+                    "WHERE review_comment_message IS NOT NULL "
+                    "AND review_comment_message != '' "
+                    "ORDER BY RANDOM() LIMIT :n"
+                ),
+                {"n": n},
+            ).fetchall()
+        if rows:
+            return [row[0] for row in rows]
+    except Exception as e:
+        logger.warning("Não foi possível ler reviews de {}: {}", DB_URL, e)
+    return FALLBACK_SENTENCES
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return (a * b).sum(axis=1)
+
+
+def parity_check(model_name: str, onnx_dir: Path, texts: list[str]) -> dict:
+    reference = TorchEmbedder(model_name).encode(texts)
+    candidate = OnnxEmbedder(onnx_dir).encode(texts)
+    similarity = cosine(reference, candidate)
+    report = {
+        "sentences": len(texts),
+        "cosine_mean": round(float(similarity.mean()), 5),
+        "cosine_min": round(float(similarity.min()), 5),
+    }
+
+    # Os embeddings alimentam o classificador: mede também a concordância dos rótulos
+    if MODEL_PATH.exists():
+        with open(MODEL_PATH, "rb") as f:
+            classifier = pickle.load(f)["model"]
+        same = classifier.predict(reference) == classifier.predict(candidate)
+        report["label_agreement"] = round(float(same.mean()), 5)
+    return report
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# CLI
+# ────────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description="Exporta o modelo de embeddings para ONNX (int8) e valida a paridade"
+    )
+    p.add_argument("--model-name", default=DEFAULT_MODEL_NAME)
+    p.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    p.add_argument(
+        "--no-quantize",
+        action="store_true",
+        help="Mantém os pesos em float32 (sem quantização dinâmica int8)",
+    )
+    p.add_argument(
+        "--sample", type=int, default=500, help="Reviews usadas na checagem de paridade"
+    )
+    p.add_argument(
+        "--min-cosine",
+        type=float,
+        default=0.99,
+        help="Similaridade de cosseno média mínima com os embeddings do torch",
+    )
+    args = p.parse_args()
+
+    # Exporta em um diretório temporário e só substitui o modelo em uso se a paridade passar
+    tmp_dir = args.output_dir.with_name(args.output_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    export(args.model_name, tmp_dir, quantize=not args.no_quantize)
+
+    report = parity_check(args.model_name, tmp_dir, sample_reviews(args.sample))
+    logger.info("Paridade com o torch: {}", json.dumps(report))
+    if report["cosine_mean"] < args.min_cosine:
+        logger.error(
+            "Paridade abaixo do mínimo ({} < {}); modelo mantido em {}",
+            report["cosine_mean"],
+            args.min_cosine,
+            tmp_dir,
+        )
+        sys.exit(1)
+
+    shutil.rmtree(args.output_dir, ignore_errors=True)
+    tmp_dir.replace(args.output_dir)
+    logger.success("Modelo ONNX salvo em {}", args.output_dir)
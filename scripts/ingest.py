@@ -1,17 +1,43 @@
 import argparse
-import json
+import math
 import os
 import pickle
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterable, Iterator
 
-import chromadb
+import numpy as np
 import polars as pl
-from chromadb.config import Settings
 from dotenv import load_dotenv
 from loguru import logger
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import Engine, create_engine, text
+from sqlalchemy import Engine, create_engine, make_url, text
+
+from embedding_cache import EmbeddingCache
+from ingest_state import IngestState
+
+# Módulos compartilhados com a API (sem dependência das settings da aplicação)
+sys.path.append(str(Path(__file__).parent.parent / "app"))
+from core.chroma_client import (  # noqa: E402
+    VECTOR_STORE_MODES,
+    NotFoundError,
+    create_chroma_client,
+)
+from core.embeddings import (  # noqa: E402
+    BACKENDS,
+    DEFAULT_MODEL_NAME,
+    OnnxEmbedder,
+    TorchEmbedder,
+    load_embedder,
+)
+from core.llm_cache import LLMCache  # noqa: E402
+from core.product_aggregates import ProductAggregates  # noqa: E402
+from core.review_snapshot import ReviewSnapshot, write_review_snapshot  # noqa: E402
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuração do ambiente
@@ -21,77 +47,312 @@ DB_URL = os.getenv("DATABASE_URL", "sqlite:///data/olist.db")
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 COLLECTION = os.getenv("COLLECTION", "olist_reviews")
-MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# http: servidor Chroma; embedded: coleção local no mesmo processo (PersistentClient)
+VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "http")
+MODEL_NAME = DEFAULT_MODEL_NAME
+# torch (SentenceTransformer) ou onnx (modelo exportado por scripts/export_onnx.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR", str(Path(__file__).parent.parent / "model" / "onnx")
+)
+CACHE_DIR = Path(__file__).parent.parent / "data" / "cache"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(CACHE_DIR / "llm_cache.db"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", str(CACHE_DIR / "embeddings"))
+INGEST_STATE_PATH = os.getenv("INGEST_STATE_PATH", str(CACHE_DIR / "ingest_state.db"))
+VECTOR_STORE_PATH = os.getenv(
+    "VECTOR_STORE_PATH", str(Path(__file__).parent.parent / "data" / "chroma")
+)
+PRODUCT_AGGREGATES_PATH = os.getenv(
+    "PRODUCT_AGGREGATES_PATH", str(CACHE_DIR / "product_aggregates.db")
+)
+REVIEW_SNAPSHOT_DIR = os.getenv(
+    "REVIEW_SNAPSHOT_DIR", str(CACHE_DIR / "review_snapshot")
+)
+
+MODEL_PATH = Path(__file__).parent.parent / "model" / "sentiment_model.pkl"
 
 DB_BATCH = 2500
 EMB_BATCH = 256
-MODEL_DICT = {}
-
-with open(Path(__file__).parent.parent / "model" / "sentiment_model.pkl", "rb") as f:
-    MODEL_DICT = pickle.load(f)
+ENCODE_BATCH = 64
+ENCODE_WORKERS = 1
+UPLOAD_WORKERS = 4
+QUEUE_SIZE = 4
+LOG_INTERVAL_S = 10
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ────────────────────────────────────────────────────────────────────────────────
 
 
-def sql_engine() -> Engine:
-    return create_engine(DB_URL, connect_args={"check_same_thread": False})
+def load_model_dict() -> dict:
+    with open(MODEL_PATH, "rb") as f:
+        return pickle.load(f)
 
 
-def stream_reviews(engine: Engine) -> Iterator[pl.DataFrame]:
+def sql_engine() -> Engine:
+    # check_same_thread só existe no driver do SQLite
+    if make_url(DB_URL).get_backend_name() == "sqlite":
+        return create_engine(DB_URL, connect_args={"check_same_thread": False})
+    return create_engine(DB_URL)
+
+
+def max_creation_date(engine: Engine) -> str | None:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT MAX(review_creation_date) FROM order_reviews")
+        ).scalar()
+
+
+def ensure_source_indexes(engine: Engine) -> None:
+    # Índices que aceleram o agrupamento por pedido e o filtro da marca d'água.
+    # Altera o banco de origem, por isso só roda com --create-source-indexes
+    statements = [
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order_product "
+        "ON order_items (order_id, product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_order_reviews_creation_date "
+        "ON order_reviews (review_creation_date)",
+    ]
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    logger.info("Índices do banco de origem criados")
+
+
+READ_SCHEMA = {
+    "review_id": pl.Utf8,
+    "order_id": pl.Utf8,
+    "product_id": pl.Utf8,
+    "review_score": pl.Int64,
+    "creation_date": pl.Utf8,
+    "review_text": pl.Utf8,
+}
+
+# Pedidos com um único produto (MIN = MAX equivale a COUNT(DISTINCT) = 1 sem B-tree temporária)
+SINGLE_PRODUCT_ORDERS_SQL = """
+    SELECT order_id, MIN(product_id) AS product_id
+    FROM order_items
+    GROUP BY order_id
+    HAVING MIN(product_id) = MAX(product_id)
+"""
+
+
+def stream_reviews(engine: Engine, since: str | None = None) -> Iterator[pl.DataFrame]:
     logger.info("Streaming SQL em blocos de {} linhas", DB_BATCH)
-    SQL = text(
-        """
+    # No modo incremental lê apenas reviews a partir da marca d'água
+    since_filter = "AND order_reviews.review_creation_date >= :since" if since else ""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            # No SQLite os pedidos com um único produto são pré-calculados em uma tabela
+            # temporária indexada, o que também evita uma linha por item do pedido no JOIN
+            conn.execute(text("DROP TABLE IF EXISTS temp.single_product_orders"))
+            conn.execute(
+                text(
+                    f"CREATE TEMP TABLE single_product_orders AS {SINGLE_PRODUCT_ORDERS_SQL}"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX temp.idx_single_product_orders "
+                    "ON single_product_orders (order_id)"
+                )
+            )
+            single_product_orders = "single_product_orders"
+        else:
+            # Nos demais bancos fica como subconsulta (o planejador decide como materializar)
+            single_product_orders = (
+                f"({SINGLE_PRODUCT_ORDERS_SQL}) AS single_product_orders"
+            )
+
+        SQL = f"""
             SELECT order_reviews.review_id,
                 order_reviews.order_id,
-                order_items.product_id,
+                single_product_orders.product_id,
                 order_reviews.review_score,
                 order_reviews.review_creation_date AS creation_date,
                 order_reviews.review_comment_message AS review_text
 
             FROM order_reviews
-            JOIN order_items ON order_items.order_id = order_reviews.order_id
+            JOIN {single_product_orders}
+                ON single_product_orders.order_id = order_reviews.order_id
 
             WHERE order_reviews.review_comment_message IS NOT NULL
             AND order_reviews.review_comment_message != ''
-            AND order_reviews.order_id IN (
-                SELECT order_id
-                FROM order_items
-                GROUP BY order_id
-                    HAVING COUNT(DISTINCT product_id) = 1
-            )
+            {since_filter}
         """
-    )
-    with engine.connect().execution_options(stream_results=True) as conn:
-        cursor = conn.execution_options(yield_per=DB_BATCH).execute(SQL)
-        cols = cursor.keys()
-        while rows := cursor.fetchmany(DB_BATCH):
-            yield pl.from_dicts([dict(zip(cols, r)) for r in rows])
+        # Lotes de DB_BATCH linhas direto para DataFrames com schema fixo, sem montar o resultado inteiro
+        yield from pl.read_database(
+            text(SQL),
+            conn,
+            iter_batches=True,
+            batch_size=DB_BATCH,
+            schema_overrides=READ_SCHEMA,
+            execute_options={"parameters": {"since": since} if since else {}},
+        )
 
 
 def filter_new(df: pl.DataFrame, seen_ids: set[str]) -> pl.DataFrame:
     df = df.with_columns(
-        pl.struct(["order_id", "product_id"])
-        .map_elements(
-            lambda s: f"{s['order_id']}_{s['product_id']}", return_dtype=pl.Utf8
-        )
-        .alias("doc_id")
+        pl.concat_str(["order_id", "product_id"], separator="_").alias("doc_id")
     )
     return df.filter(~pl.col("doc_id").is_in(seen_ids))
 
 
-def encode_text(model: SentenceTransformer, texts: list[str]):
+def load_encoder(
+    workers: int = ENCODE_WORKERS,
+    torch_threads: int | None = None,
+    backend: str = EMBEDDING_BACKEND,
+) -> tuple[TorchEmbedder | OnnxEmbedder, dict | None]:
+    if backend != "torch" and workers > 1:
+        # O ONNX Runtime já paraleliza cada inferência entre as threads do processo
+        logger.warning("--encode-workers só se aplica ao backend torch; usando 1")
+        workers = 1
+
+    if workers > 1 and not torch_threads:
+        # Evita que cada processo do pool tente usar todos os núcleos
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    if torch_threads:
+        # Os processos do pool herdam a variável
+        os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+
+    start = time.perf_counter()
+    embedder = load_embedder(backend, MODEL_NAME, EMBEDDING_ONNX_DIR, torch_threads)
+    logger.info(
+        "Backend de embeddings {} carregado em {:.1f}s",
+        backend,
+        time.perf_counter() - start,
+    )
+    if workers <= 1:
+        return embedder, None
+
+    logger.info("Iniciando pool de {} processos de encoding", workers)
+    return embedder, embedder.model.start_multi_process_pool(["cpu"] * workers)
+
+
+def encode_text(
+    embedder: TorchEmbedder | OnnxEmbedder,
+    texts: list[str],
+    pool: dict | None = None,
+    batch_size: int = ENCODE_BATCH,
+):
     logger.info("Codificando {} textos", len(texts))
-    return model.encode(texts, batch_size=64)
+    if pool is None:
+        return embedder.encode(texts, batch_size=batch_size)
+
+    # Divide o lote igualmente entre os processos do pool
+    workers = len(pool["processes"])
+    return embedder.model.encode_multi_process(
+        texts,
+        pool,
+        batch_size=batch_size,
+        chunk_size=max(1, math.ceil(len(texts) / workers)),
+    )
+
+
+class StageMeter:
+    # Acumula linhas e tempo ativo por estágio para logar a vazão (linhas/s)
+    # e acompanha a ocupação das filas do pipeline (atual/máxima/capacidade)
+    def __init__(self, log_interval: float = LOG_INTERVAL_S):
+        self.rows: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.queues: dict[str, queue.Queue] = {}
+        self.queue_peaks: dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.log_interval = log_interval
+        self.last_log = self.started
+        self._lock = threading.Lock()
+
+    def watch(self, name: str, q: queue.Queue) -> None:
+        self.queues[name] = q
+
+    def add(self, stage: str, rows: int, elapsed: float) -> None:
+        with self._lock:
+            self.rows[stage] += rows
+            self.seconds[stage] += elapsed
+            if rows:
+                self.samples[stage].append(elapsed)
+            for name, q in self.queues.items():
+                self.queue_peaks[name] = max(self.queue_peaks[name], q.qsize())
+
+    @contextmanager
+    def measure(self, stage: str, rows: int):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, rows, time.perf_counter() - start)
+
+    def timed(
+        self, stage: str, batches: Iterable[pl.DataFrame]
+    ) -> Iterator[pl.DataFrame]:
+        # Mede o tempo gasto produzindo cada lote (ex.: leitura SQL)
+        iterator = iter(batches)
+        while True:
+            start = time.perf_counter()
+            batch = next(iterator, None)
+            self.add(
+                stage,
+                batch.height if batch is not None else 0,
+                time.perf_counter() - start,
+            )
+            if batch is None:
+                return
+            yield batch
+
+    def summary(self) -> dict:
+        # Vazão e latência por lote (p50/p95/p99) de cada estágio, para os benchmarks
+        with self._lock:
+            stages = {
+                stage: {
+                    "rows": self.rows[stage],
+                    "seconds": round(self.seconds[stage], 4),
+                    "rows_per_sec": round(
+                        self.rows[stage] / max(self.seconds[stage], 1e-9), 1
+                    ),
+                    **{
+                        f"batch_p{q}_ms": round(
+                            float(np.percentile(self.samples[stage], q)) * 1000, 2
+                        )
+                        for q in (50, 95, 99)
+                        if self.samples[stage]
+                    },
+                }
+                for stage in self.rows
+            }
+            return {"stages": stages, "queue_peaks": dict(self.queue_peaks)}
+
+    def maybe_log(self) -> bool:
+        if time.perf_counter() - self.last_log < self.log_interval:
+            return False
+        self.log()
+        return True
+
+    def log(self) -> None:
+        with self._lock:
+            stages = [
+                f"{stage}: {self.rows[stage] / max(self.seconds[stage], 1e-9):.0f} linhas/s"
+                for stage in self.rows
+            ]
+            queues = [
+                f"{name}: {q.qsize()}/{self.queue_peaks[name]}/{q.maxsize}"
+                for name, q in self.queues.items()
+            ]
+            self.last_log = time.perf_counter()
+        logger.info("Vazão por estágio (tempo ativo) → {}", " | ".join(stages))
+        if queues:
+            logger.info("Filas (atual/máx/capacidade) → {}", " | ".join(queues))
+        total = self.rows.get("upload", 0)
+        elapsed = time.perf_counter() - self.started
+        logger.info("Vazão total → {:.0f} linhas/s", total / max(elapsed, 1e-9))
 
 
 def upsert_batch(
     collection,
     df: pl.DataFrame,
-    embeddings: list[list[float]],
+    embeddings: np.ndarray,
     sentiment_label: list[str],
-    sentiment_proba: list[dict],
+    sentiment_proba: list[dict[str, float]],
 ):
     try:
         collection.upsert(
@@ -105,7 +366,7 @@ def upsert_batch(
                     "review_score": int(score),
                     "creation_date": creation,
                     "sentiment_label": label,
-                    "sentiment_proba": proba,
+                    **proba,
                 }
                 for pid, oid, score, creation, label, proba in zip(
                     df["product_id"],
@@ -122,6 +383,13 @@ def upsert_batch(
         raise
 
 
+def has_legacy_proba(collection) -> bool:
+    # Coleções gravadas antes de sentiment_proba_<rótulo> guardam um único JSON em
+    # sentiment_proba; os reviews mais antigos vêm primeiro, então uma amostra basta
+    sample = collection.get(limit=1, include=["metadatas"])
+    return any("sentiment_proba" in meta for meta in sample.get("metadatas") or [])
+
+
 def existing_ids(collection) -> set[str]:
     seen: set[str] = set()
     offset = 0
@@ -135,62 +403,240 @@ def existing_ids(collection) -> set[str]:
     return seen
 
 
+def collection_batches(collection, include: list[str]) -> Iterator[dict]:
+    offset = 0
+    while batch := collection.get(limit=1000, offset=offset, include=include):
+        ids = batch.get("ids", [])
+        if not ids:
+            break
+        yield batch
+        offset += len(ids)
+
+
+def rebuild_aggregates(collection, aggregates: ProductAggregates) -> None:
+    logger.info("Recalculando agregados por produto a partir da coleção")
+    aggregates.reset()
+    for batch in collection_batches(collection, ["metadatas", "embeddings"]):
+        metadatas = batch["metadatas"]
+        aggregates.apply_batch(
+            batch["ids"],
+            [meta["product_id"] for meta in metadatas],
+            [meta["sentiment_label"] for meta in metadatas],
+            [meta.get("creation_date", "") for meta in metadatas],
+            batch["embeddings"],
+        )
+    logger.info("Agregados disponíveis para {} produtos", len(aggregates))
+
+
+def write_snapshot(collection, dtype: str) -> dict:
+    # Snapshot memory-mapped ordenado por produto, lido pela API sem consultar o Chroma
+    start = time.perf_counter()
+    metadata = write_review_snapshot(
+        REVIEW_SNAPSHOT_DIR,
+        COLLECTION,
+        collection_batches(collection, ["documents", "metadatas", "embeddings"]),
+        dtype=dtype,
+    )
+    logger.info(
+        "Snapshot de leitura {} gravado: {} reviews de {} produtos em {:.1f}s",
+        metadata["version"],
+        metadata["rows"],
+        metadata["products"],
+        time.perf_counter() - start,
+    )
+    return metadata
+
+
 def predict_sentiment(
-    model_dict: dict, embeddings: list[list[float]]
-) -> tuple[list[str], list[str]]:
+    model_dict: dict, embeddings: np.ndarray
+) -> tuple[list[str], list[dict[str, float]]]:
     if "model" not in model_dict or "label_encoder" not in model_dict:
         logger.error("Modelo de Predição ou label encoder não encontrados")
         raise ValueError("Modelo de Predição ou label encoder não encontrados")
 
     model_sentiment = model_dict["model"]
-    le = model_dict["label_encoder"]
-    predict = []
-    predict_proba = []
-
-    for i, emb in enumerate(embeddings):
-        proba = model_sentiment.predict_proba([emb])
-        label = le.inverse_transform([proba.argmax()])[0]
-        predict.append(str(label))
-        predict_proba.append(
-            json.dumps(
-                {
-                    "negative": float(proba[0][0]),
-                    "neutral": float(proba[0][1]),
-                    "positive": float(proba[0][2]),
-                }
-            )
-        )
+    classes = np.asarray(model_dict["label_encoder"].classes_).astype(str)
+
+    # Uma única predição para o lote inteiro e decodificação vetorizada dos rótulos
+    proba = model_sentiment.predict_proba(np.asarray(embeddings, dtype=np.float32))
+    predict = classes[proba.argmax(axis=1)].tolist()
+
+    # Probabilidades como colunas tipadas de metadata: sentiment_proba_<rótulo>
+    columns = [f"sentiment_proba_{label}" for label in classes]
+    predict_proba = [dict(zip(columns, row)) for row in proba.astype(float).tolist()]
 
     return predict, predict_proba
 
 
-# # ────────────────────────────────────────────────────────────────────────────────
-# # Main ingest
-# # ────────────────────────────────────────────────────────────────────────────────
+def invalidate_llm_cache(product_ids: set[str]) -> None:
+    if not product_ids:
+        return
+    removed = LLMCache(LLM_CACHE_PATH).invalidate_products(product_ids)
+    logger.info(
+        "Cache de LLM invalidado para {} produtos ({} entradas removidas)",
+        len(product_ids),
+        removed,
+    )
 
 
-def ingest(full_refresh: bool):
-    engine = sql_engine()
+# ────────────────────────────────────────────────────────────────────────────────
+# Pipeline
+# ────────────────────────────────────────────────────────────────────────────────
 
-    client = chromadb.HttpClient(
-        host=CHROMA_HOST, port=CHROMA_PORT, settings=Settings(allow_reset=True)
-    )
+_DONE = object()
 
-    if full_refresh:
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    # Bloqueia enquanto a fila estiver cheia (backpressure), exceto se o pipeline parou
+    while not stop.is_set():
         try:
-            client.delete_collection(COLLECTION)
-            logger.warning("Coleção {} dropada (full‑refresh)", COLLECTION)
-        except KeyError:
-            pass
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
 
-    collection = client.get_or_create_collection(COLLECTION)
-    seen_ids = set() if full_refresh else existing_ids(collection)
 
-    model = SentenceTransformer(MODEL_NAME)
-    inserted = 0
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _source_worker(
+    items: Iterable,
+    outbox: queue.Queue,
+    stop: threading.Event,
+    errors: list[BaseException],
+) -> None:
+    try:
+        for item in items:
+            if stop.is_set():
+                break
+            _put(outbox, item, stop)
+    except BaseException as e:
+        logger.exception("Erro no estágio de leitura")
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(outbox, _DONE, stop)
+
+
+def _stage_worker(
+    name: str,
+    fn: Callable,
+    inbox: queue.Queue,
+    outbox: queue.Queue,
+    stop: threading.Event,
+    errors: list[BaseException],
+) -> None:
+    try:
+        while (item := _get(inbox, stop)) is not _DONE:
+            _put(outbox, fn(item), stop)
+    except BaseException as e:
+        logger.exception("Erro no estágio {}", name)
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(outbox, _DONE, stop)
+
+
+def run_pipeline(
+    batches: Iterable[pl.DataFrame],
+    encode: Callable[[pl.DataFrame], tuple],
+    predict: Callable[[tuple], tuple],
+    upload: Callable[[tuple], tuple],
+    on_uploaded: Callable[[tuple], None],
+    upload_workers: int = UPLOAD_WORKERS,
+    queue_size: int = QUEUE_SIZE,
+    meter: StageMeter | None = None,
+) -> None:
+    # Estágios ligados por filas limitadas:
+    # leitura SQL → encoding → predição → upload concorrente no Chroma
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    to_encode: queue.Queue = queue.Queue(maxsize=queue_size)
+    to_predict: queue.Queue = queue.Queue(maxsize=queue_size)
+    to_upload: queue.Queue = queue.Queue(maxsize=queue_size)
+    if meter is not None:
+        # Fila cheia aponta o estágio seguinte como gargalo; vazia, o anterior
+        meter.watch("encode", to_encode)
+        meter.watch("predict", to_predict)
+        meter.watch("upload", to_upload)
+
+    threads = [
+        threading.Thread(
+            target=_source_worker,
+            args=(batches, to_encode, stop, errors),
+            name="ingest-reader",
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_stage_worker,
+            args=("encoder", encode, to_encode, to_predict, stop, errors),
+            name="ingest-encoder",
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_stage_worker,
+            args=("predictor", predict, to_predict, to_upload, stop, errors),
+            name="ingest-predictor",
+            daemon=True,
+        ),
+    ]
+    for t in threads:
+        t.start()
+
+    def collect(futures) -> None:
+        for future in futures:
+            try:
+                on_uploaded(future.result())
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+    with ThreadPoolExecutor(
+        max_workers=upload_workers, thread_name_prefix="ingest-upload"
+    ) as pool:
+        inflight = set()
+        while (item := _get(to_upload, stop)) is not _DONE:
+            # Limita os uploads em andamento ao número de workers
+            if len(inflight) >= upload_workers:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                collect(done)
+                if stop.is_set():
+                    break
+            inflight.add(pool.submit(upload, item))
+        collect(wait(inflight).done)
+
+    stop.set()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+
+
+# # ────────────────────────────────────────────────────────────────────────────────
+# # Main ingest
+# # ────────────────────────────────────────────────────────────────────────────────
+
 
-    for df in stream_reviews(engine):
+def new_batches(
+    engine: Engine,
+    seen_ids: set[str],
+    state: IngestState | None = None,
+    since: str | None = None,
+) -> Iterator[pl.DataFrame]:
+    for df in stream_reviews(engine, since):
         df = filter_new(df, seen_ids)
+        if state is not None and not df.is_empty():
+            # Descarta o que o manifesto local já registrou como enviado
+            known = state.known(df["doc_id"].to_list())
+            if known:
+                df = df.filter(~pl.col("doc_id").is_in(list(known)))
         if df.is_empty():
             continue
 
@@ -202,16 +648,184 @@ def ingest(full_refresh: bool):
 
         logger.info("Processando {} reviews", df.height)
         for i in range(0, df.height, EMB_BATCH):
-            sub = df.slice(i, EMB_BATCH)
-            vecs = encode_text(model, sub["review_text"].to_list())
-            sentiment_label, sentiment_proba = predict_sentiment(MODEL_DICT, vecs)
+            yield df.slice(i, EMB_BATCH)
+
+
+def ingest(
+    full_refresh: bool,
+    pipeline: bool = False,
+    upload_workers: int = UPLOAD_WORKERS,
+    queue_size: int = QUEUE_SIZE,
+    encode_workers: int = ENCODE_WORKERS,
+    encode_batch_size: int = ENCODE_BATCH,
+    torch_threads: int | None = None,
+    embedding_cache: bool = True,
+    reconcile: bool = False,
+    embedding_backend: str = EMBEDDING_BACKEND,
+    vector_store: str = VECTOR_STORE_MODE,
+    snapshot: bool = True,
+    snapshot_dtype: str = "float32",
+    rebuild_snapshot: bool = False,
+    source_indexes: bool = False,
+):
+    engine = sql_engine()
+    if source_indexes:
+        ensure_source_indexes(engine)
+    state = IngestState(INGEST_STATE_PATH, COLLECTION)
+    aggregates = ProductAggregates(PRODUCT_AGGREGATES_PATH, COLLECTION)
+
+    client = create_chroma_client(
+        vector_store, CHROMA_HOST, CHROMA_PORT, VECTOR_STORE_PATH
+    )
+    logger.info("Vector store {} ({})", vector_store, COLLECTION)
 
-            upsert_batch(collection, sub, vecs, sentiment_label, sentiment_proba)
-            inserted += sub.height
-            if inserted % 1000 == 0:
-                logger.info("{} vetores inseridos…", inserted)
+    if full_refresh:
+        try:
+            client.delete_collection(COLLECTION)
+            logger.warning("Coleção {} dropada (full‑refresh)", COLLECTION)
+        except (KeyError, ValueError, NotFoundError):
+            # Coleção inexistente (o erro varia entre o cliente HTTP e o embutido)
+            pass
+        state.reset()
+        aggregates.reset()
+
+    collection = client.get_or_create_collection(COLLECTION)
+    if not full_refresh and has_legacy_proba(collection):
+        # O upsert incremental só grava o formato novo nos reviews novos
+        logger.warning(
+            "A coleção {} tem reviews com o metadado sentiment_proba antigo; "
+            "rode com --full-refresh para gravar sentiment_proba_<rótulo> em todos",
+            COLLECTION,
+        )
 
+    # Marca d'água capturada antes da leitura: tudo até ela é processado nesta execução
+    run_watermark = max_creation_date(engine)
+    since = None
+    if full_refresh:
+        seen_ids = set()
+    elif reconcile or state.watermark() is None or collection.count() == 0:
+        logger.info("Reconciliação completa com a coleção {}", COLLECTION)
+        seen_ids = existing_ids(collection)
+        state.reset()
+        state.add(seen_ids)
+        rebuild_aggregates(collection, aggregates)
+    else:
+        since = state.watermark()
+        seen_ids = set()
+        logger.info("Ingestão incremental a partir de {}", since)
+        if len(aggregates) == 0:
+            rebuild_aggregates(collection, aggregates)
+
+    embedder, pool = load_encoder(encode_workers, torch_threads, embedding_backend)
+    # O nome no cache inclui o backend: vetores do ONNX quantizado não se misturam aos do torch
+    cache = (
+        EmbeddingCache(EMBEDDING_CACHE_DIR, embedder.cache_name)
+        if embedding_cache
+        else None
+    )
+    model_dict = load_model_dict()
+    meter = StageMeter()
+    inserted = 0
+    touched_products: set[str] = set()
+
+    def encode_fn(texts: list[str]):
+        return encode_text(embedder, texts, pool, encode_batch_size)
+
+    def encode(sub: pl.DataFrame):
+        texts = sub["review_text"].to_list()
+        with meter.measure("encode", sub.height):
+            if cache is not None:
+                vecs = cache.encode(texts, encode_fn)
+            else:
+                vecs = encode_fn(texts)
+        return sub, vecs
+
+    def predict(item):
+        sub, vecs = item
+        with meter.measure("predict", sub.height):
+            return sub, vecs, *predict_sentiment(model_dict, vecs)
+
+    def upload(item):
+        with meter.measure("upload", item[0].height):
+            upsert_batch(collection, *item)
+        return item
+
+    def on_uploaded(item) -> None:
+        nonlocal inserted
+        sub, vecs, sentiment_label, _ = item
+        aggregates.apply_batch(
+            sub["doc_id"].to_list(),
+            sub["product_id"].to_list(),
+            sentiment_label,
+            sub["creation_date"].to_list(),
+            vecs,
+        )
+        touched_products.update(sub["product_id"].to_list())
+        state.add(sub["doc_id"].to_list())
+        inserted += sub.height
+        if meter.maybe_log():
+            logger.info("{} vetores inseridos…", inserted)
+
+    batches = meter.timed("read", new_batches(engine, seen_ids, state, since))
+    try:
+        if pipeline:
+            logger.info(
+                "Ingestão em pipeline ({} workers de upload, filas de {} lotes)",
+                upload_workers,
+                queue_size,
+            )
+            run_pipeline(
+                batches,
+                encode,
+                predict,
+                upload,
+                on_uploaded,
+                upload_workers=upload_workers,
+                queue_size=queue_size,
+                meter=meter,
+            )
+        else:
+            for sub in batches:
+                on_uploaded(upload(predict(encode(sub))))
+    finally:
+        if pool is not None:
+            embedder.model.stop_multi_process_pool(pool)
+        # Mesmo em caso de erro, os produtos já atualizados não podem servir cache antigo
+        invalidate_llm_cache(touched_products)
+
+    # Só avança a marca d'água se toda a leitura foi processada sem erro
+    if run_watermark:
+        state.set_watermark(str(run_watermark))
+
+    # Regravar o snapshot relê a coleção inteira com embeddings: só é feito quando pedido,
+    # após um full-refresh ou se ainda não existe. Numa ingestão incremental, a API detecta
+    # pela impressão digital dos agregados os produtos alterados e os lê do Chroma
+    snapshot_report = {"rebuilt": False, "seconds": 0.0, "rows": 0}
+    if snapshot and (
+        rebuild_snapshot
+        or full_refresh
+        or ReviewSnapshot(REVIEW_SNAPSHOT_DIR, COLLECTION).metadata is None
+    ):
+        start = time.perf_counter()
+        metadata = write_snapshot(collection, snapshot_dtype)
+        elapsed = time.perf_counter() - start
+        meter.add("snapshot", metadata["rows"], elapsed)
+        snapshot_report = {
+            "rebuilt": True,
+            "seconds": round(elapsed, 2),
+            "rows": metadata["rows"],
+        }
+    elif snapshot and touched_products:
+        logger.info(
+            "{} produtos alterados serão lidos do Chroma até o próximo --rebuild-snapshot",
+            len(touched_products),
+        )
+
+    meter.log()
+    if cache is not None:
+        cache.log_stats()
     logger.success("Ingesta concluída → {} novos vetores", inserted)
+    return {"inserted": inserted, "snapshot": snapshot_report, **meter.summary()}
 
 
 if __name__ == "__main__":
@@ -219,5 +833,99 @@ if __name__ == "__main__":
     p.add_argument(
         "--full-refresh", action="store_true", help="Recria a coleção inteira"
     )
+    p.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Ignora a marca d'água e compara todo o SQL com os IDs da coleção",
+    )
+    p.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Sobrepõe leitura SQL, encoding, predição e upload em estágios paralelos",
+    )
+    p.add_argument(
+        "--upload-workers",
+        type=int,
+        default=UPLOAD_WORKERS,
+        help="Uploads simultâneos ao Chroma no modo --pipeline",
+    )
+    p.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_SIZE,
+        help="Lotes em espera entre estágios do pipeline (backpressure)",
+    )
+    p.add_argument(
+        "--encode-workers",
+        type=int,
+        default=ENCODE_WORKERS,
+        help="Processos de encoding (CPU); 1 desativa o pool multi-processo",
+    )
+    p.add_argument(
+        "--encode-batch-size",
+        type=int,
+        default=ENCODE_BATCH,
+        help="Batch size interno do modelo de embeddings",
+    )
+    p.add_argument(
+        "--torch-threads",
+        type=int,
+        default=None,
+        help="Threads por processo de encoding (torch ou ONNX Runtime)",
+    )
+    p.add_argument(
+        "--embedding-backend",
+        choices=BACKENDS,
+        default=EMBEDDING_BACKEND,
+        help="torch (SentenceTransformer) ou onnx (modelo int8 de scripts/export_onnx.py)",
+    )
+    p.add_argument(
+        "--vector-store",
+        choices=VECTOR_STORE_MODES,
+        default=VECTOR_STORE_MODE,
+        help="http (servidor Chroma) ou embedded (coleção local em VECTOR_STORE_PATH)",
+    )
+    p.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="Não regrava o snapshot memory-mapped lido pela API",
+    )
+    p.add_argument(
+        "--snapshot-dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="Precisão dos embeddings no snapshot (float16 ocupa metade da memória)",
+    )
+    p.add_argument(
+        "--rebuild-snapshot",
+        action="store_true",
+        help="Regrava o snapshot a partir da coleção inteira (feito sempre após --full-refresh)",
+    )
+    p.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="Ignora o cache de embeddings em disco e codifica todos os textos",
+    )
+    p.add_argument(
+        "--create-source-indexes",
+        action="store_true",
+        help="Cria no banco de origem os índices usados pela leitura (altera o banco)",
+    )
     args = p.parse_args()
-    ingest(args.full_refresh)
+    ingest(
+        args.full_refresh,
+        pipeline=args.pipeline,
+        upload_workers=args.upload_workers,
+        queue_size=args.queue_size,
+        encode_workers=args.encode_workers,
+        encode_batch_size=args.encode_batch_size,
+        torch_threads=args.torch_threads,
+        embedding_cache=not args.no_embedding_cache,
+        reconcile=args.reconcile,
+        embedding_backend=args.embedding_backend,
+        vector_store=args.vector_store,
+        snapshot=not args.no_snapshot,
+        snapshot_dtype=args.snapshot_dtype,
+        rebuild_snapshot=args.rebuild_snapshot,
+        source_indexes=args.create_source_indexes,
+    )
@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Estado local da ingestão incremental
+#
+# Guarda, por coleção, a marca d'água (maior review_creation_date já processada)
+# e o manifesto de doc_ids já enviados ao Chroma. Assim uma execução incremental
+# lê do SQL apenas as linhas novas e verifica duplicatas localmente, sem paginar
+# a coleção inteira.
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class IngestState:
+    def __init__(self, path: str | Path, collection: str):
+        self.collection = collection
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS watermark (collection TEXT PRIMARY KEY, creation_date TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest (collection TEXT NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (collection, doc_id))"
+        )
+        self._conn.commit()
+
+    def watermark(self) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT creation_date FROM watermark WHERE collection = ?", (self.collection,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, creation_date: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermark (collection, creation_date) VALUES (?, ?)",
+                (self.collection, creation_date),
+            )
+            self._conn.commit()
+
+    def known(self, doc_ids: list[str]) -> set[str]:
+        found: set[str] = set()
+        with self._lock:
+            # SQLite limita o número de parâmetros por query
+            for i in range(0, len(doc_ids), 500):
+                chunk = doc_ids[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT doc_id FROM manifest WHERE collection = ? AND doc_id IN ({placeholders})",
+                    [self.collection, *chunk],
+                )
+                found.update(r[0] for r in rows)
+        return found
+
+    def add(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO manifest (collection, doc_id) VALUES (?, ?)",
+                ((self.collection, doc_id) for doc_id in doc_ids),
+            )
+            self._conn.commit()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM watermark WHERE collection = ?", (self.collection,))
+            self._conn.execute("DELETE FROM manifest WHERE collection = ?", (self.collection,))
+            self._conn.commit()
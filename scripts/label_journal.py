@@ -0,0 +1,59 @@
+import json
+import os
+from pathlib import Path
+
+import polars as pl
+from loguru import logger
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Journal append-only dos rótulos gerados pelo refine (JSONL, uma linha por review)
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class LabelJournal:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = None
+
+    def _lines(self):
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma interrupção no meio da escrita
+                    logger.warning(f"Linha {n} inválida no journal ignorada")
+
+    def done_ids(self) -> set[str]:
+        return {entry["doc_id"] for entry in self._lines()}
+
+    def read(self) -> pl.DataFrame:
+        entries = list(self._lines())
+        df = pl.DataFrame(entries, schema={"doc_id": pl.String, "sentiment": pl.String})
+        # Em caso de repetição vale o rótulo mais recente
+        return df.unique(subset="doc_id", keep="last", maintain_order=True)
+
+    def append(self, doc_ids: list[str], labels: list[str]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.writelines(
+            json.dumps({"doc_id": d, "sentiment": s}, ensure_ascii=False) + "\n"
+            for d, s in zip(doc_ids, labels)
+        )
+        self._file.flush()
+
+    def sync(self) -> None:
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
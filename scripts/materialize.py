@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+# Executa o mesmo serviço da API (settings lidas do .env do projeto)
+sys.path.append(str(Path(__file__).parent.parent / "app"))
+from core.config import settings  # noqa: E402
+from core.results_store import product_fingerprint  # noqa: E402
+from services.sentiment_service import get_sentiment_service  # noqa: E402
+
+CONCURRENCY = settings.BATCH_CONCURRENCY
+MAX_ATTEMPTS = 5
+OPENAI_MAX_RETRIES = 5
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class IncompleteResult(Exception):
+    pass
+
+
+def stale_products(service, order_by: str, force: bool) -> list[str]:
+    # Produtos sem resultado ou cujo conjunto de reviews mudou desde a última execução
+    aggregates = service.review_repo.aggregates
+    stored = {} if force else service.results_store.fingerprints()
+    product_ids = aggregates.product_ids(order_by=order_by)
+    by_product = aggregates.get_many(product_ids)
+    pending = []
+    for product_id in product_ids:
+        fingerprint = product_fingerprint(by_product.get(product_id))
+        if fingerprint is not None and stored.get(product_id) != fingerprint:
+            pending.append(product_id)
+    return pending
+
+
+async def materialize_product(service, product_id: str) -> None:
+    result = await service.analyze_sentiment(product_id, refresh=True)
+    if "error" in result:
+        raise ValueError(result["error"])
+
+    # O serviço devolve respostas padrão quando o LLM falha (ex.: rate limit) e não as
+    # materializa; nesse caso a análise é refeita com backoff
+    fingerprint = product_fingerprint(service.review_repo.get_product_aggregate(product_id))
+    if service.results_store.get(product_id, fingerprint) is None:
+        raise IncompleteResult(product_id)
+
+
+async def materialize(order_by: str, concurrency: int, limit: int | None, force: bool):
+    service = get_sentiment_service()
+    if service.results_store is None:
+        logger.error("RESULTS_STORE_ENABLED está desativado; nada a materializar.")
+        return
+    if not len(service.review_repo.aggregates):
+        logger.error("Agregados por produto vazios; execute o ingest antes de materializar.")
+        return
+
+    # O cliente da OpenAI já respeita o Retry-After das respostas 429
+    service.openai_client = service.openai_client.with_options(max_retries=OPENAI_MAX_RETRIES)
+
+    pending = stale_products(service, order_by, force)
+    if limit:
+        pending = pending[:limit]
+    logger.info(
+        f"{len(pending)} produtos a materializar ({len(service.results_store)} resultados armazenados)."
+    )
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done, failed = 0, 0
+    start = time.perf_counter()
+
+    async def run(product_id: str):
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                async for attempt in AsyncRetrying(
+                    stop=stop_after_attempt(MAX_ATTEMPTS),
+                    wait=wait_random_exponential(multiplier=1, min=2, max=60),
+                    retry=retry_if_exception_type(IncompleteResult),
+                    reraise=True,
+                ):
+                    with attempt:
+                        await materialize_product(service, product_id)
+                done += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Falha ao materializar o produto {product_id}: {e!r}")
+
+        if (done + failed) % 50 == 0:
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"{done + failed}/{len(pending)} produtos ({done / elapsed:.2f} produtos/s)"
+            )
+
+    await asyncio.gather(*(run(product_id) for product_id in pending))
+
+    elapsed = time.perf_counter() - start
+    logger.success(
+        f"Materialização concluída em {elapsed:.1f}s: {done} produtos atualizados, {failed} falhas."
+    )
+    if service.llm_cache is not None:
+        logger.info(f"Cache de LLM: {service.llm_cache.stats()}")
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# CLI
+# ────────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description="Pré-computa as análises de sentimento de todos os produtos"
+    )
+    p.add_argument(
+        "--order-by",
+        choices=["review_count", "latest_creation_date"],
+        default="review_count",
+        help="Ordem de processamento: mais reviews ou reviews mais recentes primeiro",
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help="Produtos analisados ao mesmo tempo",
+    )
+    p.add_argument(
+        "--limit", type=int, default=None, help="Materializa no máximo N produtos"
+    )
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="Recalcula todos os produtos, mesmo os que não mudaram",
+    )
+    args = p.parse_args()
+    asyncio.run(materialize(args.order_by, args.concurrency, args.limit, args.force))
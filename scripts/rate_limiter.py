@@ -0,0 +1,78 @@
+import asyncio
+import time
+from collections import deque
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Limites de requisições/tokens por minuto e tamanho de lote adaptativo
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class RateLimiter:
+    # Janela deslizante de 60s com as requisições (e tokens estimados) já enviadas
+    def __init__(
+        self, rpm: int | None = None, tpm: int | None = None, window: float = 60.0
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._sent: deque[tuple[float, int]] = deque()
+        self._tokens = 0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _purge(self, now: float) -> None:
+        while self._sent and now - self._sent[0][0] >= self.window:
+            self._tokens -= self._sent.popleft()[1]
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        if not self._sent:
+            return 0.0
+        over_rpm = self.rpm is not None and len(self._sent) >= self.rpm
+        over_tpm = self.tpm is not None and self._tokens + tokens > self.tpm
+        if not (over_rpm or over_tpm):
+            return 0.0
+        return self._sent[0][0] + self.window - now
+
+    async def acquire(self, tokens: int = 0) -> None:
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._purge(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._sent.append((now, tokens))
+                    self._tokens += tokens
+                    return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        # Após um 429 todas as requisições aguardam o Retry-After
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveBatchSize:
+    # Reduz o lote pela metade em falhas e cresce aos poucos após sucessos seguidos
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int | None = None,
+        grow_after: int = 5,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.current = max(minimum, min(initial, self.maximum))
+        self.grow_after = grow_after
+        self._streak = 0
+
+    def success(self) -> None:
+        self._streak += 1
+        if self._streak >= self.grow_after and self.current < self.maximum:
+            self.current += 1
+            self._streak = 0
+
+    def failure(self) -> None:
+        self._streak = 0
+        self.current = max(self.minimum, self.current // 2)
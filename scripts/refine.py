@@ -1,5 +1,9 @@
 import argparse
+import asyncio
 import json
+import shutil
+import time
+from collections import defaultdict, deque
 from pathlib import Path
 from typing import List
 
@@ -15,8 +19,19 @@ from tenacity import (
 )
 from tqdm import tqdm
 
+from label_journal import LabelJournal
+from rate_limiter import AdaptiveBatchSize, RateLimiter
+
 load_dotenv()
 client = openai.OpenAI()
+# Retentativas controladas pelo modo async (rate limiter + lote adaptativo)
+aclient = openai.AsyncOpenAI(max_retries=0)
+
+MAX_ATTEMPTS = 5
+DEFAULT_RETRY_AFTER = 5.0
+# Limite de requisições por arquivo da Batch API
+BATCH_API_MAX_REQUESTS = 50_000
+BATCH_API_TERMINAL = {"completed", "failed", "expired", "cancelled"}
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Helpers
@@ -29,22 +44,58 @@ def parse_args():
         "--batch-size", type=int, default=10, help="Tamanho do lote de envio ao LLM"
     )
     ap.add_argument(
-        "--checkpoint", type=int, default=100, help="Grava após N previsões novas"
+        "--checkpoint",
+        type=int,
+        default=100,
+        help="Força a gravação do journal em disco (fsync) a cada N previsões novas",
+    )
+    ap.add_argument(
+        "--merge-only",
+        action="store_true",
+        help="Apenas incorpora o journal ao parquet gold, sem chamar o LLM",
+    )
+    ap.add_argument(
+        "--mode",
+        choices=["sync", "async", "batch-api"],
+        default="sync",
+        help=(
+            "sync: um lote por vez; async: vários lotes em paralelo; "
+            "batch-api: Batch API da OpenAI (mais barata, resultados em até 24h)"
+        ),
+    )
+    ap.add_argument(
+        "--concurrency", type=int, default=8, help="Requisições simultâneas (async)"
+    )
+    ap.add_argument(
+        "--rpm", type=int, default=None, help="Limite de requisições por minuto"
+    )
+    ap.add_argument(
+        "--tpm", type=int, default=None, help="Limite de tokens (estimados) por minuto"
+    )
+    ap.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=None,
+        help="Tamanho máximo do lote adaptativo (padrão: --batch-size)",
+    )
+    ap.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60.0,
+        help="Intervalo em segundos entre consultas ao status dos batches (batch-api)",
     )
     return ap.parse_args()
 
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=2, max=15),
-    retry=(
-        retry_if_exception_type(openai.RateLimitError)
-        | retry_if_exception_type(openai.APIConnectionError)
-        | retry_if_exception_type(openai.APITimeoutError)
-        | retry_if_exception_type(openai.APIError)
-    ),
-)
-def classify_batch(texts: List[str]) -> List[str]:
+def build_request_body(texts: List[str]) -> dict:
+    return {
+        "model": "gpt-4o-mini",
+        "messages": build_messages(texts),
+        "temperature": 0,
+    }
+
+
+def build_messages(texts: List[str]) -> List[dict]:
     joined = "\n".join(
         f"[{i + 1}] {t.replace(chr(10), ' ')}" for i, t in enumerate(texts)
     )
@@ -61,53 +112,399 @@ def classify_batch(texts: List[str]) -> List[str]:
         "Responda no formato JSON, preservando a ordem:\n\n"
         f"{joined}"
     )
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": USER_PROMPT},
-        ],
-        temperature=0,
-        timeout=30,
-    )
-    raw = response.choices[0].message.content.strip()
-    logger.debug("Resposta do LLM: {}", raw)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT},
+    ]
+
 
+def parse_labels(raw: str, n_texts: int) -> List[str]:
+    logger.debug("Resposta do LLM: {}", raw)
     labels = json.loads(raw)["labels"]
-    if len(labels) != len(texts):
+    if len(labels) != n_texts:
         raise ValueError("Número de labels retornado não bate com número de textos.")
     return labels
 
 
+def estimate_tokens(texts: List[str]) -> int:
+    # ~4 caracteres por token + prompt fixo + saída (~8 tokens por rótulo)
+    return sum(len(t) for t in texts) // 4 + 150 + 8 * len(texts)
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=2, max=15),
+    retry=(
+        retry_if_exception_type(openai.RateLimitError)
+        | retry_if_exception_type(openai.APIConnectionError)
+        | retry_if_exception_type(openai.APITimeoutError)
+        | retry_if_exception_type(openai.APIError)
+    ),
+)
+def classify_batch(texts: List[str]) -> List[str]:
+    response = client.chat.completions.create(**build_request_body(texts), timeout=30)
+    return parse_labels(response.choices[0].message.content.strip(), len(texts))
+
+
+async def aclassify_batch(texts: List[str]) -> List[str]:
+    response = await aclient.chat.completions.create(
+        **build_request_body(texts), timeout=30
+    )
+    return parse_labels(response.choices[0].message.content.strip(), len(texts))
+
+
+def retry_after(error: openai.RateLimitError) -> float:
+    try:
+        return float(error.response.headers.get("retry-after", DEFAULT_RETRY_AFTER))
+    except (AttributeError, TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
 def save_checkpoint(df: pl.DataFrame, output_path: Path) -> None:
     tmp = output_path.with_suffix(".tmp.parquet")
     df.write_parquet(tmp)
     tmp.replace(output_path)
 
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Refine async
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+async def refine_async(
+    df_to_predict: pl.DataFrame, journal: LabelJournal, args: argparse.Namespace
+) -> int:
+    texts = df_to_predict["review_text"].to_list()
+    doc_ids = df_to_predict["doc_id"].to_list()
+    pending = deque(range(len(texts)))
+    attempts: dict[int, int] = defaultdict(int)
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    sizer = AdaptiveBatchSize(args.batch_size, maximum=args.max_batch_size)
+    results: asyncio.Queue = asyncio.Queue()
+    in_flight = 0
+    skipped = 0
+
+    def requeue(items: List[int], count_attempt: bool = True) -> None:
+        nonlocal skipped
+        kept = []
+        for i in items:
+            attempts[i] += count_attempt
+            if attempts[i] < MAX_ATTEMPTS:
+                kept.append(i)
+            else:
+                skipped += 1
+        pending.extendleft(reversed(kept))
+
+    async def worker() -> None:
+        nonlocal in_flight
+        while True:
+            if not pending:
+                if in_flight == 0:
+                    return
+                # Outro worker ainda pode devolver itens para a fila
+                await asyncio.sleep(0.05)
+                continue
+
+            items = [pending.popleft() for _ in range(min(sizer.current, len(pending)))]
+            batch = [texts[i] for i in items]
+            in_flight += 1
+            try:
+                await limiter.acquire(estimate_tokens(batch))
+                labels = await aclassify_batch(batch)
+            except openai.RateLimitError as e:
+                logger.warning("Rate limit atingido, pausando envios")
+                limiter.pause(retry_after(e))
+                requeue(items, count_attempt=False)
+            except (openai.APIConnectionError, openai.APITimeoutError, openai.APIError):
+                logger.exception("Erro na API, lote devolvido para a fila")
+                requeue(items)
+                await asyncio.sleep(min(2 ** attempts[items[0]], 15))
+            except (ValueError, KeyError, TypeError):
+                # Resposta inválida (ex.: número de labels diferente): lotes menores
+                logger.warning("Resposta inválida para lote de {}", len(items))
+                sizer.failure()
+                requeue(items)
+            else:
+                sizer.success()
+                await results.put((items, labels))
+            finally:
+                in_flight -= 1
+
+    async def writer(progress: tqdm) -> int:
+        # Único ponto que escreve no journal
+        updated, last_checkpoint = 0, 0
+        while (item := await results.get()) is not None:
+            items, labels = item
+            journal.append([doc_ids[i] for i in items], labels)
+            updated += len(labels)
+            progress.update(len(labels))
+            if updated - last_checkpoint >= args.checkpoint:
+                journal.sync()
+                last_checkpoint = updated
+                logger.info(f"Checkpoint salvo ({updated} previsões)")
+        return updated
+
+    with tqdm(total=len(texts), desc="Reviews") as progress:
+        writer_task = asyncio.create_task(writer(progress))
+        await asyncio.gather(*(worker() for _ in range(max(1, args.concurrency))))
+        await results.put(None)
+        updated = await writer_task
+
+    if skipped:
+        logger.warning(f"{skipped} reviews sem rótulo após {MAX_ATTEMPTS} tentativas")
+    logger.info(f"Lote final adaptativo: {sizer.current}")
+    return updated
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Refine via Batch API
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def load_batch_state(state_path: Path) -> dict:
+    if state_path.exists():
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    return {"batches": []}
+
+
+def save_batch_state(state: dict, state_path: Path) -> None:
+    # Gravação atômica: o estado é o que permite retomar após uma interrupção
+    tmp = state_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(state_path)
+
+
+def write_batch_requests(
+    doc_ids: List[str], texts: dict, batch_size: int, batch_dir: Path, state: dict
+) -> None:
+    # Um arquivo JSONL por batch; cada linha classifica um lote de reviews
+    groups = [doc_ids[i : i + batch_size] for i in range(0, len(doc_ids), batch_size)]
+    for start in range(0, len(groups), BATCH_API_MAX_REQUESTS):
+        index = len(state["batches"])
+        request_file = batch_dir / f"requests_{index:04d}.jsonl"
+        requests = {}
+        with open(request_file, "w", encoding="utf-8") as f:
+            for n, group in enumerate(groups[start : start + BATCH_API_MAX_REQUESTS]):
+                custom_id = f"{index}-{n}"
+                requests[custom_id] = group
+                request = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": build_request_body([texts[d] for d in group]),
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        state["batches"].append(
+            {
+                "request_file": request_file.name,
+                "input_file_id": None,
+                "batch_id": None,
+                "status": "written",
+                "requests": requests,
+            }
+        )
+
+
+def find_remote_batch(input_file_id: str, since: float) -> str | None:
+    # Batch criado com o arquivo antes de uma interrupção, sem o id gravado no estado.
+    # A listagem vem dos mais recentes para os mais antigos
+    for remote in client.batches.list(limit=100):
+        if remote.created_at < since:
+            return None
+        if remote.input_file_id == input_file_id and remote.status != "cancelled":
+            return remote.id
+    return None
+
+
+def submit_batches(batch_dir: Path, state: dict, state_path: Path) -> None:
+    # Cada etapa é registrada no estado antes da próxima (upload → criação do batch).
+    # Interrompido após o upload, o arquivo é reenviado na retomada (o anterior fica
+    # órfão, sem custo); após a criação do batch, o batch existente é reaproveitado
+    for batch in state["batches"]:
+        resumed = batch["status"] == "uploaded"
+        if batch["status"] == "written":
+            uploaded_at = time.time()
+            with open(batch_dir / batch["request_file"], "rb") as f:
+                batch["input_file_id"] = client.files.create(file=f, purpose="batch").id
+            batch["uploaded_at"] = uploaded_at
+            batch["status"] = "uploaded"
+            save_batch_state(state, state_path)
+        if batch["status"] == "uploaded":
+            batch_id = None
+            if resumed:
+                # Margem para diferenças de relógio com o servidor
+                since = batch.get("uploaded_at", 0) - 300
+                batch_id = find_remote_batch(batch["input_file_id"], since)
+            if batch_id is not None:
+                logger.info(f"Batch {batch_id} já criado antes da interrupção")
+            else:
+                batch_id = client.batches.create(
+                    input_file_id=batch["input_file_id"],
+                    endpoint="/v1/chat/completions",
+                    completion_window="24h",
+                ).id
+            batch["batch_id"] = batch_id
+            batch["status"] = "submitted"
+            save_batch_state(state, state_path)
+            logger.info(
+                f"Batch {batch['batch_id']} enviado ({len(batch['requests'])} requisições)"
+            )
+
+
+def ingest_batch_output(output: str, batch: dict, journal: LabelJournal) -> int:
+    # Validação por item: respostas com erro ou número de rótulos diferente ficam
+    # sem rótulo e são reenviadas na próxima rodada. Interrompida no meio, a saída é
+    # lida de novo na retomada: as linhas repetidas no journal têm o mesmo rótulo e o
+    # merge mantém uma por review (LabelJournal.read)
+    updated, invalid = 0, 0
+    for line in filter(None, output.splitlines()):
+        item = json.loads(line)
+        doc_ids = batch["requests"].get(item.get("custom_id"))
+        response = item.get("response") or {}
+        if doc_ids is None or item.get("error") or response.get("status_code") != 200:
+            invalid += 1
+            continue
+        try:
+            raw = response["body"]["choices"][0]["message"]["content"].strip()
+            labels = parse_labels(raw, len(doc_ids))
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            invalid += 1
+            continue
+        journal.append(doc_ids, labels)
+        updated += len(labels)
+    if invalid:
+        logger.warning(f"{invalid} respostas inválidas no batch {batch['batch_id']}")
+    return updated
+
+
+def wait_batches(
+    state: dict, state_path: Path, journal: LabelJournal, poll_interval: float
+) -> int:
+    updated = 0
+    while active := [b for b in state["batches"] if b["status"] == "submitted"]:
+        for batch in active:
+            remote = client.batches.retrieve(batch["batch_id"])
+            if remote.status not in BATCH_API_TERMINAL:
+                continue
+            counts = remote.request_counts
+            logger.info(
+                f"Batch {batch['batch_id']} {remote.status}: "
+                f"{counts.completed if counts else '?'} concluídas, "
+                f"{counts.failed if counts else '?'} com erro"
+            )
+            # Batches expirados podem ter parte das respostas prontas
+            if remote.output_file_id:
+                output = client.files.content(remote.output_file_id).text
+                updated += ingest_batch_output(output, batch, journal)
+                journal.sync()
+            batch["status"] = "ingested" if remote.output_file_id else "failed"
+            save_batch_state(state, state_path)
+        if any(b["status"] == "submitted" for b in state["batches"]):
+            time.sleep(poll_interval)
+    return updated
+
+
+def refine_batch_api(
+    df_to_predict: pl.DataFrame,
+    journal: LabelJournal,
+    args: argparse.Namespace,
+    batch_dir: Path,
+) -> int:
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    state_path = batch_dir / "state.json"
+    state = load_batch_state(state_path)
+    texts = dict(zip(df_to_predict["doc_id"], df_to_predict["review_text"]))
+
+    # Retoma batches de uma execução anterior antes de enviar novos
+    resumed = [b for b in state["batches"] if b["status"] not in ("ingested", "failed")]
+    if resumed:
+        logger.info(f"Retomando {len(resumed)} batches de uma execução anterior")
+    submit_batches(batch_dir, state, state_path)
+    updated = wait_batches(state, state_path, journal, args.poll_interval)
+
+    batch_size = args.batch_size
+    for _ in range(MAX_ATTEMPTS):
+        done_ids = journal.done_ids()
+        pending = [d for d in texts if d not in done_ids]
+        if not pending:
+            break
+        logger.info(f"{len(pending)} reviews pendentes → lotes de {batch_size}")
+        write_batch_requests(pending, texts, batch_size, batch_dir, state)
+        save_batch_state(state, state_path)
+        submit_batches(batch_dir, state, state_path)
+        updated += wait_batches(state, state_path, journal, args.poll_interval)
+        # Lotes menores reduzem respostas com número de rótulos diferente
+        batch_size = max(1, batch_size // 2)
+    else:
+        skipped = len(set(texts) - journal.done_ids())
+        if skipped:
+            logger.warning(f"{skipped} reviews sem rótulo após {MAX_ATTEMPTS} rodadas")
+
+    # Todos os batches foram finalizados e os rótulos estão no journal
+    shutil.rmtree(batch_dir)
+    return updated
+
+
 # # ────────────────────────────────────────────────────────────────────────────────
 # # Main refine
 # # ────────────────────────────────────────────────────────────────────────────────
 
 
+def merge_journal(
+    source_path: Path, output_path: Path, journal: LabelJournal
+) -> pl.DataFrame:
+    # Incorpora os rótulos do journal ao dataset uma única vez e grava o gold
+    df = pl.read_parquet(source_path)
+    if "sentiment" not in df.columns:
+        df = df.with_columns(pl.lit(None, dtype=pl.String).alias("sentiment"))
+
+    labels = journal.read().rename({"sentiment": "journal_sentiment"})
+    df = (
+        df.join(labels, on="doc_id", how="left")
+        .with_columns(pl.coalesce("sentiment", "journal_sentiment").alias("sentiment"))
+        .drop("journal_sentiment")
+    )
+    save_checkpoint(df, output_path)
+    journal.remove()
+    return df
+
+
 def main():
     args = parse_args()
     SILVER_DIR = Path(__file__).parent.parent / "data" / "silver"
     GOLD_DIR = Path(__file__).parent.parent / "data" / "gold"
+    output_path = GOLD_DIR / "train_refined.parquet"
+    journal = LabelJournal(GOLD_DIR / "train_refined.journal.jsonl")
 
-    if (GOLD_DIR / "train_refined.parquet").exists():
-        df = pl.read_parquet(GOLD_DIR / "train_refined.parquet")
+    if output_path.exists():
+        source_path = output_path
     else:
-        df = pl.read_parquet(SILVER_DIR / "to_refine.parquet")
+        source_path = SILVER_DIR / "to_refine.parquet"
 
-    if "sentiment" not in df.columns:
-        df = df.with_columns(pl.lit(None, dtype=pl.String).alias("sentiment"))
+    if args.merge_only:
+        df = merge_journal(source_path, output_path, journal)
+        logger.success(
+            f"Journal incorporado: {df['sentiment'].null_count()} reviews sem rótulo"
+        )
+        return
 
-    mask_to_predict = df["sentiment"].is_null()
-    df_to_predict = df.filter(mask_to_predict)
+    # Lê apenas as colunas necessárias; rótulos já no journal são ignorados (retomada)
+    df_to_predict = pl.scan_parquet(source_path)
+    if "sentiment" in df_to_predict.collect_schema().names():
+        df_to_predict = df_to_predict.filter(pl.col("sentiment").is_null())
+    done_ids = journal.done_ids()
+    df_to_predict = (
+        df_to_predict.select("doc_id", "review_text")
+        .filter(~pl.col("doc_id").is_in(done_ids))
+        .collect()
+    )
+    if done_ids:
+        logger.info(f"Retomando: {len(done_ids)} rótulos já registrados no journal")
 
     total_missing = df_to_predict.height
     if total_missing == 0:
+        if done_ids:
+            merge_journal(source_path, output_path, journal)
         logger.info("Nenhuma previsão pendente")
         return
 
@@ -115,27 +512,24 @@ def main():
         f"{total_missing} reviews ainda sem rótulo → enviando em lotes de {args.batch_size}"
     )
 
-    updated = 0
-    for start in tqdm(range(0, total_missing, args.batch_size), desc="Batches"):
-        end = start + args.batch_size
-        batch_df = df_to_predict.slice(start, args.batch_size)
-        texts = batch_df["review_text"].to_list()
-
-        labels = classify_batch(texts)
-
-        df_idx = mask_to_predict.arg_true()[start:end]
-        df[df_idx, "sentiment"] = pl.Series(labels)
+    if args.mode == "async":
+        updated = asyncio.run(refine_async(df_to_predict, journal, args))
+    elif args.mode == "batch-api":
+        updated = refine_batch_api(df_to_predict, journal, args, GOLD_DIR / "batch_api")
+    else:
+        updated = 0
+        for start in tqdm(range(0, total_missing, args.batch_size), desc="Batches"):
+            batch_df = df_to_predict.slice(start, args.batch_size)
+            labels = classify_batch(batch_df["review_text"].to_list())
+            journal.append(batch_df["doc_id"].to_list(), labels)
 
-        updated += len(labels)
-        if updated % args.checkpoint == 0:
-            save_checkpoint(
-                df,
-                GOLD_DIR / "train_refined.parquet",
-            )
-            logger.info(f"Checkpoint salvo ({updated} previsões)")
+            updated += len(labels)
+            if updated % args.checkpoint == 0:
+                journal.sync()
+                logger.info(f"Checkpoint salvo ({updated} previsões)")
 
-    # Salva versão final
-    save_checkpoint(df, GOLD_DIR / "train_refined.parquet")
+    # Incorpora o journal ao gold uma única vez, ao final
+    merge_journal(source_path, output_path, journal)
     logger.success(f"Terminado! {updated} rótulos gerados e salvos em gold")
 
 